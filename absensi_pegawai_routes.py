@@ -1,19 +1,43 @@
-import calendar
 from datetime import datetime
-from flask import Blueprint, render_template, redirect, flash, url_for, request
-from models import Pegawai, AbsensiPegawai, db, HariLibur, SettingWaktu
+from flask import Blueprint, render_template, redirect, flash, url_for, request, jsonify, current_app
+from daftar_absensi import daftar_absensi_harian, baca_per_halaman, baris_ke_dict
+from models import AbsensiPegawai, db
+from statistik import info_libur_tanggal
+from rekap import catat_absensi, grup_per_id, kurangi_rekap_absensi
+from status_absensi import baca_permintaan_massal, ubah_status_massal
 from utils import check_admin_session
 
 # Inisialisasi Blueprint
 absensi_pegawai_bp = Blueprint("absensi_pegawai_bp", __name__, url_prefix="/absensi_pegawai")
 
 
+# =======================================================================
+#  HELPER: HALAMAN DATA ABSENSI PEGAWAI
+# =======================================================================
+def muat_halaman_absensi(tanggal_obj):
+    """Hari libur + satu halaman absensi pegawai sesuai parameter filter di URL."""
+    # Cek hari libur lewat kalender hari kerja (tanpa query ke database)
+    info_hari = info_libur_tanggal(tanggal_obj)
+    halaman = {"baris": [], "total": 0, "cursor_berikutnya": None}
+    if not info_hari:
+        # Filter, urutan jam datang dan paginasi dikerjakan database (lihat daftar_absensi.py)
+        halaman = daftar_absensi_harian(
+            "pegawai", tanggal_obj,
+            status=request.args.get("status"),
+            cari_nama=request.args.get("cari_nama"),
+            grup=request.args.get("role_filter"),
+            cursor=request.args.get("cursor"),
+            per_halaman=baca_per_halaman(request.args.get("per_halaman")),
+        )
+    return info_hari, halaman
+
+
 # =======================================================================
 #  ROUTE: KELOLA DATA ABSENSI PEGAWAI (DENGAN INTEGRASI HARI LIBUR)
 # =======================================================================
 @absensi_pegawai_bp.route("/", methods=["GET"])
 def absensi_pegawai():
-    """Tampilkan data absensi harian pegawai dengan filter nama dan role."""
+    """Tampilkan data absensi harian pegawai (per halaman) dengan filter nama, role dan status."""
     auth_check = check_admin_session()
     if auth_check:
         return auth_check
@@ -25,78 +49,14 @@ def absensi_pegawai():
     except ValueError:
         tanggal_obj = datetime.today().date()
 
-    nama_hari_en = calendar.day_name[tanggal_obj.weekday()]
-    daftar_hari_id = {
-        'Monday': 'Senin', 'Tuesday': 'Selasa', 'Wednesday': 'Rabu',
-        'Thursday': 'Kamis', 'Friday': 'Jumat', 'Saturday': 'Sabtu', 'Sunday': 'Minggu'
-    }
-    nama_hari_id = daftar_hari_id.get(nama_hari_en, nama_hari_en)
-
-    info_hari = None
-
-    # ==============================================================================
-    #  INTEGRASI: Lakukan Pengecekan Hari Libur Berlapis
-    # ==============================================================================
-    setting = SettingWaktu.query.first()
-    if setting and setting.hari_libur_rutin:
-        if nama_hari_id in setting.hari_libur_rutin.split(','):
-            info_hari = f"Tanggal {tanggal_obj.strftime('%d %B %Y')} adalah hari libur rutin ({nama_hari_id})."
-    
-    if not info_hari:
-        libur_spesial = HariLibur.query.filter_by(tanggal=tanggal_obj).first()
-        if libur_spesial:
-            info_hari = f"Tanggal {tanggal_obj.strftime('%d %B %Y')} adalah hari libur: {libur_spesial.keterangan}."
-
-    data_absensi_terurut = []
-    if not info_hari:
-        # --- FITUR ASLI: Jalankan logika pengambilan data jika bukan hari libur ---
-        role_filter = request.args.get("role_filter")
-        cari_nama = request.args.get("cari_nama")
-        status_filter = request.args.get("status")
-
-        pegawai_query = Pegawai.query
-        if cari_nama:
-            pegawai_query = pegawai_query.filter(Pegawai.nama.ilike(f"%{cari_nama}%"))
-        if role_filter:
-            pegawai_query = pegawai_query.filter(Pegawai.role == role_filter)
-
-        semua_pegawai = pegawai_query.order_by(Pegawai.nama.asc()).all()
-        absensi_hari_ini = AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == tanggal_obj).all()
-        
-        absensi_dict = {}
-        for absen in absensi_hari_ini:
-            if absen.no_id not in absensi_dict:
-                absensi_dict[absen.no_id] = {'masuk': None, 'pulang': None}
-            if absen.jenis_absen == 'masuk':
-                absensi_dict[absen.no_id]['masuk'] = absen
-            elif absen.jenis_absen == 'pulang':
-                absensi_dict[absen.no_id]['pulang'] = absen
-            elif absen.jenis_absen == 'lainnya':
-                absensi_dict[absen.no_id]['masuk'] = absen
-                absensi_dict[absen.no_id]['pulang'] = absen
-
-        data_absensi = []
-        for pegawai in semua_pegawai:
-            data_pegawai = {
-                "pegawai": pegawai,
-                "masuk": absensi_dict.get(pegawai.no_id, {}).get('masuk'),
-                "pulang": absensi_dict.get(pegawai.no_id, {}).get('pulang')
-            }
-            if status_filter:
-                pegawai_status = data_pegawai['masuk'].status if data_pegawai['masuk'] else 'Alfa'
-                if pegawai_status == status_filter or (status_filter == 'Alfa' and not data_pegawai['masuk']):
-                    data_absensi.append(data_pegawai)
-            else:
-                data_absensi.append(data_pegawai)
-
-        data_absensi_terurut = sorted(
-            data_absensi,
-            key=lambda item: (item['masuk'] is None, item['masuk'].waktu if item['masuk'] else None)
-        )
+    info_hari, halaman = muat_halaman_absensi(tanggal_obj)
 
     return render_template(
         "absensi_pegawai.html",
-        data_absensi=data_absensi_terurut,
+        data_absensi=halaman["baris"],
+        total=halaman["total"],
+        cursor_berikutnya=halaman["cursor_berikutnya"],
+        mulai=request.args.get("mulai", 0, type=int),
         role_filter=request.args.get("role_filter"),
         cari_nama=request.args.get("cari_nama"),
         status=request.args.get("status"),
@@ -105,6 +65,34 @@ def absensi_pegawai():
     )
 
 
+# =======================================================================
+#  API: DATA ABSENSI PEGAWAI (JSON, UNTUK REFRESH OTOMATIS)
+# =======================================================================
+@absensi_pegawai_bp.route("/api/data", methods=["GET"])
+def api_absensi_pegawai():
+    """Satu halaman absensi pegawai dalam format JSON; parameter sama dengan halaman HTML."""
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    tanggal_obj = datetime.today().date()
+    tanggal_str = request.args.get("tanggal")
+    if tanggal_str:
+        try:
+            tanggal_obj = datetime.strptime(tanggal_str, "%Y-%m-%d").date()
+        except ValueError:
+            return jsonify({"status": "danger", "message": "Format tanggal tidak valid (YYYY-MM-DD)."}), 400
+
+    info_hari, halaman = muat_halaman_absensi(tanggal_obj)
+    return jsonify({
+        "tanggal": tanggal_obj.strftime("%Y-%m-%d"),
+        "info_hari": info_hari,
+        "total": halaman["total"],
+        "cursor_berikutnya": halaman["cursor_berikutnya"],
+        "data": [baris_ke_dict(b) for b in halaman["baris"]],
+    })
+
+
 # =======================================================================
 #  FILTER UNTUK WARNA BADGE STATUS (Tidak Berubah)
 # =======================================================================
@@ -145,7 +133,9 @@ def update_absensi_pegawai(no_id):
         return redirect(url_for("absensi_pegawai_bp.absensi_pegawai", role_filter=role_filter, cari_nama=cari_nama))
 
     try:
-        # Hapus semua entri absensi untuk hari ini
+        # Hapus semua entri absensi untuk hari ini (rekap harian ikut dikurangi)
+        kurangi_rekap_absensi("pegawai", [no_id], tanggal)
+        grup = grup_per_id("pegawai", [no_id]).get(no_id.lower())
         AbsensiPegawai.query.filter_by(no_id=no_id, tanggal=tanggal).delete()
 
         # Tentukan jenis absen berdasarkan status
@@ -168,6 +158,7 @@ def update_absensi_pegawai(no_id):
             )
             db.session.add(absen_masuk)
             db.session.add(absen_pulang)
+            catat_absensi("pegawai", grup, absen_masuk, absen_pulang)
         elif status in ['Sakit', 'Izin', 'Alfa']:
             absen_lainnya = AbsensiPegawai(
                 no_id=no_id,
@@ -178,6 +169,7 @@ def update_absensi_pegawai(no_id):
                 waktu=datetime.now().time()
             )
             db.session.add(absen_lainnya)
+            catat_absensi("pegawai", grup, absen_lainnya)
 
         db.session.commit()
         flash(f"Status absensi No ID {no_id} diperbarui menjadi {status}.", "success")
@@ -187,4 +179,37 @@ def update_absensi_pegawai(no_id):
         print(f"Error update absensi pegawai: {e}")
         flash("Terjadi kesalahan. Silakan coba lagi.", "danger")
 
-    return redirect(url_for("absensi_pegawai_bp.absensi_pegawai", role_filter=role_filter, cari_nama=cari_nama))
\ No newline at end of file
+    return redirect(url_for("absensi_pegawai_bp.absensi_pegawai", role_filter=role_filter, cari_nama=cari_nama))
+
+# =======================================================================
+#  API: UBAH STATUS ABSENSI MASSAL (JSON)
+# =======================================================================
+@absensi_pegawai_bp.route("/update_massal", methods=["POST"])
+def update_absensi_pegawai_massal():
+    """
+    Ubah status banyak pegawai sekaligus dalam satu transaksi:
+    {"tanggal": "YYYY-MM-DD", "data": [{"id": "G001", "status": "Sakit"}, ...]}.
+    """
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    try:
+        tanggal, perubahan = baca_permintaan_massal(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"status": "danger", "message": str(e)}), 400
+
+    try:
+        diperbarui, gagal = ubah_status_massal("pegawai", tanggal, perubahan)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error update massal absensi pegawai: {e}")
+        return jsonify({"status": "danger", "message": "Terjadi kesalahan. Silakan coba lagi."}), 500
+
+    return jsonify({
+        "status": "success" if not gagal else "warning",
+        "tanggal": tanggal.strftime("%Y-%m-%d"),
+        "diperbarui": diperbarui,
+        "gagal": gagal,
+    })
\ No newline at end of file
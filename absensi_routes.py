@@ -1,8 +1,11 @@
-import calendar
-from flask import Blueprint, request, render_template, flash, redirect, url_for
+from flask import Blueprint, request, render_template, flash, redirect, url_for, jsonify, current_app
 from utils import check_admin_session
 from datetime import datetime
-from models import Kelas, Siswa, Absensi, db, HariLibur, SettingWaktu
+from models import Kelas, Absensi, db
+from daftar_absensi import daftar_absensi_harian, baca_per_halaman
+from rekap import catat_absensi, grup_per_id, kurangi_rekap_absensi
+from statistik import info_libur_tanggal
+from status_absensi import baca_permintaan_massal, ubah_status_massal
 
 # Inisialisasi Blueprint dengan prefix URL
 absensi_bp = Blueprint("absensi_bp", __name__, url_prefix="/absensi")
@@ -12,7 +15,7 @@ absensi_bp = Blueprint("absensi_bp", __name__, url_prefix="/absensi")
 # =======================================================================
 @absensi_bp.route("/", methods=["GET"])
 def absensi():
-    """Tampilkan data absensi harian dengan filter kelas, nama, dan status."""
+    """Tampilkan data absensi harian (per halaman) dengan filter kelas, nama, dan status."""
     auth_check = check_admin_session()
     if auth_check:
         return auth_check
@@ -24,80 +27,30 @@ def absensi():
     except ValueError:
         tanggal_obj = datetime.today().date()
 
-    nama_hari_en = calendar.day_name[tanggal_obj.weekday()]
-    daftar_hari_id = {
-        'Monday': 'Senin', 'Tuesday': 'Selasa', 'Wednesday': 'Rabu',
-        'Thursday': 'Kamis', 'Friday': 'Jumat', 'Saturday': 'Sabtu', 'Sunday': 'Minggu'
-    }
-    nama_hari_id = daftar_hari_id.get(nama_hari_en, nama_hari_en)
-
-    info_hari = None
-
     # ==============================================================================
-    #  INTEGRASI: Lakukan Pengecekan Hari Libur Berlapis
+    #  INTEGRASI: Pengecekan Hari Libur lewat kalender hari kerja (tanpa query)
     # ==============================================================================
-    setting = SettingWaktu.query.first()
-    if setting and setting.hari_libur_rutin:
-        if nama_hari_id in setting.hari_libur_rutin.split(','):
-            info_hari = f"Tanggal {tanggal_obj.strftime('%d %B %Y')} adalah hari libur rutin ({nama_hari_id})."
-    
-    if not info_hari:
-        libur_spesial = HariLibur.query.filter_by(tanggal=tanggal_obj).first()
-        if libur_spesial:
-            info_hari = f"Tanggal {tanggal_obj.strftime('%d %B %Y')} adalah hari libur: {libur_spesial.keterangan}."
-    
-    data_absensi_terurut = []
+    info_hari = info_libur_tanggal(tanggal_obj)
+
+    halaman = {"baris": [], "total": 0, "cursor_berikutnya": None}
     if not info_hari:
-        # --- FITUR ASLI: Jalankan logika pengambilan data jika bukan hari libur ---
-        kelas_id = request.args.get("kelas_id")
-        cari_nama = request.args.get("cari_nama")
-        status_filter = request.args.get("status")
-        
-        siswa_query = Siswa.query.join(Kelas)
-        if cari_nama:
-            siswa_query = siswa_query.filter(Siswa.nama.ilike(f"%{cari_nama}%"))
-        if kelas_id:
-            siswa_query = siswa_query.filter(Siswa.kelas_id == kelas_id)
-
-        semua_siswa = siswa_query.order_by(Siswa.nama.asc()).all()
-        absensi_hari_ini = Absensi.query.filter(Absensi.tanggal == tanggal_obj).all()
-
-        absensi_dict = {}
-        for absen in absensi_hari_ini:
-            if absen.nis not in absensi_dict:
-                absensi_dict[absen.nis] = {'masuk': None, 'pulang': None}
-            if absen.jenis_absen == 'masuk':
-                absensi_dict[absen.nis]['masuk'] = absen
-            elif absen.jenis_absen == 'pulang':
-                absensi_dict[absen.nis]['pulang'] = absen
-            elif absen.jenis_absen == 'lainnya':
-                absensi_dict[absen.nis]['masuk'] = absen
-                absensi_dict[absen.nis]['pulang'] = absen
-
-        data_absensi = []
-        for siswa in semua_siswa:
-            data_siswa = {
-                "siswa": siswa,
-                "masuk": absensi_dict.get(siswa.nis, {}).get('masuk'),
-                "pulang": absensi_dict.get(siswa.nis, {}).get('pulang')
-            }
-
-            if status_filter:
-                siswa_status = data_siswa['masuk'].status if data_siswa['masuk'] else 'Alfa'
-                if siswa_status == status_filter or (status_filter == 'Alfa' and not data_siswa['masuk']):
-                    data_absensi.append(data_siswa)
-            else:
-                data_absensi.append(data_siswa)
-
-        data_absensi_terurut = sorted(
-            data_absensi,
-            key=lambda item: (item['masuk'] is None, item['masuk'].waktu if item['masuk'] else None)
+        # Filter, urutan jam datang dan paginasi dikerjakan database (lihat daftar_absensi.py)
+        halaman = daftar_absensi_harian(
+            "siswa", tanggal_obj,
+            status=request.args.get("status"),
+            cari_nama=request.args.get("cari_nama"),
+            grup=request.args.get("kelas_id"),
+            cursor=request.args.get("cursor"),
+            per_halaman=baca_per_halaman(request.args.get("per_halaman")),
         )
-    
+
     kelas_list = Kelas.query.order_by(Kelas.nama.asc()).all()
     return render_template(
         "absensi.html",
-        data_absensi=data_absensi_terurut,
+        data_absensi=halaman["baris"],
+        total=halaman["total"],
+        cursor_berikutnya=halaman["cursor_berikutnya"],
+        mulai=request.args.get("mulai", 0, type=int),
         kelas_list=kelas_list,
         kelas_id=request.args.get("kelas_id"),
         cari_nama=request.args.get("cari_nama"),
@@ -139,6 +92,9 @@ def update_absensi(nis):
         return redirect(url_for("absensi_bp.absensi", kelas_id=kelas_id, cari_nama=cari_nama))
 
     try:
+        # Rekap harian ikut diperbarui: kurangi catatan lama, tambah yang baru
+        kurangi_rekap_absensi("siswa", [nis], tanggal)
+        grup = grup_per_id("siswa", [nis]).get(nis.lower())
         Absensi.query.filter_by(nis=nis, tanggal=tanggal).delete()
 
         if status == 'Hadir':
@@ -151,6 +107,7 @@ def update_absensi(nis):
                 keterangan="Konfirmasi Pulang", waktu=datetime.now().time()
             )
             db.session.add_all([absen_masuk, absen_pulang])
+            catat_absensi("siswa", grup, absen_masuk, absen_pulang)
 
         elif status in ['Sakit', 'Izin', 'Alfa']:
             absen_lainnya = Absensi(
@@ -158,6 +115,7 @@ def update_absensi(nis):
                 keterangan=status, waktu=datetime.now().time()
             )
             db.session.add(absen_lainnya)
+            catat_absensi("siswa", grup, absen_lainnya)
 
         db.session.commit()
         flash(f"Status absensi NIS {nis} diperbarui menjadi {status}.", "success")
@@ -167,4 +125,37 @@ def update_absensi(nis):
         print(f"Error update absensi: {e}")
         flash("Terjadi kesalahan. Silakan coba lagi.", "danger")
 
-    return redirect(url_for("absensi_bp.absensi", kelas_id=kelas_id, cari_nama=cari_nama))
\ No newline at end of file
+    return redirect(url_for("absensi_bp.absensi", kelas_id=kelas_id, cari_nama=cari_nama))
+
+# =======================================================================
+#  API: UBAH STATUS ABSENSI MASSAL (JSON)
+# =======================================================================
+@absensi_bp.route("/update_massal", methods=["POST"])
+def update_absensi_massal():
+    """
+    Ubah status banyak siswa sekaligus dalam satu transaksi:
+    {"tanggal": "YYYY-MM-DD", "data": [{"id": "12345", "status": "Sakit"}, ...]}.
+    """
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    try:
+        tanggal, perubahan = baca_permintaan_massal(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"status": "danger", "message": str(e)}), 400
+
+    try:
+        diperbarui, gagal = ubah_status_massal("siswa", tanggal, perubahan)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error update massal absensi siswa: {e}")
+        return jsonify({"status": "danger", "message": "Terjadi kesalahan. Silakan coba lagi."}), 500
+
+    return jsonify({
+        "status": "success" if not gagal else "warning",
+        "tanggal": tanggal.strftime("%Y-%m-%d"),
+        "diperbarui": diperbarui,
+        "gagal": gagal,
+    })
\ No newline at end of file
@@ -0,0 +1,239 @@
+# ======================== MATERIALISASI ALFA OTOMATIS ========================
+# Berkas ini menyimpan status 'Alfa' sebagai baris nyata untuk setiap siswa dan
+# pegawai yang tidak punya catatan absensi sama sekali pada hari kerja, setelah
+# batas absen masuk lewat. Laporan, ekspor dan rekap harian dengan begitu
+# membaca baris Alfa yang sebenarnya, bukan selisih total dikurangi yang hadir.
+#
+# - Siswa dan guru/staf: tanggal hari ini, setelah jam_terlambat_selesai
+#   (atau jam_masuk_selesai jika batas terlambat tidak diatur).
+# - Keamanan: tanggal kemarin, hanya yang punya shift terjadwal (bukan 'Off').
+#
+# Penjadwal berjalan di worker job latar (job_latar.py); jalankan manual lewat:
+#   flask --app app alfa-otomatis [--tanggal YYYY-MM-DD] [--ulang]
+#
+# Tanpa --ulang, perintah aman diulang: hanya orang tanpa catatan yang diisi.
+# Dengan --ulang, baris Alfa otomatis tanggal tersebut dihapus lalu dihitung ulang.
+#
+# Scan masuk dari antrian kiosk offline yang tiba setelah batas masuk (job mungkin
+# sudah berjalan) menghapus baris Alfa otomatis orang tersebut
+# (hapus_alfa_otomatis_orang, dipanggil submit_batch di scan_routes).
+#
+# Konfigurasi (.env):
+#   ALFA_OTOMATIS_AKTIF   1 = penjadwal aktif (default), 0 = mati.
+
+import json
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, insert, delete, exists, func, literal
+
+from job_latar import pelaksana_job
+from models import db, Pegawai, JadwalKeamanan, JobLatar
+from pengaturan_cache import pengaturan_cache
+from rekap import catat_rekap, sumber_absensi
+from statistik import cek_hari_libur, BATAS_MASUK_DEFAULT
+
+KETERANGAN_OTOMATIS = "Alfa (otomatis)"
+KELOMPOK = ("siswa", "guru_staf", "keamanan")
+MAKS_PERCOBAAN = 3  # job gagal dikirim ulang oleh penjadwal sampai batas ini per (tanggal, kelompok)
+
+
+def _wajib_absen(kelompok, tanggal):
+    """
+    (model absensi, kolom ID absensi, select(id, grup) semua orang kelompok ini
+    yang wajib absen pada tanggal).
+    """
+    sumber = sumber_absensi(_tipe(kelompok))
+    orang = select(sumber.kolom_orang.label("id"), sumber.grup.label("grup"))
+    if kelompok == "guru_staf":
+        orang = orang.where(Pegawai.role.in_(["guru", "staf"]))
+    elif kelompok == "keamanan":
+        orang = (
+            orang.join(JadwalKeamanan, JadwalKeamanan.pegawai_id == Pegawai.id)
+            .where(Pegawai.role == "keamanan", JadwalKeamanan.tanggal == tanggal,
+                   JadwalKeamanan.shift.notin_(["Off", ""]))
+        )
+    return sumber.model, sumber.kolom_id, orang
+
+
+def _tipe(kelompok):
+    return "siswa" if kelompok == "siswa" else "pegawai"
+
+
+def kelompok_dari(tipe, grup):
+    """Kelompok Alfa otomatis untuk tipe dan grup rekap (kelas_id / role)."""
+    if tipe == "siswa":
+        return "siswa"
+    return "keamanan" if grup == "keamanan" else "guru_staf"
+
+
+def _hapus_alfa_otomatis(kelompok, tanggal):
+    """Hapus baris Alfa otomatis kelompok pada tanggal (rekap ikut dikurangi)."""
+    model, kolom_id, orang = _wajib_absen(kelompok, tanggal)
+    orang = orang.subquery()
+    otomatis = (
+        model.tanggal == tanggal, model.jenis_absen == "lainnya",
+        model.keterangan == KETERANGAN_OTOMATIS, kolom_id.in_(select(orang.c.id)),
+    )
+    per_grup = db.session.execute(
+        select(orang.c.grup, func.count()).select_from(model)
+        .join(orang, orang.c.id == kolom_id).where(*otomatis).group_by(orang.c.grup)
+    ).all()
+    for grup, jumlah in per_grup:
+        catat_rekap(tanggal, _tipe(kelompok), grup, "lainnya", "Alfa", -jumlah)
+    db.session.execute(delete(model).where(*otomatis))
+
+
+def hapus_alfa_otomatis_orang(tipe, id_, tanggal, grup):
+    """
+    Hapus baris Alfa otomatis satu orang pada tanggal karena scan masuknya
+    diterima; rekap ikut dikurangi. Mengembalikan jumlah baris terhapus.
+    """
+    sumber = sumber_absensi(tipe)
+    jumlah = db.session.execute(delete(sumber.model).where(
+        sumber.kolom_id == id_, sumber.model.tanggal == tanggal,
+        sumber.model.jenis_absen == "lainnya", sumber.model.keterangan == KETERANGAN_OTOMATIS,
+    )).rowcount
+    if jumlah:
+        catat_rekap(tanggal, tipe, grup, "lainnya", "Alfa", -jumlah)
+    return jumlah
+
+
+def materialisasi_alfa(tanggal, kelompok=KELOMPOK, ulang=False):
+    """
+    Sisipkan baris Alfa ('lainnya') untuk setiap orang dalam kelompok yang belum
+    punya catatan absensi apa pun pada tanggal, dengan satu INSERT ... SELECT
+    per kelompok. Mengembalikan {kelompok: jumlah baris baru}. Commit oleh pemanggil.
+    """
+    waktu = datetime.now().time().replace(microsecond=0)
+    hasil = {}
+    for nama in kelompok:
+        if ulang:
+            _hapus_alfa_otomatis(nama, tanggal)
+
+        model, kolom_id, orang = _wajib_absen(nama, tanggal)
+        orang = orang.subquery()
+        kandidat = select(orang.c.id, orang.c.grup).where(~exists().where(
+            kolom_id == orang.c.id, model.tanggal == tanggal,
+        ))
+
+        # Rekap dihitung dari kandidat yang sama sebelum disisipkan (satu transaksi)
+        kandidat = kandidat.subquery()
+        per_grup = db.session.execute(
+            select(kandidat.c.grup, func.count()).group_by(kandidat.c.grup)
+        ).all()
+        if not per_grup:
+            hasil[nama] = 0
+            continue
+
+        db.session.execute(insert(model).from_select(
+            [kolom_id.key, "tanggal", "status", "jenis_absen", "keterangan", "waktu"],
+            select(
+                kandidat.c.id, literal(tanggal), literal("Alfa"), literal("lainnya"),
+                literal(KETERANGAN_OTOMATIS), literal(waktu, model.waktu.type),
+            ),
+        ))
+        for grup, jumlah in per_grup:
+            catat_rekap(tanggal, _tipe(nama), grup, "lainnya", "Alfa", jumlah)
+        hasil[nama] = sum(jumlah for _, jumlah in per_grup)
+    return hasil
+
+
+def ringkasan(tanggal, hasil):
+    rincian = ", ".join(f"{jumlah} {nama.replace('_', '/')}" for nama, jumlah in hasil.items())
+    return f"Alfa otomatis {tanggal.strftime('%d-%m-%Y')}: {rincian or 'tidak ada'}."
+
+
+# ==============================================================================
+#  JOB & PENJADWAL
+# ==============================================================================
+@pelaksana_job.tugas("alfa_otomatis")
+def job_alfa_otomatis(job, tanggal, kelompok=KELOMPOK, ulang=False):
+    tanggal = datetime.strptime(tanggal, "%Y-%m-%d").date()
+    hasil = materialisasi_alfa(tanggal, kelompok, ulang)
+    db.session.commit()
+    return dict(hasil, ringkasan=ringkasan(tanggal, hasil))
+
+
+def _batas_masuk(jendela):
+    if jendela is None:
+        return BATAS_MASUK_DEFAULT
+    return jendela.jam_terlambat_selesai or jendela.jam_masuk_selesai
+
+
+def rencana_hari_ini(sekarang):
+    """Daftar (tanggal, kelompok) yang sudah boleh dimaterialisasi pada waktu 'sekarang'."""
+    pengaturan = pengaturan_cache.get()
+    hari_ini = sekarang.date()
+    rencana = []
+
+    if pengaturan.kalender.hari_kerja(hari_ini):
+        kelompok = []
+        if sekarang.time() > _batas_masuk(pengaturan.setting_siswa):
+            kelompok.append("siswa")
+        if sekarang.time() > _batas_masuk(pengaturan.setting_guru_staf):
+            kelompok.append("guru_staf")
+        if kelompok:
+            rencana.append((hari_ini, kelompok))
+
+    # Shift keamanan kemarin (termasuk shift malam) sudah pasti selesai
+    kemarin = hari_ini - timedelta(days=1)
+    if pengaturan.kalender.hari_kerja(kemarin):
+        rencana.append((kemarin, ["keamanan"]))
+    return rencana
+
+
+def alfa_jatuh_tempo(kelompok, tanggal, sekarang):
+    """True jika Alfa otomatis (tanggal, kelompok) sudah boleh dibuat pada waktu 'sekarang'."""
+    if tanggal < sekarang.date() - timedelta(days=1 if kelompok == "keamanan" else 0):
+        return True
+    return any(t == tanggal and kelompok in daftar for t, daftar in rencana_hari_ini(sekarang))
+
+
+@pelaksana_job.berkala
+def jadwalkan_alfa_otomatis(pelaksana):
+    """
+    Kirim job alfa_otomatis sekali per (tanggal, kelompok) setelah batas masuk lewat.
+    Satu job per kelompok: batas masuk siswa dan guru/staf bisa berbeda, sehingga
+    daftar kelompok yang jatuh tempo bertambah sepanjang hari. Job yang gagal
+    dikirim ulang, paling banyak MAKS_PERCOBAAN kali.
+    """
+    if os.getenv("ALFA_OTOMATIS_AKTIF", "1") == "0":
+        return
+    for tanggal, daftar_kelompok in rencana_hari_ini(datetime.now()):
+        for kelompok in daftar_kelompok:
+            parameter = {"tanggal": tanggal.strftime("%Y-%m-%d"), "kelompok": [kelompok]}
+            status = db.session.execute(
+                select(JobLatar.status).where(
+                    JobLatar.jenis == "alfa_otomatis", JobLatar.parameter == json.dumps(parameter),
+                )
+            ).scalars().all()
+            gagal = status.count("gagal")
+            if gagal == len(status) and gagal < MAKS_PERCOBAAN:
+                pelaksana.kirim("alfa_otomatis", **parameter)
+
+
+# ==============================================================================
+#  PERINTAH CLI
+# ==============================================================================
+@click.command("alfa-otomatis")
+@click.option("--tanggal", help="Tanggal (YYYY-MM-DD), default hari ini.")
+@click.option("--ulang", is_flag=True, help="Hapus Alfa otomatis tanggal tersebut lalu hitung ulang.")
+@with_appcontext
+def alfa_otomatis_command(tanggal, ulang):
+    """Simpan status Alfa untuk semua orang tanpa catatan absensi pada tanggal."""
+    tanggal = datetime.strptime(tanggal, "%Y-%m-%d").date() if tanggal else datetime.today().date()
+    libur = cek_hari_libur(tanggal)
+    if libur:
+        click.echo(f"Dilewati: {libur}")
+        return
+    hasil = materialisasi_alfa(tanggal, ulang=ulang)
+    db.session.commit()
+    click.echo(ringkasan(tanggal, hasil))
+
+
+def init_app(app):
+    """Daftarkan perintah Alfa otomatis ke Flask CLI."""
+    app.cli.add_command(alfa_otomatis_command)
\ No newline at end of file
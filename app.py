@@ -1,4 +1,6 @@
 import os
+import signal
+import threading
 from dotenv import load_dotenv
 import csv, io
 import json
@@ -7,9 +9,11 @@ from datetime import datetime, time, date
 
 from flask import (
     Flask, render_template, request, redirect, url_for, session,
-    send_file, jsonify, send_from_directory, flash, Response
+    send_file, jsonify, send_from_directory, flash, Response, current_app
 )
+from flask.cli import with_appcontext
 from PIL import Image, ImageDraw, ImageFont
+import click
 import pandas as pd, qrcode, requests
 from sqlalchemy import and_, select, delete, exc
 
@@ -18,61 +22,175 @@ from models import (
     Pegawai, AbsensiPegawai, SettingWaktuGuruStaf,
     SettingWaktuKeamanan, JadwalKeamanan, HariLibur
 )
+from pengaturan_cache import pengaturan_cache
+from notifikasi_wa import pengirim_wa
+from job_latar import pelaksana_job
+from profil_database import uri_database, opsi_engine
+from indeks_identitas import indeks_identitas
+import migrasi
+import rekap
+import alfa_otomatis
+import metrik
 from export_routes import export_bp
-from absensi_routes import absensi_bp, get_badge_color
+from absensi_routes import absensi_bp
 from dashboard_routes import dashboard_bp
 from kelola_kelas_routes import kelola_kelas_bp
-from scan_routes import scan_bp
+from scan_routes import scan_bp, kiosk_token_command
 from jadwal_keamanan_routes import jadwal_keamanan_bp
 from absensi_pegawai_routes import absensi_pegawai_bp
 from siswa_routes import siswa_bp
 from pegawai_routes import pegawai_bp
+from job_routes import job_bp
+from metrik_routes import metrik_bp
 
 # =======================================================================
-#  INISIALISASI APLIKASI FLASK
+#  INISIALISASI APLIKASI FLASK (APPLICATION FACTORY)
 # =======================================================================
 # Muat environment variables dari file .env
 load_dotenv()
 
-app = Flask(__name__)
-app.secret_key = "absensi_qr_secret"
+# Folder utama untuk QR
+BASE_QR_FOLDER = os.path.join('static', 'qr_codes')
 
-# ==============================================================================
-#  KONFIGURASI DATABASE DARI ENVIRONMENT VARIABLES (.env)
-# ==============================================================================
-# Ambil konfigurasi dari environment variables
-USER = os.getenv("DB_USER")
-PASSWORD = os.getenv("DB_PASSWORD")
-HOST = os.getenv("DB_HOST")
-DATABASE_NAME = os.getenv("DB_NAME")
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f'mysql+mysqlconnector://{USER}:{PASSWORD}@{HOST}/{DATABASE_NAME}'
-# ==============================================================================
+def create_app(inisialisasi_db=None, layanan_latar=None):
+    """
+    Buat aplikasi Flask. Tidak ada efek samping saat modul ini diimpor; semua
+    inisialisasi terjadi di sini, sekali per proses.
+
+    inisialisasi_db  Buat tabel yang belum ada (default dari INISIALISASI_DB, "1").
+                     Di gunicorn dilakukan sekali oleh proses master (gunicorn.conf.py).
+    layanan_latar    Jalankan dispatcher WA & worker job (default dari LAYANAN_LATAR, "1").
+                     Hanya satu proses per host yang menjalankannya (lihat
+                     ambil_kunci_layanan_latar). Di produksi (wsgi.py) default mati;
+                     job berjalan di proses terpisah: flask --app app job-worker.
+    """
+    if inisialisasi_db is None:
+        inisialisasi_db = os.getenv("INISIALISASI_DB", "1") == "1"
+    if layanan_latar is None:
+        layanan_latar = os.getenv("LAYANAN_LATAR", "1") == "1"
+
+    app = Flask(__name__)
+    app.secret_key = "absensi_qr_secret"
+
+    # ==============================================================================
+    #  KONFIGURASI DATABASE DARI ENVIRONMENT VARIABLES (.env)
+    # ==============================================================================
+    # URI dari DB_USER/DB_PASSWORD/DB_HOST/DB_NAME (atau DATABASE_URL), ukuran
+    # pool, recycle, pre-ping dan timeout dari profil_database.py
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri_database()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opsi_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+    # ==============================================================================
+
+    # Folder khusus siswa dan pegawai
+    app.config['QR_FOLDER_SISWA'] = os.path.join(BASE_QR_FOLDER, 'siswa')
+    app.config['QR_FOLDER_PEGAWAI'] = os.path.join(BASE_QR_FOLDER, 'pegawai')
+    # Folder cache PNG QR (nama file = hash isi QR + nama + role)
+    app.config['QR_FOLDER_CACHE'] = os.path.join(BASE_QR_FOLDER, 'cache')
+
+    # Inisialisasi database
+    db.init_app(app)
+    with app.app_context():
+        if inisialisasi_db:
+            db.create_all()
+        os.makedirs(app.config['QR_FOLDER_SISWA'], exist_ok=True)
+        os.makedirs(app.config['QR_FOLDER_PEGAWAI'], exist_ok=True)
+        os.makedirs(app.config['QR_FOLDER_CACHE'], exist_ok=True)
+
+    # Perintah CLI migrasi database (flask --app app migrasi-indeks)
+    migrasi.init_app(app)
+    rekap.init_app(app)
+    alfa_otomatis.init_app(app)
+
+    # Ukur durasi setiap permintaan HTTP (ditampilkan di /metrics)
+    metrik.init_app(app)
+
+    # Indeks identitas QR (siswa & pegawai) dimuat sekali saat aplikasi mulai
+    indeks_identitas.init_app(app)
+
+    # Dispatcher outbox WhatsApp dan worker job latar belakang (impor, regenerasi
+    # QR massal, ekspor besar) hanya berjalan di satu proses per host
+    jalankan_latar = layanan_latar and ambil_kunci_layanan_latar(app)
+    pengirim_wa.init_app(app, jalankan=jalankan_latar)
+    pelaksana_job.init_app(app, jalankan=jalankan_latar)
+
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(absensi_bp)
+    app.register_blueprint(kelola_kelas_bp)
+    app.register_blueprint(scan_bp)
+    app.register_blueprint(jadwal_keamanan_bp)
+    app.register_blueprint(absensi_pegawai_bp)
+    app.register_blueprint(siswa_bp)
+    app.register_blueprint(pegawai_bp)
+    app.register_blueprint(job_bp)
+    app.register_blueprint(metrik_bp)
+    app.jinja_env.filters['get_badge_color'] = get_badge_color
+
+    app.cli.add_command(job_worker_command)
+    app.cli.add_command(kiosk_token_command)
+    daftarkan_route_utama(app)
+    return app
+
+
+def ambil_kunci_layanan_latar(app):
+    """
+    True jika proses ini mendapat kunci file instance/layanan_latar.lock. Kunci
+    dipegang sampai proses berakhir; worker pengganti mengambil alih otomatis.
+    Tanpa fcntl (Windows, waitress satu proses) selalu True.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    os.makedirs(app.instance_path, exist_ok=True)
+    berkas = open(os.path.join(app.instance_path, "layanan_latar.lock"), "w")
+    try:
+        fcntl.flock(berkas, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        berkas.close()
+        return False
+    app.extensions["kunci_layanan_latar"] = berkas
+    return True
+
+
+@click.command("job-worker")
+@with_appcontext
+def job_worker_command():
+    """
+    Jalankan worker job latar (impor, ekspor, regenerasi QR, penjadwal berkala)
+    dan dispatcher WA di proses ini sampai dihentikan (Ctrl+C / SIGTERM).
+    Dijalankan terpisah dari server web agar job berat CPU tidak berbagi proses dengan scan.
+    """
+    app = current_app._get_current_object()
+    if "kunci_layanan_latar" not in app.extensions and not ambil_kunci_layanan_latar(app):
+        raise click.ClickException("Layanan latar sudah berjalan di proses lain (instance/layanan_latar.lock).")
+    pengirim_wa.init_app(app, jalankan=True)
+    pelaksana_job.init_app(app, jalankan=True)
+
+    berhenti = threading.Event()
+    for sinyal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinyal, lambda *_: berhenti.set())
+    click.echo(
+        f"Worker job berjalan ({pelaksana_job.jumlah_worker} thread), dispatcher WA "
+        f"{'aktif' if pengirim_wa.aktif else 'tidak aktif'}. Ctrl+C untuk berhenti."
+    )
+    while not berhenti.wait(1):
+        pass
+
+    click.echo("Menghentikan layanan latar...")
+    pengirim_wa.berhenti()
+    pelaksana_job.berhenti(timeout=30)
 
-# Folder utama untuk QR
-BASE_QR_FOLDER = os.path.join('static', 'qr_codes')
 
-# Folder khusus siswa dan pegawai
-app.config['QR_FOLDER_SISWA'] = os.path.join(BASE_QR_FOLDER, 'siswa')
-app.config['QR_FOLDER_PEGAWAI'] = os.path.join(BASE_QR_FOLDER, 'pegawai')
-
-# Inisialisasi database
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-    os.makedirs(app.config['QR_FOLDER_SISWA'], exist_ok=True)
-    os.makedirs(app.config['QR_FOLDER_PEGAWAI'], exist_ok=True)
-
-app.register_blueprint(dashboard_bp)
-app.register_blueprint(export_bp)
-app.register_blueprint(absensi_bp)
-app.jinja_env.filters['get_badge_color'] = get_badge_color
-app.register_blueprint(kelola_kelas_bp)
-app.register_blueprint(scan_bp)
-app.register_blueprint(jadwal_keamanan_bp)
-app.register_blueprint(absensi_pegawai_bp)
-app.register_blueprint(siswa_bp)
-app.register_blueprint(pegawai_bp)
+def daftarkan_route_utama(app):
+    """Route di luar blueprint; nama endpoint tetap (url_for('login'), url_for('pengaturan'), ...)."""
+    app.add_url_rule("/", view_func=login, methods=["GET", "POST"])
+    app.add_url_rule("/logout", view_func=logout)
+    app.add_url_rule("/pengaturan", view_func=pengaturan, methods=["GET", "POST"])
+    app.add_url_rule("/hari_libur", view_func=kelola_hari_libur, methods=["POST"])
+    app.add_url_rule("/api/setting_siswa", view_func=api_get_setting_siswa, methods=["GET"])
+    app.add_url_rule("/pengaturan_pegawai", view_func=pengaturan_pegawai, methods=["GET", "POST"])
 
 # =======================================================================
 #  FUNGSI HELPER & UTILITAS (TIDAK BERUBAH)
@@ -84,12 +202,10 @@ def check_admin_session():
 def get_badge_color(status):
     """Tentukan warna badge berdasarkan status untuk filter Jinja2."""
     return 'success' if status in ['Hadir', 'Terlambat'] else 'warning text-dark' if status == 'Izin' else 'info text-dark' if status == 'Sakit' else 'danger'
-app.jinja_env.filters['get_badge_color'] = get_badge_color
 
 # =======================================================================
 #  ROUTE: AUTENTIKASI ADMIN (TIDAK BERUBAH)
 # =======================================================================
-@app.route("/", methods=["GET", "POST"])
 def login():
     """Rute login admin."""
     if request.method == "POST":
@@ -105,7 +221,6 @@ def login():
         return redirect(url_for("login"))
     return render_template("login.html")
 
-@app.route("/logout")
 def logout():
     """Rute logout, hapus sesi admin."""
     session.clear()
@@ -115,7 +230,6 @@ def logout():
 # =======================================================================
 #  ROUTE: PENGATURAN UMUM (GET / POST)
 # =======================================================================
-@app.route("/pengaturan", methods=["GET", "POST"])
 def pengaturan():
     """Tampilkan dan kelola halaman pengaturan."""
     auth_check = check_admin_session()
@@ -154,6 +268,7 @@ def pengaturan():
                 db.session.rollback()
                 flash(f"Gagal menyimpan pengaturan siswa: {str(e)}", "danger")
 
+        pengaturan_cache.invalidate()
         return redirect(url_for("pengaturan"))
 
     # --- LOGIKA GET (MENAMPILKAN SEMUA DATA PENGATURAN) ---
@@ -186,7 +301,6 @@ def pengaturan():
 # =======================================================================
 #  ROUTE BARU: KELOLA HARI LIBUR (HANYA POST)
 # =======================================================================
-@app.route("/hari_libur", methods=["POST"])
 def kelola_hari_libur():
     auth_check = check_admin_session()
     if auth_check: return auth_check
@@ -236,12 +350,12 @@ def kelola_hari_libur():
         else:
             flash("Hari libur tidak ditemukan.", "danger")
 
+    pengaturan_cache.invalidate()
     return redirect(url_for("pengaturan"))
 
 # =======================================================================
 #  ROUTE LAINNYA (TIDAK BERUBAH)
 # =======================================================================
-@app.route("/api/setting_siswa", methods=["GET"])
 def api_get_setting_siswa():
     auth_check = check_admin_session()
     if auth_check:
@@ -257,7 +371,6 @@ def api_get_setting_siswa():
     }
     return jsonify(data)
 
-@app.route("/pengaturan_pegawai", methods=["GET", "POST"])
 def pengaturan_pegawai():
     auth_check = check_admin_session()
     if auth_check:
@@ -332,10 +445,15 @@ def pengaturan_pegawai():
             db.session.rollback()
             flash(f"Terjadi kesalahan saat menyimpan: {str(e)}", "danger")
 
+        pengaturan_cache.invalidate()
+
     return redirect(url_for("pengaturan"))
 
 # =======================================================================
 #  MAIN EXECUTION
 # =======================================================================
+# Server pengembangan (satu proses). Untuk gerbang/produksi gunakan wsgi.py:
+#   gunicorn -c gunicorn.conf.py wsgi:app   (Linux, multi-proses)
+#   python wsgi.py                          (Windows, waitress)
 if __name__ == "__main__":
-    app.run(debug=False, host="0.0.0.0", port=5001)
\ No newline at end of file
+    create_app().run(debug=False, host="0.0.0.0", port=5001)
\ No newline at end of file
@@ -0,0 +1,476 @@
+# ======================== BENCHMARK BEBAN PUNCAK SCAN PAGI ========================
+# Berkas ini mengisi database KHUSUS BENCHMARK dengan volume realistis (default
+# 2.000 siswa, 150 pegawai, satu tahun data absensi), lalu:
+#   1. menembakkan scan submit_scan serentak (semua siswa & pegawai + sebagian
+#      scan ganda) dan melaporkan throughput serta latensi p50/p95/p99;
+#   2. mengukur route admin yang berat (dashboard, absensi, download_laporan);
+#   3. mengukur impor CSV siswa dan pegawai (route + job latar sampai selesai).
+#
+# Contoh:
+#   python benchmark.py                                   # SQLite benchmark.db, test client
+#   python benchmark.py --mode wsgi --konkurensi 16       # lewat server WSGI lokal (HTTP)
+#   python benchmark.py --db mysql+mysqlconnector://u:p@localhost/absensi_bench --isi-ulang
+#   python benchmark.py --simpan baseline.json            # simpan hasil sebagai baseline
+#   python benchmark.py --banding baseline.json           # bandingkan dengan baseline
+#
+# PERHATIAN: database --db diisi ulang dan absensi hari ini dihapus setiap kali
+# benchmark scan dijalankan. Jangan arahkan ke database produksi.
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time as _time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+
+# ==============================================================================
+#  UTILITAS
+# ==============================================================================
+def kuantil(data_terurut, q):
+    """Kuantil nearest-rank dari daftar yang sudah diurutkan."""
+    if not data_terurut:
+        return None
+    return data_terurut[max(0, math.ceil(q * len(data_terurut)) - 1)]
+
+
+def ringkas_latensi(daftar_detik):
+    data = sorted(daftar_detik)
+    return {
+        "jumlah": len(data),
+        "p50_ms": round(kuantil(data, 0.50) * 1000, 2) if data else None,
+        "p95_ms": round(kuantil(data, 0.95) * 1000, 2) if data else None,
+        "p99_ms": round(kuantil(data, 0.99) * 1000, 2) if data else None,
+        "maks_ms": round(data[-1] * 1000, 2) if data else None,
+    }
+
+
+def cetak_judul(judul):
+    print(f"\n=== {judul} ===")
+
+
+# ==============================================================================
+#  PENGISIAN DATA
+# ==============================================================================
+def isi_data(jumlah_siswa, jumlah_pegawai, jumlah_hari, acak):
+    """Buat ulang seluruh tabel lalu isi kelas, siswa, pegawai, pengaturan dan riwayat absensi."""
+    from sqlalchemy import insert
+    from models import (
+        db, Kelas, Siswa, Pegawai, Absensi, AbsensiPegawai, JadwalKeamanan,
+        SettingWaktu, SettingWaktuGuruStaf, SettingWaktuKeamanan,
+    )
+    from rekap import rebuild_rekap
+
+    mulai = _time.perf_counter()
+    db.drop_all()
+    db.create_all()
+
+    # 36 kelas (X-1 .. XII-12), siswa dibagi rata
+    nama_kelas = [f"{tingkat}-{n}" for tingkat in ("X", "XI", "XII") for n in range(1, 13)]
+    db.session.execute(insert(Kelas), [{"nama": nama} for nama in nama_kelas])
+    id_kelas = [k.id for k in Kelas.query.order_by(Kelas.id).all()]
+
+    siswa = [
+        {
+            "nis": f"{240000 + i}", "nama": f"Siswa {i:04d}", "kelas_id": id_kelas[i % len(id_kelas)],
+            # Sebagian besar siswa punya nomor orang tua (jalur outbox WA ikut terukur)
+            "no_hp_ortu": f"0812{i:07d}" if acak.random() < 0.8 else None,
+        }
+        for i in range(jumlah_siswa)
+    ]
+    db.session.execute(insert(Siswa), siswa)
+
+    jumlah_keamanan = max(1, jumlah_pegawai // 15)
+    jumlah_staf = jumlah_pegawai // 5
+    pegawai = (
+        [{"no_id": f"K{i:03d}", "nama": f"Satpam {i:03d}", "role": "keamanan"} for i in range(jumlah_keamanan)]
+        + [{"no_id": f"S{i:03d}", "nama": f"Staf {i:03d}", "role": "staf"} for i in range(jumlah_staf)]
+        + [{"no_id": f"G{i:03d}", "nama": f"Guru {i:03d}", "role": "guru"}
+           for i in range(jumlah_pegawai - jumlah_keamanan - jumlah_staf)]
+    )
+    db.session.execute(insert(Pegawai), pegawai)
+
+    # Jendela waktu sepanjang hari dan tanpa libur rutin, agar scan selalu
+    # diproses penuh kapan pun benchmark dijalankan
+    sepanjang_hari = dict(
+        jam_masuk_mulai=time(0, 0), jam_masuk_selesai=time(23, 59, 58),
+        jam_pulang_mulai=time(23, 59, 59), jam_pulang_selesai=time(23, 59, 59),
+    )
+    db.session.add(SettingWaktu(hari_libur_rutin="", **sepanjang_hari))
+    db.session.add(SettingWaktuGuruStaf(**sepanjang_hari))
+    db.session.add(SettingWaktuKeamanan(nama_shift="Pagi", **sepanjang_hari))
+    hari_ini = date.today()
+    db.session.execute(insert(JadwalKeamanan), [
+        {"pegawai_id": p.id, "tanggal": tanggal, "shift": "Pagi"}
+        for p in Pegawai.query.filter_by(role="keamanan")
+        for tanggal in (hari_ini - timedelta(days=1), hari_ini)
+    ])
+    db.session.commit()
+
+    # Riwayat absensi hari kerja (Senin-Sabtu) sebelum hari ini
+    jumlah_baris = 0
+    for mundur in range(jumlah_hari, 0, -1):
+        tanggal = hari_ini - timedelta(days=mundur)
+        if tanggal.weekday() == 6:
+            continue
+        for model, kolom, daftar in ((Absensi, "nis", siswa), (AbsensiPegawai, "no_id", pegawai)):
+            baris = []
+            for orang in daftar:
+                for jenis_absen, status, jam in _catatan_acak(acak):
+                    baris.append({
+                        kolom: orang[kolom], "tanggal": tanggal, "waktu": jam,
+                        "status": status, "jenis_absen": jenis_absen,
+                    })
+            db.session.execute(insert(model), baris)
+            jumlah_baris += len(baris)
+        db.session.commit()
+
+    rebuild_rekap()
+    print(f"Data diisi: {jumlah_siswa} siswa, {len(pegawai)} pegawai, {jumlah_baris} baris absensi "
+          f"({_time.perf_counter() - mulai:.1f} detik).")
+
+
+def _catatan_acak(acak):
+    """Catatan satu orang pada satu hari: (jenis_absen, status, waktu)."""
+    r = acak.random()
+    if r < 0.88:
+        return [("masuk", "Hadir", time(6, acak.randrange(60))), ("pulang", "Hadir", time(15, acak.randrange(60)))]
+    if r < 0.93:
+        return [("masuk", "Terlambat", time(7, acak.randrange(15, 60))), ("pulang", "Hadir", time(15, 30))]
+    return [("lainnya", "Sakit" if r < 0.96 else "Izin" if r < 0.98 else "Alfa", time(8, 0))]
+
+
+def reset_hari_ini():
+    """Hapus absensi & outbox hari ini agar setiap putaran scan dimulai dari kosong."""
+    from sqlalchemy import delete
+    from models import db, Absensi, AbsensiPegawai, NotifikasiWA
+    from rekap import rebuild_rekap
+
+    hari_ini = date.today()
+    db.session.execute(delete(Absensi).where(Absensi.tanggal == hari_ini))
+    db.session.execute(delete(AbsensiPegawai).where(AbsensiPegawai.tanggal == hari_ini))
+    db.session.execute(delete(NotifikasiWA))
+    db.session.commit()
+    rebuild_rekap(hari_ini, hari_ini)
+
+
+def invalidate_cache():
+    from pengaturan_cache import pengaturan_cache
+    from roster_keamanan import roster_keamanan
+    from indeks_identitas import indeks_identitas
+
+    pengaturan_cache.invalidate()
+    roster_keamanan.invalidate()
+    indeks_identitas.invalidate()
+
+
+# ==============================================================================
+#  KLIEN (TEST CLIENT ATAU HTTP KE SERVER WSGI LOKAL)
+# ==============================================================================
+class KlienTest:
+    """Satu Flask test client per thread."""
+
+    def __init__(self, app, admin=False):
+        self._app, self._admin = app, admin
+        self._lokal = threading.local()
+
+    def _klien(self):
+        klien = getattr(self._lokal, "klien", None)
+        if klien is None:
+            klien = self._lokal.klien = self._app.test_client()
+            if self._admin:
+                with klien.session_transaction() as sesi:
+                    sesi["admin"] = True
+        return klien
+
+    def post(self, url, **kwargs):
+        r = self._klien().post(url, buffered=True, **kwargs)
+        return r.status_code, r.get_json(silent=True)
+
+    def get(self, url):
+        r = self._klien().get(url, buffered=True)
+        return r.status_code, len(r.get_data())
+
+
+class KlienWSGI:
+    """HTTP ke server WSGI lokal (werkzeug, threaded), satu requests.Session per thread."""
+
+    def __init__(self, server, admin=False):
+        self._basis = f"http://127.0.0.1:{server.server_port}"
+        self._admin = admin
+        self._lokal = threading.local()
+
+    def _sesi(self):
+        import requests
+
+        sesi = getattr(self._lokal, "sesi", None)
+        if sesi is None:
+            sesi = self._lokal.sesi = requests.Session()
+            if self._admin:
+                sesi.post(f"{self._basis}/", data=_kredensial_admin(), allow_redirects=False)
+        return sesi
+
+    def post(self, url, **kwargs):
+        r = self._sesi().post(self._basis + url, allow_redirects=False, **kwargs)
+        try:
+            return r.status_code, r.json()
+        except ValueError:
+            return r.status_code, None
+
+    def get(self, url):
+        r = self._sesi().get(self._basis + url, allow_redirects=False)
+        return r.status_code, len(r.content)
+
+
+def _kredensial_admin():
+    # Sama dengan route login di app.py
+    return {"username": os.getenv("ADMIN_USERNAME", "admin"), "password": os.getenv("ADMIN_PASSWORD", "123")}
+
+
+# ==============================================================================
+#  BENCHMARK
+# ==============================================================================
+def benchmark_scan(app, klien, args, acak):
+    """Semua siswa & pegawai scan sekali (urutan acak) ditambah sebagian scan ganda."""
+    from models import Siswa, Pegawai
+    import metrik
+
+    with app.app_context():
+        reset_hari_ini()
+        invalidate_cache()
+        muatan = [f"S{nis}" for (nis,) in Siswa.query.with_entities(Siswa.nis)]
+        muatan += [f"P{no_id}" for (no_id,) in Pegawai.query.with_entities(Pegawai.no_id)]
+    acak.shuffle(muatan)
+    muatan += acak.sample(muatan, int(len(muatan) * args.duplikat))
+    if args.scan:
+        muatan = muatan[:args.scan]
+
+    def satu_scan(qr_data):
+        mulai = _time.perf_counter()
+        kode, body = klien.post("/scan/submit_scan", data={"qr_data": qr_data})
+        durasi = _time.perf_counter() - mulai
+        return durasi, (body or {}).get("status", f"http_{kode}")
+
+    mulai = _time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.konkurensi) as eksekutor:
+        hasil = list(eksekutor.map(satu_scan, muatan))
+    total = _time.perf_counter() - mulai
+
+    ringkasan = ringkas_latensi([durasi for durasi, _ in hasil])
+    ringkasan.update(
+        konkurensi=args.konkurensi,
+        throughput_per_detik=round(len(hasil) / total, 1),
+        durasi_detik=round(total, 2),
+        hasil=dict(Counter(status for _, status in hasil)),
+        tahap_server_p95_ms={
+            nama: round(nilai * 1000, 2)
+            for nama in ("validasi", "simpan", "commit")
+            if (nilai := metrik.durasi_tahap.kuantil(0.95, jalur="scan", tahap=nama)) is not None
+        },
+    )
+
+    cetak_judul(f"Scan serentak ({args.mode}, konkurensi {args.konkurensi})")
+    print(f"{ringkasan['jumlah']} scan dalam {ringkasan['durasi_detik']} detik "
+          f"= {ringkasan['throughput_per_detik']} scan/detik")
+    print(f"latensi p50 {ringkasan['p50_ms']} ms | p95 {ringkasan['p95_ms']} ms | "
+          f"p99 {ringkasan['p99_ms']} ms | maks {ringkasan['maks_ms']} ms")
+    print(f"hasil: {ringkasan['hasil']}")
+    print(f"tahap server p95 (perkiraan histogram): {ringkasan['tahap_server_p95_ms']}")
+    return ringkasan
+
+
+def daftar_route():
+    """Route admin yang diukur: (nama, url)."""
+    hari_ini = date.today()
+    bulan_lalu = hari_ini.replace(day=1) - timedelta(days=1)
+    periode = f"bulan={bulan_lalu.month}&tahun={bulan_lalu.year}"
+    return [
+        ("dashboard", "/dashboard/"),
+        ("dashboard_api_statistik", "/dashboard/api/statistik"),
+        ("dashboard_api_tren_365", "/dashboard/api/tren?hari=365"),
+        ("absensi_siswa", "/absensi/"),
+        ("absensi_siswa_alfa", "/absensi/?status=Alfa"),
+        ("absensi_pegawai", "/absensi_pegawai/"),
+        ("laporan_bulanan_csv", f"/export/download_laporan?tipe_data=siswa&jenis_laporan=bulanan&{periode}&format_file=csv"),
+        ("laporan_bulanan_xlsx", f"/export/download_laporan?tipe_data=siswa&jenis_laporan=bulanan&{periode}&format_file=xlsx"),
+        ("rekap_bulanan_xlsx", f"/export/download_laporan?tipe_data=siswa&jenis_laporan=rekap_bulanan&{periode}&format_file=xlsx"),
+    ]
+
+
+def benchmark_route(klien, args):
+    cetak_judul(f"Route admin ({args.ulang}x per route)")
+    hasil = {}
+    for nama, url in daftar_route():
+        durasi, kode, ukuran = [], None, 0
+        for _ in range(args.ulang):
+            mulai = _time.perf_counter()
+            kode, ukuran = klien.get(url)
+            durasi.append(_time.perf_counter() - mulai)
+        hasil[nama] = dict(ringkas_latensi(durasi), kode=kode, ukuran_byte=ukuran)
+        print(f"{nama:<26} p50 {hasil[nama]['p50_ms']:>9} ms | p95 {hasil[nama]['p95_ms']:>9} ms | "
+              f"HTTP {kode} | {ukuran} byte")
+    return hasil
+
+
+def benchmark_impor(app, klien, args, acak):
+    """Impor CSV lewat route (job dikirim) lalu jalankan job-nya sampai selesai."""
+    from models import Kelas, Siswa
+    from job_latar import pelaksana_job
+
+    with app.app_context():
+        nama_kelas = [k.nama for k in Kelas.query.all()]
+        nis_lama = [nis for (nis,) in Siswa.query.with_entities(Siswa.nis).limit(args.impor // 2)]
+
+    # Separuh baris memperbarui siswa lama, separuh siswa baru
+    baris = ["nis,nama,kelas,no_hp"]
+    nis_baru = [f"9{acak.randrange(10 ** 8):08d}" for _ in range(args.impor - len(nis_lama))]
+    for i, nis in enumerate(nis_lama + nis_baru):
+        baris.append(f"{nis},Impor {i:04d},{acak.choice(nama_kelas)},0813{i:07d}")
+    csv_siswa = "\n".join(baris).encode()
+    csv_pegawai = "\n".join(
+        ["no_id,nama,role"] + [f"B{acak.randrange(10 ** 6):06d},Pegawai Impor {i},guru" for i in range(args.impor // 10)]
+    ).encode()
+
+    cetak_judul("Impor CSV")
+    hasil = {}
+    for nama, url, isi in (
+        ("impor_siswa", "/siswa/import_siswa", csv_siswa),
+        ("impor_pegawai", "/pegawai/import", csv_pegawai),
+    ):
+        mulai = _time.perf_counter()
+        kode, _ = klien.post(url, data={"csv_file": (io.BytesIO(isi), f"{nama}.csv")},
+                             content_type="multipart/form-data")
+        durasi_route = _time.perf_counter() - mulai
+        with app.app_context():
+            while pelaksana_job.jalankan_berikutnya():
+                pass
+        durasi_total = _time.perf_counter() - mulai
+        hasil[nama] = {"baris": isi.count(b"\n"), "route_ms": round(durasi_route * 1000, 2),
+                       "total_ms": round(durasi_total * 1000, 2), "kode": kode}
+        print(f"{nama:<26} {hasil[nama]['baris']} baris | route {hasil[nama]['route_ms']} ms | "
+              f"sampai job selesai {hasil[nama]['total_ms']} ms")
+    return hasil
+
+
+def bandingkan(hasil, baseline):
+    """Cetak selisih persen metrik utama terhadap baseline (+ berarti lebih lambat)."""
+    cetak_judul("Banding dengan baseline")
+
+    def baris(nama, sekarang, dulu, satuan, lebih_besar_lebih_baik=False):
+        if sekarang is None or not dulu:
+            return
+        selisih = (sekarang - dulu) / dulu * 100
+        tanda = "lebih baik" if (selisih > 0) == lebih_besar_lebih_baik else "lebih buruk"
+        print(f"{nama:<40} {dulu:>10} -> {sekarang:>10} {satuan} ({selisih:+.1f}%, {tanda})")
+
+    scan, scan_dulu = hasil.get("scan"), baseline.get("scan")
+    if scan and scan_dulu:
+        baris("scan throughput", scan["throughput_per_detik"], scan_dulu["throughput_per_detik"], "/detik", True)
+        for q in ("p50_ms", "p95_ms", "p99_ms"):
+            baris(f"scan {q}", scan[q], scan_dulu[q], "ms")
+    for nama, data in (hasil.get("route") or {}).items():
+        dulu = (baseline.get("route") or {}).get(nama)
+        if dulu:
+            baris(f"{nama} p95_ms", data["p95_ms"], dulu["p95_ms"], "ms")
+    for nama, data in (hasil.get("impor") or {}).items():
+        dulu = (baseline.get("impor") or {}).get(nama)
+        if dulu:
+            baris(f"{nama} total_ms", data["total_ms"], dulu["total_ms"], "ms")
+
+
+# ==============================================================================
+#  MAIN
+# ==============================================================================
+def baca_argumen():
+    parser = argparse.ArgumentParser(description="Benchmark beban puncak scan pagi dan route admin.")
+    parser.add_argument("--db", default="sqlite:///" + os.path.abspath("benchmark.db"),
+                        help="URI database khusus benchmark (default: SQLite benchmark.db).")
+    parser.add_argument("--isi-ulang", action="store_true", help="Hapus dan isi ulang data walaupun sudah ada.")
+    parser.add_argument("--siswa", type=int, default=2000)
+    parser.add_argument("--pegawai", type=int, default=150)
+    parser.add_argument("--hari", type=int, default=365, help="Jumlah hari riwayat absensi.")
+    parser.add_argument("--mode", choices=("testclient", "wsgi"), default="testclient")
+    parser.add_argument("--konkurensi", type=int, default=8)
+    parser.add_argument("--scan", type=int, default=0, help="Batasi jumlah scan (0 = semua orang).")
+    parser.add_argument("--duplikat", type=float, default=0.05, help="Porsi scan ganda (default 0.05).")
+    parser.add_argument("--ulang", type=int, default=5, help="Pengulangan per route admin.")
+    parser.add_argument("--impor", type=int, default=500, help="Jumlah baris CSV impor siswa.")
+    parser.add_argument("--lewati", nargs="*", default=[], choices=("scan", "route", "impor"))
+    parser.add_argument("--acak", type=int, default=42, help="Seed acak agar hasil dapat diulang.")
+    parser.add_argument("--simpan", help="Simpan hasil ke file JSON (baseline).")
+    parser.add_argument("--banding", help="Bandingkan dengan file JSON baseline.")
+    return parser.parse_args()
+
+
+def main():
+    args = baca_argumen()
+    acak = random.Random(args.acak)
+
+    # Dibaca oleh create_app(); dispatcher WA dan worker job tidak dijalankan,
+    # job impor dieksekusi langsung oleh benchmark
+    os.environ["DATABASE_URL"] = args.db
+
+    from app import create_app
+    from models import Siswa
+
+    app = create_app(inisialisasi_db=True, layanan_latar=False)
+
+    # File QR hasil benchmark tidak mencampuri folder static aplikasi
+    folder_qr = tempfile.mkdtemp(prefix="benchmark_qr_")
+    for kunci in ("QR_FOLDER_SISWA", "QR_FOLDER_PEGAWAI", "QR_FOLDER_CACHE"):
+        app.config[kunci] = os.path.join(folder_qr, kunci.lower())
+
+    with app.app_context():
+        if args.isi_ulang or Siswa.query.count() == 0:
+            isi_data(args.siswa, args.pegawai, args.hari, acak)
+        invalidate_cache()
+
+    server = None
+    if args.mode == "wsgi":
+        import logging
+        from werkzeug.serving import make_server
+
+        # Log per permintaan dari werkzeug membanjiri output dan ikut memperlambat server
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        klien, klien_admin = KlienWSGI(server), KlienWSGI(server, admin=True)
+    else:
+        klien, klien_admin = KlienTest(app), KlienTest(app, admin=True)
+
+    hasil = {
+        "waktu": datetime.now().isoformat(timespec="seconds"),
+        "db": app.config["SQLALCHEMY_DATABASE_URI"].split("://")[0],
+        "mode": args.mode,
+    }
+    try:
+        if "scan" not in args.lewati:
+            hasil["scan"] = benchmark_scan(app, klien, args, acak)
+        if "route" not in args.lewati:
+            hasil["route"] = benchmark_route(klien_admin, args)
+        if "impor" not in args.lewati:
+            # Impor selalu lewat test client: durasinya didominasi job, bukan HTTP
+            hasil["impor"] = benchmark_impor(app, KlienTest(app, admin=True), args, acak)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    if args.simpan:
+        with open(args.simpan, "w", encoding="utf-8") as f:
+            json.dump(hasil, f, indent=2, default=str)
+        print(f"\nHasil disimpan ke {args.simpan}")
+    if args.banding:
+        with open(args.banding, encoding="utf-8") as f:
+            bandingkan(hasil, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
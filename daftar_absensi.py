@@ -0,0 +1,149 @@
+# ======================== DAFTAR ABSENSI HARIAN (PAGINASI) ========================
+# Berkas ini menyusun tabel absensi harian (siswa maupun pegawai) dengan satu
+# query LEFT JOIN: setiap orang digabung dengan catatan 'masuk', 'pulang' dan
+# 'lainnya' pada tanggal tersebut. Filter status, urutan jam datang dan paginasi
+# keyset dikerjakan database, sehingga satu halaman hanya memuat sejumlah baris.
+
+from datetime import time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select, func, case, and_, or_, literal
+from sqlalchemy.orm import aliased
+
+from db_utils import encode_cursor, decode_cursor, setelah_cursor
+from models import db, Siswa, Kelas, Pegawai
+from rekap import sumber_absensi
+
+# Jumlah baris per halaman (bawaan dan batas atas parameter per_halaman)
+PER_HALAMAN_DEFAULT = 100
+PER_HALAMAN_MAKS = 500
+
+
+class CatatanAbsen(NamedTuple):
+    """Satu catatan absensi yang ditampilkan (masuk atau pulang)."""
+    status: str
+    waktu: Optional[time]
+    jenis_absen: str
+
+
+class BarisAbsensi(NamedTuple):
+    """Satu baris tabel absensi harian. masuk/pulang None jika belum ada catatan."""
+    id: int
+    no_id: str
+    nama: str
+    grup: Optional[str]
+    masuk: Optional[CatatanAbsen]
+    pulang: Optional[CatatanAbsen]
+
+
+def _catatan(baris, prefiks):
+    jenis = getattr(baris, f"{prefiks}_jenis")
+    if jenis is None:
+        return None
+    return CatatanAbsen(getattr(baris, f"{prefiks}_status"), getattr(baris, f"{prefiks}_waktu"), jenis)
+
+
+def daftar_absensi_harian(tipe, tanggal, status=None, cari_nama=None, grup=None,
+                          cursor=None, per_halaman=PER_HALAMAN_DEFAULT):
+    """
+    Satu halaman absensi harian untuk tipe 'siswa' atau 'pegawai'.
+    grup = kelas_id (siswa) atau role (pegawai). Urutan: yang sudah absen
+    menurut jam datang, lalu yang belum, masing-masing menurut nama.
+    Mengembalikan dict {baris, total, cursor_berikutnya}.
+    """
+    sumber = sumber_absensi(tipe)
+    Orang, kolom_id, Model, kolom_id_absen = sumber.orang, sumber.kolom_orang, sumber.model, sumber.kolom_id
+    # Grup yang ditampilkan: nama kelas (siswa) atau role (pegawai)
+    kolom_grup = Kelas.nama if tipe == "siswa" else Pegawai.role
+    masuk, pulang, lainnya = aliased(Model), aliased(Model), aliased(Model)
+
+    def gabung(query, alias, jenis):
+        id_absen = getattr(alias, kolom_id_absen.key)
+        return query.outerjoin(alias, and_(
+            id_absen == kolom_id, alias.tanggal == tanggal, alias.jenis_absen == jenis,
+        ))
+
+    # Catatan 'lainnya' (Sakit/Izin/Alfa dari admin) menggantikan masuk dan pulang
+    status_masuk = func.coalesce(lainnya.status, masuk.status)
+    waktu_masuk = case((lainnya.id.isnot(None), lainnya.waktu), else_=masuk.waktu)
+    belum_absen = case((status_masuk.is_(None), 1), else_=0)
+    urutan = [belum_absen, func.coalesce(waktu_masuk, literal(time(0), masuk.waktu.type)), Orang.nama, Orang.id]
+
+    query = select(
+        Orang.id, kolom_id.label("no_id"), Orang.nama, kolom_grup.label("grup"),
+        masuk.status.label("masuk_status"), masuk.waktu.label("masuk_waktu"),
+        masuk.jenis_absen.label("masuk_jenis"),
+        pulang.status.label("pulang_status"), pulang.waktu.label("pulang_waktu"),
+        pulang.jenis_absen.label("pulang_jenis"),
+        lainnya.status.label("lainnya_status"), lainnya.waktu.label("lainnya_waktu"),
+        lainnya.jenis_absen.label("lainnya_jenis"),
+        urutan[0].label("k_belum"), urutan[1].label("k_waktu"),
+    )
+    if tipe == "siswa":
+        query = query.join(Kelas, Siswa.kelas_id == Kelas.id)
+    for alias, jenis in ((masuk, "masuk"), (pulang, "pulang"), (lainnya, "lainnya")):
+        query = gabung(query, alias, jenis)
+
+    if cari_nama:
+        query = query.where(Orang.nama.ilike(f"%{cari_nama}%"))
+    if grup:
+        query = query.where(Siswa.kelas_id == grup if tipe == "siswa" else Pegawai.role == grup)
+    if status == "Alfa":
+        # Tanpa catatan sama sekali juga dihitung Alfa
+        query = query.where(or_(status_masuk.is_(None), status_masuk == "Alfa"))
+    elif status:
+        query = query.where(status_masuk == status)
+
+    total = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+
+    nilai_cursor = decode_cursor(cursor)
+    if nilai_cursor and len(nilai_cursor) == len(urutan):
+        try:
+            nilai_cursor[1] = time.fromisoformat(nilai_cursor[1])
+        except (TypeError, ValueError):
+            nilai_cursor = None  # Cursor rusak: mulai dari halaman pertama
+        if nilai_cursor:
+            query = query.where(setelah_cursor(urutan, nilai_cursor))
+
+    hasil = db.session.execute(query.order_by(*urutan).limit(per_halaman + 1)).all()
+    ada_berikutnya = len(hasil) > per_halaman
+    hasil = hasil[:per_halaman]
+
+    baris = []
+    for r in hasil:
+        catatan_lain = _catatan(r, "lainnya")
+        baris.append(BarisAbsensi(
+            r.id, r.no_id, r.nama, r.grup,
+            catatan_lain or _catatan(r, "masuk"),
+            catatan_lain or _catatan(r, "pulang"),
+        ))
+
+    cursor_berikutnya = None
+    if ada_berikutnya:
+        akhir = hasil[-1]
+        cursor_berikutnya = encode_cursor([akhir.k_belum, akhir.k_waktu.isoformat(), akhir.nama, akhir.id])
+    return {"baris": baris, "total": total, "cursor_berikutnya": cursor_berikutnya}
+
+
+def baca_per_halaman(nilai):
+    """Parameter per_halaman dari URL, dibatasi 1..PER_HALAMAN_MAKS."""
+    try:
+        return max(1, min(int(nilai), PER_HALAMAN_MAKS))
+    except (TypeError, ValueError):
+        return PER_HALAMAN_DEFAULT
+
+
+def baris_ke_dict(baris):
+    """Bentuk JSON satu BarisAbsensi (untuk API refresh otomatis)."""
+    def catatan(c):
+        if c is None:
+            return None
+        return {
+            "status": c.status,
+            "waktu": c.waktu.strftime("%H:%M:%S") if c.waktu else None,
+            "jenis_absen": c.jenis_absen,
+        }
+    return {
+        "no_id": baris.no_id, "nama": baris.nama, "grup": baris.grup,
+        "masuk": catatan(baris.masuk), "pulang": catatan(baris.pulang),
+    }
\ No newline at end of file
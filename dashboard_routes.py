@@ -1,7 +1,11 @@
-import calendar
-from datetime import datetime, time
-from flask import Blueprint, render_template
-from models import SettingWaktu, Siswa, Kelas, Absensi, Pegawai, AbsensiPegawai, HariLibur
+import json
+import queue
+import time as _time
+from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, jsonify, Response, current_app
+from rekap import ambil_tren
+from siaran_dashboard import siaran_dashboard
+from statistik import statistik_harian
 from utils import check_admin_session
 
 dashboard_bp = Blueprint("dashboard_bp", __name__, url_prefix="/dashboard")
@@ -16,116 +20,125 @@ def dashboard():
     if auth_check:
         return auth_check
 
-    # --- Variabel Global ---
-    hari_ini = datetime.today().date()
-    nama_hari_ini_en = calendar.day_name[hari_ini.weekday()]
-    
-    # Konversi nama hari ke Bahasa Indonesia
-    daftar_hari_id = {
-        'Monday': 'Senin', 'Tuesday': 'Selasa', 'Wednesday': 'Rabu',
-        'Thursday': 'Kamis', 'Friday': 'Jumat', 'Saturday': 'Sabtu', 'Sunday': 'Minggu'
-    }
-    nama_hari_ini_id = daftar_hari_id.get(nama_hari_ini_en, nama_hari_ini_en)
-    
-    info_hari_ini = None # Variabel untuk pesan libur
-
-    # ==============================================================================
-    #  INTEGRASI: Lakukan Pengecekan Hari Libur Berlapis
-    # ==============================================================================
-    setting_waktu = SettingWaktu.query.first()
-    
-    # 1. Cek Libur Rutin (Mingguan)
-    if setting_waktu and setting_waktu.hari_libur_rutin:
-        libur_rutin = setting_waktu.hari_libur_rutin.split(',')
-        if nama_hari_ini_id in libur_rutin:
-            info_hari_ini = f"Hari {nama_hari_ini_id} adalah hari libur rutin."
-
-    # 2. Cek Libur Spesial (Tanggal Merah), jika bukan libur rutin
-    if not info_hari_ini:
-        libur_spesial = HariLibur.query.filter_by(tanggal=hari_ini).first()
-        if libur_spesial:
-            info_hari_ini = f"Hari ini libur: {libur_spesial.keterangan}."
-
-    # ==============================================================================
-    #  LOGIKA PERHITUNGAN STATISTIK
-    # ==============================================================================
-
-    # Jika hari ini libur, set semua statistik ke 0
-    if info_hari_ini:
-        total_hadir_tepat_siswa = 0
-        total_terlambat_siswa = 0
-        total_sakit_siswa = 0
-        total_izin_siswa = 0
-        total_alfa_siswa = 0
-        total_hadir_tepat_pegawai = 0
-        total_terlambat_pegawai = 0
-        total_sakit_pegawai = 0
-        total_izin_pegawai = 0
-        total_tidak_tercatat_pegawai = 0
-    else:
-        # --- KODE ASLI ANDA DIKEMBALIKAN SEPENUHNYA ---
-        waktu_sekarang = datetime.now().time()
-        waktu_batas_absen_masuk = setting_waktu.jam_terlambat_selesai if setting_waktu and setting_waktu.jam_terlambat_selesai else time(8, 0, 0)
-        total_siswa = Siswa.query.count()
-
-        # --- 1. PERHITUNGAN ABSENSI SISWA (LOGIKA ASLI ANDA) ---
-        nis_hadir_terlambat = [absensi.nis for absensi in Absensi.query.filter(Absensi.tanggal == hari_ini, Absensi.jenis_absen == "masuk", Absensi.status.in_(["Hadir", "Terlambat"])).distinct(Absensi.nis).all()]
-        nis_sakit_izin = [absensi.nis for absensi in Absensi.query.filter(Absensi.tanggal == hari_ini, Absensi.status.in_(["Sakit", "Izin"])).distinct(Absensi.nis).all()]
-        
-        semua_nis_tercatat = set(nis_hadir_terlambat + nis_sakit_izin)
-        siswa_berstatus = len(semua_nis_tercatat)
-
-        total_terlambat_siswa = Absensi.query.filter(Absensi.tanggal == hari_ini, Absensi.status == "Terlambat", Absensi.jenis_absen == "masuk").distinct(Absensi.nis).count()
-        total_hadir_tepat_siswa = Absensi.query.filter(Absensi.tanggal == hari_ini, Absensi.status == "Hadir", Absensi.jenis_absen == "masuk").distinct(Absensi.nis).count()
-        total_sakit_siswa = Absensi.query.filter(Absensi.tanggal == hari_ini, Absensi.status == "Sakit").distinct(Absensi.nis).count()
-        total_izin_siswa = Absensi.query.filter(Absensi.tanggal == hari_ini, Absensi.status == "Izin").distinct(Absensi.nis).count()
-
-        if waktu_sekarang > waktu_batas_absen_masuk:
-            total_alfa_siswa = total_siswa - siswa_berstatus
-        else:
-            total_alfa_siswa = 0
-
-        # --- 2. PERHITUNGAN ABSENSI PEGAWAI (LOGIKA ASLI ANDA) ---
-        total_pegawai = Pegawai.query.count()
-        
-        pegawai_hadir_terlambat_ids = [absensi.no_id for absensi in AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == hari_ini, AbsensiPegawai.jenis_absen == "masuk", AbsensiPegawai.status.in_(["Hadir", "Terlambat"])).distinct(AbsensiPegawai.no_id).all()]
-        pegawai_sakit_izin_ids = [absensi.no_id for absensi in AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == hari_ini, AbsensiPegawai.status.in_(["Sakit", "Izin"])).distinct(AbsensiPegawai.no_id).all()]
-
-        semua_pegawai_tercatat = set(pegawai_hadir_terlambat_ids + pegawai_sakit_izin_ids)
-        pegawai_berstatus = len(semua_pegawai_tercatat)
-
-        total_terlambat_pegawai = AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == hari_ini, AbsensiPegawai.status == "Terlambat", AbsensiPegawai.jenis_absen == "masuk").distinct(AbsensiPegawai.no_id).count()
-        total_hadir_tepat_pegawai = AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == hari_ini, AbsensiPegawai.status == "Hadir", AbsensiPegawai.jenis_absen == "masuk").distinct(AbsensiPegawai.no_id).count()
-        total_sakit_pegawai = AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == hari_ini, AbsensiPegawai.status == "Sakit").distinct(AbsensiPegawai.no_id).count()
-        total_izin_pegawai = AbsensiPegawai.query.filter(AbsensiPegawai.tanggal == hari_ini, AbsensiPegawai.status == "Izin").distinct(AbsensiPegawai.no_id).count()
-
-        if waktu_sekarang > waktu_batas_absen_masuk:
-            total_tidak_tercatat_pegawai = total_pegawai - pegawai_berstatus
-        else:
-            total_tidak_tercatat_pegawai = 0
-
-    # Ambil total global (selalu dihitung di luar kondisi)
-    total_siswa = Siswa.query.count()
-    total_kelas = Kelas.query.count()
-    total_pegawai = Pegawai.query.count()
+    # Seluruh angka (termasuk total siswa/kelas/pegawai) dihitung oleh layanan
+    # statistik dengan satu query agregat per tabel absensi.
+    statistik = statistik_harian()
+    siswa = statistik["siswa"]
+    pegawai = statistik["pegawai"]
 
     return render_template(
         "dashboard.html",
         # Data Siswa
-        total_hadir_siswa=total_hadir_tepat_siswa,
-        total_terlambat_siswa=total_terlambat_siswa,
-        total_sakit_siswa=total_sakit_siswa,
-        total_izin_siswa=total_izin_siswa,
-        total_alfa_siswa=max(0, total_alfa_siswa), 
-        total_siswa=total_siswa,
-        total_kelas=total_kelas,
+        total_hadir_siswa=siswa["hadir"],
+        total_terlambat_siswa=siswa["terlambat"],
+        total_sakit_siswa=siswa["sakit"],
+        total_izin_siswa=siswa["izin"],
+        total_alfa_siswa=siswa["alfa"],
+        total_siswa=siswa["total"],
+        total_kelas=statistik["total_kelas"],
         # Data Pegawai
-        total_hadir_pegawai=total_hadir_tepat_pegawai,
-        total_terlambat_pegawai=total_terlambat_pegawai,
-        total_sakit_pegawai=total_sakit_pegawai,
-        total_izin_pegawai=total_izin_pegawai,
-        total_pegawai=total_pegawai,
-        total_tidak_tercatat_pegawai=max(0, total_tidak_tercatat_pegawai), 
+        total_hadir_pegawai=pegawai["hadir"],
+        total_terlambat_pegawai=pegawai["terlambat"],
+        total_sakit_pegawai=pegawai["sakit"],
+        total_izin_pegawai=pegawai["izin"],
+        total_pegawai=pegawai["total"],
+        total_tidak_tercatat_pegawai=pegawai["alfa"],
         # Info Hari Ini (BARU)
-        info_hari_ini=info_hari_ini
-    )
\ No newline at end of file
+        info_hari_ini=statistik["info_libur"],
+        # Untuk pembaruan live lewat /dashboard/stream
+        tanggal_hari_ini=datetime.today().strftime("%Y-%m-%d"),
+        alfa_dihitung=statistik["alfa_dihitung"]
+    )
+
+
+# =======================================================================
+#  API: STATISTIK ABSENSI (JSON)
+# =======================================================================
+@dashboard_bp.route("/api/statistik")
+def api_statistik():
+    """Statistik absensi dalam format JSON (default hari ini, atau ?tanggal=YYYY-MM-DD)."""
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    tanggal = None
+    tanggal_str = request.args.get("tanggal")
+    if tanggal_str:
+        try:
+            tanggal = datetime.strptime(tanggal_str, "%Y-%m-%d").date()
+        except ValueError:
+            return jsonify({"status": "danger", "message": "Format tanggal tidak valid (YYYY-MM-DD)."}), 400
+
+    statistik = statistik_harian(tanggal)
+    statistik["tanggal"] = (tanggal or datetime.today().date()).strftime("%Y-%m-%d")
+    return jsonify(statistik)
+
+
+# =======================================================================
+#  API: TREN ABSENSI (DARI TABEL REKAP HARIAN)
+# =======================================================================
+@dashboard_bp.route("/api/tren")
+def api_tren():
+    """Jumlah per status per tanggal untuk N hari terakhir (?hari=30&tipe=siswa&grup=...)."""
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    tipe = request.args.get("tipe", "siswa")
+    hari = min(max(request.args.get("hari", 30, type=int), 1), 366)
+    sampai = datetime.today().date()
+    dari = sampai - timedelta(days=hari - 1)
+
+    tren = ambil_tren(tipe, dari, sampai, grup=request.args.get("grup"))
+    return jsonify({"tipe": tipe, "dari": dari.strftime("%Y-%m-%d"), "sampai": sampai.strftime("%Y-%m-%d"), "tren": tren})
+
+
+# =======================================================================
+#  STREAM: PEMBARUAN DASHBOARD LIVE (SERVER-SENT EVENTS)
+# =======================================================================
+# Jeda pengiriman komentar keep-alive agar koneksi tidak diputus proxy
+JEDA_PING_DETIK = 15
+
+
+@dashboard_bp.route("/stream")
+def stream():
+    """
+    Alirkan delta angka dashboard (event 'delta') setiap ada absensi yang di-commit
+    di proses ini, dan event 'sinkron' jika proses lain mencatat absensi.
+    """
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    antrian = siaran_dashboard.langganan()
+    if antrian is None:
+        # Batas koneksi SSE per proses tercapai: dashboard beralih ke polling
+        return Response("Batas koneksi live dashboard tercapai.\n", status=503,
+                        mimetype="text/plain", headers={"Retry-After": "300"})
+
+    app = current_app._get_current_object()
+
+    def alirkan():
+        try:
+            yield "retry: 5000\n\n"
+            terakhir_kirim = _time.monotonic()
+            while True:
+                # Absensi dari worker lain tidak lewat pub/sub proses ini
+                siaran_dashboard.periksa_proses_lain(app)
+                try:
+                    pesan = antrian.get(timeout=min(JEDA_PING_DETIK, siaran_dashboard.jeda_sinkron))
+                except queue.Empty:
+                    if _time.monotonic() - terakhir_kirim >= JEDA_PING_DETIK:
+                        terakhir_kirim = _time.monotonic()
+                        yield ": ping\n\n"
+                    continue
+                jenis = "sinkron" if pesan.get("sinkron") else "delta"
+                terakhir_kirim = _time.monotonic()
+                yield f"event: {jenis}\ndata: {json.dumps(pesan)}\n\n"
+        finally:
+            siaran_dashboard.berhenti(antrian)
+
+    return Response(alirkan(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Nginx: jangan tahan respons stream
+    })
\ No newline at end of file
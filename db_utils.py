@@ -0,0 +1,75 @@
+# ======================== UTILITAS DATABASE ========================
+# Fungsi bantu untuk operasi massal (bulk) yang sintaksnya berbeda antar dialek
+# database. Produksi memakai MySQL; SQLite dipakai untuk pengembangan/benchmark.
+
+import base64
+import json
+
+from sqlalchemy import tuple_, literal
+from sqlalchemy.dialects import mysql, sqlite
+
+from models import db
+
+
+def nama_dialek(session=None):
+    """Nama dialek database yang sedang dipakai sesi (mis. 'mysql', 'sqlite')."""
+    return (session or db.session).get_bind().dialect.name
+
+
+def upsert(model, rows, kolom_kunci, kolom_update=(), kolom_tambah=(), session=None):
+    """
+    Jalankan INSERT ... ON DUPLICATE KEY UPDATE (MySQL) atau
+    INSERT ... ON CONFLICT DO UPDATE (SQLite) untuk banyak baris sekaligus.
+
+    kolom_kunci  : kolom unique constraint yang menentukan konflik.
+    kolom_update : kolom yang ditimpa dengan nilai baru saat konflik.
+    kolom_tambah : kolom numerik yang dijumlahkan (nilai lama + nilai baru).
+    """
+    if not rows:
+        return
+    session = session or db.session
+    tabel = model.__table__
+
+    if nama_dialek(session) == "mysql":
+        stmt = mysql.insert(tabel)
+        baru = stmt.inserted
+        set_ = {c: baru[c] for c in kolom_update}
+        set_.update({c: tabel.c[c] + baru[c] for c in kolom_tambah})
+        stmt = stmt.on_duplicate_key_update(set_)
+    else:
+        stmt = sqlite.insert(tabel)
+        baru = stmt.excluded
+        set_ = {c: baru[c] for c in kolom_update}
+        set_.update({c: tabel.c[c] + baru[c] for c in kolom_tambah})
+        stmt = stmt.on_conflict_do_update(index_elements=list(kolom_kunci), set_=set_)
+
+    session.execute(stmt, rows)
+
+
+# ==============================================================================
+#  PAGINASI KEYSET (CURSOR)
+# ==============================================================================
+def encode_cursor(nilai):
+    """Ubah daftar nilai kunci urutan baris terakhir menjadi token cursor untuk URL."""
+    teks = json.dumps(list(nilai), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(teks.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Kebalikan encode_cursor(); None jika token kosong atau rusak."""
+    if not token:
+        return None
+    try:
+        teks = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+        nilai = json.loads(teks)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return nilai if isinstance(nilai, list) else None
+
+
+def setelah_cursor(kolom_urutan, nilai):
+    """
+    Kondisi keyset: (k1, k2, ...) > (v1, v2, ...) sebagai row-value comparison.
+    kolom_urutan harus sama dengan ORDER BY (semua ASC) dan diakhiri kolom unik.
+    """
+    return tuple_(*kolom_urutan) > tuple_(*[literal(v, k.type) for k, v in zip(kolom_urutan, nilai)])
\ No newline at end of file
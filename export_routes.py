@@ -1,12 +1,29 @@
-from flask import Blueprint, render_template, request, send_file, redirect, url_for, flash
-from datetime import datetime
-import pandas as pd, io
+from flask import (
+    Blueprint, render_template, request, send_file, redirect, url_for, flash,
+    Response, stream_with_context
+)
+from datetime import datetime, date
+import calendar, csv, io, os, tempfile
+import numpy as np, pandas as pd
+import xlsxwriter
+from sqlalchemy import select, func
 from utils import check_admin_session
-from models import db, Absensi, Siswa, Pegawai, AbsensiPegawai
+from models import db, Absensi, Siswa, Kelas, Pegawai, AbsensiPegawai, JadwalKeamanan
+from pengaturan_cache import pengaturan_cache
+from job_latar import pelaksana_job
 
 # Inisialisasi Blueprint dengan prefix URL
 export_bp = Blueprint("export_bp", __name__, url_prefix="/export")
 
+# Jumlah baris yang diambil per halaman query saat streaming ekspor
+UKURAN_HALAMAN = 2000
+KOLOM_LAPORAN = ["Nama", "ID", "Tanggal", "Waktu", "Status"]
+MIMETYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Kode sel pada rekap bulanan dan kolom total per orang
+KODE_STATUS = {"Hadir": "H", "Terlambat": "T", "Sakit": "S", "Izin": "I", "Alfa": "A"}
+KODE_LIBUR = "L"
+
 # ======================================================================
 #  HALAMAN UTAMA EXPORT (Tidak Berubah)
 # ======================================================================
@@ -23,6 +40,7 @@ def export_laporan():
         tanggal = request.form.get("tanggal")
         bulan = request.form.get("bulan")
         tahun = request.form.get("tahun")
+        latar = request.form.get("latar")
 
         # Redirect ke fungsi ekspor sesuai pilihan
         return redirect(url_for("export_bp.download_laporan",
@@ -31,11 +49,240 @@ def export_laporan():
                                 format_file=format_file,
                                 tanggal=tanggal,
                                 bulan=bulan,
-                                tahun=tahun))
+                                tahun=tahun,
+                                latar=latar))
 
     return render_template("export_laporan.html", current_year=datetime.now().year)
 
 
+# ======================================================================
+#  QUERY & STREAMING BARIS LAPORAN
+# ======================================================================
+def query_laporan(tipe_data, jenis_laporan, tanggal=None, bulan=None, tahun=None):
+    """Susun query kolom laporan (tanpa objek ORM) sesuai tipe dan periode."""
+    if tipe_data == "siswa":
+        ModelAbsensi = Absensi
+        query = select(Absensi.id, Siswa.nama, Siswa.nis, Absensi.tanggal, Absensi.waktu, Absensi.status) \
+            .join(Siswa, Absensi.nis == Siswa.nis)
+    else:
+        # Menggunakan model AbsensiPegawai untuk data pegawai
+        ModelAbsensi = AbsensiPegawai
+        query = select(AbsensiPegawai.id, Pegawai.nama, Pegawai.no_id, AbsensiPegawai.tanggal,
+                       AbsensiPegawai.waktu, AbsensiPegawai.status) \
+            .join(Pegawai, AbsensiPegawai.no_id == Pegawai.no_id)
+
+    # Filter berdasarkan jenis laporan (rentang tanggal agar indeks terpakai)
+    if jenis_laporan == "harian" and tanggal:
+        query = query.where(ModelAbsensi.tanggal == tanggal)
+    elif jenis_laporan == "bulanan" and bulan and tahun:
+        bulan, tahun = int(bulan), int(tahun)
+        awal = date(tahun, bulan, 1)
+        akhir = date(tahun, bulan, calendar.monthrange(tahun, bulan)[1])
+        query = query.where(ModelAbsensi.tanggal.between(awal, akhir))
+
+    return query, ModelAbsensi
+
+
+def iter_baris_laporan(query, ModelAbsensi):
+    """
+    Hasilkan baris laporan satu per satu dengan paging keyset (id > terakhir).
+    Memori tetap konstan berapa pun jumlah barisnya, termasuk pada driver yang
+    tidak mendukung server-side cursor (mysql-connector).
+    """
+    id_terakhir = 0
+    while True:
+        halaman = db.session.execute(
+            query.where(ModelAbsensi.id > id_terakhir)
+            .order_by(ModelAbsensi.id.asc())
+            .limit(UKURAN_HALAMAN)
+            .execution_options(stream_results=True, yield_per=UKURAN_HALAMAN)
+        )
+        jumlah = 0
+        for id_absen, nama, id_orang, tgl, waktu, status in halaman:
+            jumlah += 1
+            id_terakhir = id_absen
+            # Status "Terlambat" dilaporkan sebagai "Hadir"
+            yield [
+                nama,
+                id_orang,
+                tgl.strftime("%Y-%m-%d"),
+                waktu.strftime('%H:%M:%S') if waktu else "",
+                "Hadir" if status == "Terlambat" else status,
+            ]
+        if jumlah < UKURAN_HALAMAN:
+            return
+
+
+def stream_csv(baris_laporan, ukuran_chunk=64 * 1024):
+    """Generator potongan teks CSV (header + baris) berukuran ~ukuran_chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(KOLOM_LAPORAN)
+    for baris in baris_laporan:
+        writer.writerow(baris)
+        if buffer.tell() >= ukuran_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def tulis_xlsx(baris_laporan, path):
+    """Tulis laporan ke file XLSX dengan mode constant_memory (baris per baris)."""
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = workbook.add_worksheet("Laporan")
+    sheet.write_row(0, 0, KOLOM_LAPORAN)
+    for nomor, baris in enumerate(baris_laporan, start=1):
+        sheet.write_row(nomor, 0, baris)
+    workbook.close()
+
+
+# ======================================================================
+#  REKAP BULANAN (MATRIKS ORANG x TANGGAL)
+# ======================================================================
+def matriks_rekap_bulanan(tipe_data, bulan, tahun, hari_ini=None):
+    """
+    Susun matriks status absensi (baris = orang, kolom = tanggal) untuk satu
+    bulan, lengkap dengan total Hadir/Terlambat/Sakit/Izin/Alfa per orang.
+
+    Kode sel: H/T/S/I/A, L untuk hari libur (rutin maupun HariLibur) dan untuk
+    pegawai keamanan pada hari tanpa shift terjadwal (Off), dan kosong untuk
+    tanggal yang belum lewat. Kolom 'Hari Kerja' berisi jumlah hari wajib absen
+    yang sudah lewat per orang. Seluruh pengisian dan penjumlahan dilakukan
+    secara vektor (pandas/NumPy), bukan loop per sel.
+
+    ID absensi dari jalur scan tersimpan dalam huruf kecil, jadi dicocokkan
+    dengan ID siswa/pegawai tanpa membedakan huruf besar/kecil.
+    """
+    hari_ini = hari_ini or datetime.today().date()
+    jumlah_hari = calendar.monthrange(tahun, bulan)[1]
+    awal, akhir = date(tahun, bulan, 1), date(tahun, bulan, jumlah_hari)
+
+    if tipe_data == "siswa":
+        ModelAbsensi, kolom_id, label_grup = Absensi, Absensi.nis, "Kelas"
+        query_orang = select(Siswa.nis, Siswa.nama, Kelas.nama) \
+            .join(Kelas, Siswa.kelas_id == Kelas.id).order_by(Kelas.nama, Siswa.nama)
+    else:
+        ModelAbsensi, kolom_id, label_grup = AbsensiPegawai, AbsensiPegawai.no_id, "Role"
+        query_orang = select(Pegawai.no_id, Pegawai.nama, Pegawai.role).order_by(Pegawai.role, Pegawai.nama)
+
+    orang = pd.DataFrame(db.session.execute(query_orang).all(), columns=["ID", "Nama", label_grup])
+    kunci_orang = orang["ID"].str.lower()
+    absen = pd.DataFrame(
+        db.session.execute(
+            select(kolom_id, ModelAbsensi.tanggal, ModelAbsensi.jenis_absen, ModelAbsensi.status)
+            .where(ModelAbsensi.tanggal.between(awal, akhir),
+                   ModelAbsensi.jenis_absen.in_(["masuk", "lainnya"]))
+        ).all(),
+        columns=["ID", "tanggal", "jenis_absen", "status"],
+    )
+
+    hari = list(range(1, jumlah_hari + 1))
+    if absen.empty:
+        sel = pd.DataFrame(index=kunci_orang, columns=hari, dtype=object)
+    else:
+        absen["ID"] = absen["ID"].str.lower()
+        absen["hari"] = pd.to_datetime(absen["tanggal"]).dt.day
+        absen["kode"] = absen["status"].map(KODE_STATUS)
+        # Catatan 'lainnya' (Sakit/Izin/Alfa dari admin) mengalahkan scan masuk
+        absen["prioritas"] = (absen["jenis_absen"] == "lainnya").astype(int)
+        absen = absen.dropna(subset=["kode"]).sort_values("prioritas") \
+            .drop_duplicates(subset=["ID", "hari"], keep="last")
+        sel = absen.pivot(index="ID", columns="hari", values="kode") \
+            .reindex(index=kunci_orang, columns=hari)
+
+    # Hari tanpa kewajiban absen per sel: libur kalender untuk semua orang,
+    # ditambah hari tanpa shift terjadwal untuk pegawai keamanan
+    kalender = pengaturan_cache.get().kalender
+    tanggal_bulan = [date(tahun, bulan, h) for h in hari]
+    libur = np.array([not kalender.hari_kerja(t) for t in tanggal_bulan])
+    tidak_wajib = np.broadcast_to(libur, (len(orang), jumlah_hari)).copy()
+    if tipe_data != "siswa":
+        keamanan = (orang[label_grup] == "keamanan").to_numpy()
+        tidak_wajib[keamanan] = True
+        shift = pd.DataFrame(
+            db.session.execute(
+                select(Pegawai.no_id, JadwalKeamanan.tanggal)
+                .join(JadwalKeamanan, JadwalKeamanan.pegawai_id == Pegawai.id)
+                .where(Pegawai.role == "keamanan", JadwalKeamanan.tanggal.between(awal, akhir),
+                       JadwalKeamanan.shift.notin_(["Off", ""]))
+            ).all(),
+            columns=["ID", "tanggal"],
+        )
+        if not shift.empty:
+            baris_orang = pd.Series(np.arange(len(orang)), index=kunci_orang.to_numpy())
+            posisi = baris_orang.reindex(shift["ID"].str.lower()).to_numpy()
+            hari_shift = pd.to_datetime(shift["tanggal"]).dt.day.to_numpy() - 1
+            ada = ~pd.isna(posisi)
+            tidak_wajib[posisi[ada].astype(int), hari_shift[ada]] = libur[hari_shift[ada]]
+
+    # Status default per sel: L (tidak wajib absen), A (hari wajib yang sudah lewat), kosong (belum lewat)
+    sudah_lewat = np.array([t <= hari_ini for t in tanggal_bulan])
+    default = np.where(tidak_wajib, KODE_LIBUR, np.where(sudah_lewat, KODE_STATUS["Alfa"], ""))
+
+    nilai = sel.to_numpy(dtype=object)
+    kosong = pd.isna(nilai)
+    nilai = np.where(kosong, default, nilai)
+
+    hasil = orang.reset_index(drop=True)
+    hasil = pd.concat([hasil, pd.DataFrame(nilai, columns=[str(h) for h in hari])], axis=1)
+    for status, kode in KODE_STATUS.items():
+        hasil[status] = (nilai == kode).sum(axis=1)
+    # Jumlah hari wajib absen yang sudah lewat di bulan ini (pembagi persentase kehadiran)
+    hasil["Hari Kerja"] = (~tidak_wajib & sudah_lewat).sum(axis=1)
+    return hasil
+
+
+def download_rekap_bulanan(tipe_data, bulan, tahun, format_file):
+    """Kirim rekap bulanan dalam format XLSX atau CSV."""
+    if not (bulan and tahun):
+        flash("Bulan dan tahun wajib diisi untuk rekap bulanan.", "danger")
+        return redirect(url_for("export_bp.export_laporan"))
+
+    df = matriks_rekap_bulanan(tipe_data, int(bulan), int(tahun))
+    if df.empty:
+        flash("Tidak ada data ditemukan untuk periode tersebut.", "warning")
+        return redirect(url_for("export_bp.export_laporan"))
+
+    filename = f"rekap_{tipe_data}_{int(tahun)}_{int(bulan):02d}"
+    output = io.BytesIO()
+    if format_file == "csv":
+        output.write(df.to_csv(index=False).encode("utf-8"))
+        mimetype, ekstensi = "text/csv", "csv"
+    else:
+        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name="Rekap")
+        mimetype, ekstensi = MIMETYPE_XLSX, "xlsx"
+
+    output.seek(0)
+    return send_file(output, as_attachment=True, download_name=f"{filename}.{ekstensi}", mimetype=mimetype)
+
+
+def kirim_file_sementara(path, download_name, mimetype, ukuran_chunk=64 * 1024):
+    """Kirim file sementara per potongan lalu hapus setelah response ditutup."""
+    def isi_file():
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(ukuran_chunk)
+                if not chunk:
+                    break
+                yield chunk
+
+    def hapus_file():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # Bukan send_file: response direct_passthrough tidak menjalankan call_on_close
+    response = Response(isi_file(), mimetype=mimetype)
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    response.headers["Content-Length"] = str(os.path.getsize(path))
+    response.call_on_close(hapus_file)
+    return response
+
+
 # ======================================================================
 #  FUNGSI EKSPOR DATA (DENGAN LOGIKA BARU UNTUK STATUS)
 # ======================================================================
@@ -52,62 +299,91 @@ def download_laporan():
     bulan = request.args.get("bulan")
     tahun = request.args.get("tahun")
 
-    # Query data berdasarkan tipe (siswa / pegawai)
-    if tipe_data == "siswa":
-        query = db.session.query(Absensi, Siswa).join(Siswa, Absensi.nis == Siswa.nis)
-    else:
-        # Menggunakan model AbsensiPegawai untuk data pegawai
-        query = db.session.query(AbsensiPegawai, Pegawai).join(Pegawai, AbsensiPegawai.no_id == Pegawai.no_id)
+    # Ekspor besar diproses di job latar; file diunduh dari halaman status job
+    if request.args.get("latar"):
+        if format_file not in ("xlsx", "csv"):
+            flash("Format file tidak dikenali.", "danger")
+            return redirect(url_for("export_bp.export_laporan"))
+        job_id = pelaksana_job.kirim(
+            "ekspor_laporan", tipe_data=tipe_data, jenis_laporan=jenis_laporan, format_file=format_file,
+            tanggal=tanggal, bulan=bulan, tahun=tahun,
+        )
+        return redirect(url_for("job_bp.status_job_page", job_id=job_id))
 
-    # Filter berdasarkan jenis laporan
-    ModelAbsensi = Absensi if tipe_data == "siswa" else AbsensiPegawai
-    if jenis_laporan == "harian" and tanggal:
-        query = query.filter(ModelAbsensi.tanggal == tanggal)
-    elif jenis_laporan == "bulanan" and bulan and tahun:
-        query = query.filter(db.extract("month", ModelAbsensi.tanggal) == int(bulan))
-        query = query.filter(db.extract("year", ModelAbsensi.tanggal) == int(tahun))
-
-    # Susun data ke DataFrame
-    data = []
-    for absensi, orang in query.all():
-        # ==============================================================================
-        #  PERUBAHAN: Jika status "Terlambat", ubah menjadi "Hadir" untuk laporan
-        # ==============================================================================
-        status_laporan = "Hadir" if absensi.status == "Terlambat" else absensi.status
-        # ==============================================================================
-
-        data.append({
-            "Nama": orang.nama,
-            "ID": getattr(orang, "nis", getattr(orang, "no_id", None)),
-            "Tanggal": absensi.tanggal.strftime("%Y-%m-%d"),
-            "Waktu": absensi.waktu.strftime('%H:%M:%S'),
-            "Status": status_laporan  # Gunakan status yang sudah diubah
-        })
-
-    if not data:
+    # Rekap bulanan berbentuk matriks, bukan daftar catatan scan
+    if jenis_laporan == "rekap_bulanan":
+        return download_rekap_bulanan(tipe_data, bulan, tahun, format_file)
+
+    query, ModelAbsensi = query_laporan(tipe_data, jenis_laporan, tanggal, bulan, tahun)
+
+    if db.session.execute(query.limit(1)).first() is None:
         flash("Tidak ada data ditemukan untuk periode tersebut.", "warning")
         return redirect(url_for("export_bp.export_laporan"))
 
-    df = pd.DataFrame(data)
     filename = f"laporan_{tipe_data}_{jenis_laporan}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-    # Ekspor ke Excel
+    # Ekspor ke Excel (ditulis bertahap ke file sementara, bukan ke RAM)
     if format_file == "xlsx":
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Laporan")
-        output.seek(0)
-        return send_file(output,
-                         as_attachment=True,
-                         download_name=f"{filename}.xlsx",
-                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-    # Ekspor ke CSV
+        fd, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(fd)
+        try:
+            tulis_xlsx(iter_baris_laporan(query, ModelAbsensi), path)
+        except Exception:
+            os.remove(path)
+            raise
+        return kirim_file_sementara(path, f"{filename}.xlsx", MIMETYPE_XLSX)
+
+    # Ekspor ke CSV (dikirim sebagai chunked response)
     elif format_file == "csv":
-        output = io.StringIO()
-        df.to_csv(output, index=False)
-        output.seek(0)
-        return send_file(io.BytesIO(output.getvalue().encode("utf-8")),
-                         as_attachment=True,
-                         download_name=f"{filename}.csv",
-                         mimetype="text/csv")
\ No newline at end of file
+        response = Response(
+            stream_with_context(stream_csv(iter_baris_laporan(query, ModelAbsensi))),
+            mimetype="text/csv",
+        )
+        response.headers.set("Content-Disposition", "attachment", filename=f"{filename}.csv")
+        return response
+
+    flash("Format file tidak dikenali.", "danger")
+    return redirect(url_for("export_bp.export_laporan"))
+
+
+# ======================================================================
+#  JOB LATAR: EKSPOR LAPORAN KE FILE
+# ======================================================================
+@pelaksana_job.tugas("ekspor_laporan")
+def job_ekspor_laporan(job, tipe_data, jenis_laporan, format_file, tanggal=None, bulan=None, tahun=None):
+    """Tulis laporan ke file di folder job; file diunduh lewat halaman status job."""
+    path = job.path_file(format_file)
+
+    if jenis_laporan == "rekap_bulanan":
+        if not (bulan and tahun):
+            raise ValueError("Bulan dan tahun wajib diisi untuk rekap bulanan.")
+        df = matriks_rekap_bulanan(tipe_data, int(bulan), int(tahun))
+        if format_file == "csv":
+            df.to_csv(path, index=False)
+        else:
+            df.to_excel(path, index=False, sheet_name="Rekap", engine="xlsxwriter")
+        job.simpan_hasil(path, f"rekap_{tipe_data}_{int(tahun)}_{int(bulan):02d}.{format_file}")
+        return {"jumlah_baris": len(df), "ringkasan": f"Rekap bulanan {len(df)} orang siap diunduh."}
+
+    query, ModelAbsensi = query_laporan(tipe_data, jenis_laporan, tanggal, bulan, tahun)
+    total = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+    job.progres(0, total)
+
+    def dengan_progres(baris_laporan):
+        for nomor, baris in enumerate(baris_laporan, start=1):
+            if nomor % UKURAN_HALAMAN == 0:
+                job.progres(nomor, total)
+            yield baris
+
+    baris = dengan_progres(iter_baris_laporan(query, ModelAbsensi))
+    if format_file == "xlsx":
+        tulis_xlsx(baris, path)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            for chunk in stream_csv(baris):
+                f.write(chunk)
+
+    job.progres(total, total)
+    filename = f"laporan_{tipe_data}_{jenis_laporan}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_file}"
+    job.simpan_hasil(path, filename)
+    return {"jumlah_baris": total, "ringkasan": f"Laporan {total} baris siap diunduh."}
\ No newline at end of file
@@ -0,0 +1,231 @@
+# ======================== GATEWAY WHATSAPP PALSU (PENGUJIAN LOKAL) ========================
+# Berkas ini menjalankan server HTTP lokal yang meniru endpoint kirim Fonnte,
+# agar dispatcher outbox (notifikasi_wa.py) bisa diuji tanpa mengirim pesan
+# sungguhan.
+#
+# Perilaku gateway ditentukan oleh nomor target:
+#   berakhiran 500  -> HTTP 500
+#   berakhiran 000  -> HTTP 200 dengan {"status": false, "reason": "target invalid"}
+#   lainnya         -> HTTP 200 dengan {"status": true} (atau gagal acak, --peluang-gagal)
+#
+# Contoh:
+#   python gateway_wa_palsu.py --port 18999
+#       lalu isi .env: WA_API_URL=http://127.0.0.1:18999/send  WA_API_TOKEN=palsu
+#   python gateway_wa_palsu.py --uji
+#       uji otomatis transisi outbox (terkirim, retry/backoff, gagal, klaim
+#       kedaluwarsa) pada database SQLite sementara.
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time as _time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+# ==============================================================================
+#  SERVER GATEWAY PALSU
+# ==============================================================================
+class GatewayPalsu(ThreadingHTTPServer):
+    """Server HTTP tiruan Fonnte; setiap permintaan dicatat di self.diterima."""
+
+    daemon_threads = True
+
+    def __init__(self, alamat, peluang_gagal=0.0, latensi=0.0):
+        super().__init__(alamat, _PenanganGateway)
+        self.peluang_gagal = peluang_gagal
+        self.latensi = latensi
+        self.diterima = []  # (Authorization, target, message)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/send"
+
+    def jawaban(self, target):
+        """(kode HTTP, body) untuk target tertentu."""
+        if target.endswith("500"):
+            return 500, {"status": False, "reason": "server error"}
+        if target.endswith("000") or random.random() < self.peluang_gagal:
+            return 200, {"status": False, "reason": "target invalid"}
+        return 200, {"status": True, "detail": "success! message in queue"}
+
+
+class _PenanganGateway(BaseHTTPRequestHandler):
+    def do_POST(self):
+        panjang = int(self.headers.get("Content-Length", 0))
+        data = parse_qs(self.rfile.read(panjang).decode("utf-8"))
+        target = (data.get("target") or [""])[0]
+        with self.server._lock:
+            self.server.diterima.append(
+                (self.headers.get("Authorization"), target, (data.get("message") or [""])[0])
+            )
+        if self.server.latensi:
+            _time.sleep(self.server.latensi)
+
+        kode, body = self.server.jawaban(target)
+        isi = json.dumps(body).encode("utf-8")
+        self.send_response(kode)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(isi)))
+        self.end_headers()
+        self.wfile.write(isi)
+
+    def log_message(self, format, *args):
+        if not getattr(self.server, "senyap", False):
+            super().log_message(format, *args)
+
+
+def jalankan_gateway(port=0, peluang_gagal=0.0, latensi=0.0, senyap=False):
+    """Jalankan gateway di thread latar; kembalikan server (server.url, server.shutdown())."""
+    server = GatewayPalsu(("127.0.0.1", port), peluang_gagal, latensi)
+    server.senyap = senyap
+    threading.Thread(target=server.serve_forever, name="gateway-wa-palsu", daemon=True).start()
+    return server
+
+
+# ==============================================================================
+#  UJI OTOMATIS DISPATCHER
+# ==============================================================================
+def _periksa(kondisi, pesan):
+    if not kondisi:
+        raise AssertionError(pesan)
+    print(f"  ok  {pesan}")
+
+
+def uji_dispatcher():
+    """Uji transisi outbox pada database SQLite sementara. Melempar AssertionError jika gagal."""
+    gateway = jalankan_gateway(senyap=True)
+    folder = tempfile.mkdtemp(prefix="uji_wa_")
+    os.environ.update({
+        "DATABASE_URL": "sqlite:///" + os.path.join(folder, "uji.db"),
+        "WA_API_URL": gateway.url,
+        "WA_API_TOKEN": "token-uji",
+        "WA_RATE_PER_DETIK": "0",
+        "WA_MAKS_PERCOBAAN": "3",
+        "WA_TIMEOUT": "5",
+    })
+
+    from sqlalchemy import update
+    from app import create_app
+    from models import db, NotifikasiWA
+    from notifikasi_wa import pengirim_wa
+
+    app = create_app(inisialisasi_db=True, layanan_latar=False)
+    pengirim_wa.init_app(app, jalankan=False)
+
+    # Pastikan tidak ada transaksi database yang terbuka selama panggilan HTTP
+    kirim_asli = pengirim_wa._kirim
+    transaksi_saat_kirim = []
+
+    def kirim_terpantau(pesan):
+        transaksi_saat_kirim.append(db.session().in_transaction())
+        return kirim_asli(pesan)
+
+    pengirim_wa._kirim = kirim_terpantau
+
+    def baris(id_):
+        db.session.expire_all()
+        return db.session.get(NotifikasiWA, id_)
+
+    try:
+        with app.app_context():
+            sukses = NotifikasiWA(target="0812111", pesan="halo")
+            http_500 = NotifikasiWA(target="0812500", pesan="halo")
+            ditolak = NotifikasiWA(target="0812000", pesan="halo")
+            nanti = NotifikasiWA(target="0812222", pesan="halo", jadwal_kirim=datetime.now() + timedelta(hours=1))
+            db.session.add_all([sukses, http_500, ditolak, nanti])
+            db.session.commit()
+            id_sukses, id_500, id_ditolak, id_nanti = sukses.id, http_500.id, ditolak.id, nanti.id
+
+            print("Putaran pertama:")
+            mulai = datetime.now()
+            _periksa(pengirim_wa.proses_batch() == 3, "tiga pesan jatuh tempo diklaim dan dikirim")
+            _periksa(not any(transaksi_saat_kirim), "tidak ada transaksi terbuka selama panggilan HTTP")
+            _periksa(gateway.diterima[0][0] == "token-uji", "header Authorization berisi WA_API_TOKEN")
+
+            n = baris(id_sukses)
+            _periksa(n.status == "terkirim" and n.terkirim_pada and n.diklaim_pada is None,
+                     "HTTP 200 status true -> terkirim")
+            n = baris(id_500)
+            jeda = (n.jadwal_kirim - mulai).total_seconds()
+            _periksa(n.status == "pending" and n.percobaan == 1 and n.error_terakhir == "HTTP 500",
+                     "HTTP 500 -> pending, percobaan 1")
+            _periksa(10 <= jeda <= 13.5, f"backoff percobaan 1 sekitar 10-12.5 detik ({jeda:.1f})")
+            n = baris(id_ditolak)
+            _periksa(n.status == "pending" and n.error_terakhir == "target invalid",
+                     "status false dari gateway -> pending dengan alasan gateway")
+            _periksa(baris(id_nanti).status == "pending", "pesan yang belum jatuh tempo tidak diklaim")
+
+            print("Retry sampai batas percobaan:")
+            jeda_sebelumnya = jeda
+            for percobaan in (2, 3):
+                mulai = datetime.now()
+                db.session.execute(
+                    update(NotifikasiWA).where(NotifikasiWA.id.in_([id_500, id_ditolak])).values(jadwal_kirim=mulai)
+                )
+                db.session.commit()
+                pengirim_wa.proses_batch()
+                n = baris(id_500)
+                _periksa(n.percobaan == percobaan, f"percobaan ke-{percobaan} tercatat")
+                if percobaan < 3:
+                    jeda = (n.jadwal_kirim - mulai).total_seconds()
+                    _periksa(jeda > jeda_sebelumnya, f"backoff bertambah ({jeda:.1f} detik)")
+            _periksa(baris(id_500).status == "gagal", "WA_MAKS_PERCOBAAN tercapai -> gagal")
+            _periksa(baris(id_ditolak).status == "gagal", "penolakan gateway berulang -> gagal")
+            _periksa(pengirim_wa.proses_batch() == 0, "pesan gagal tidak diklaim lagi")
+
+            print("Klaim kedaluwarsa:")
+            tertinggal = NotifikasiWA(
+                target="0812333", pesan="halo", status="mengirim",
+                diklaim_pada=datetime.now() - timedelta(seconds=pengirim_wa.klaim_kedaluwarsa + 1),
+            )
+            aktif = NotifikasiWA(target="0812444", pesan="halo", status="mengirim", diklaim_pada=datetime.now())
+            db.session.add_all([tertinggal, aktif])
+            db.session.commit()
+            id_tertinggal, id_aktif = tertinggal.id, aktif.id
+            _periksa(pengirim_wa.proses_batch() == 1, "hanya klaim yang kedaluwarsa diambil ulang")
+            _periksa(baris(id_tertinggal).status == "terkirim", "klaim tertinggal akhirnya terkirim")
+            _periksa(baris(id_aktif).status == "mengirim", "klaim yang masih aktif tidak diganggu")
+    finally:
+        pengirim_wa._kirim = kirim_asli
+        gateway.shutdown()
+    print("Semua uji dispatcher WA lolos.")
+
+
+# ==============================================================================
+#  MAIN
+# ==============================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Gateway WhatsApp palsu untuk pengujian dispatcher outbox.")
+    parser.add_argument("--port", type=int, default=18999)
+    parser.add_argument("--peluang-gagal", type=float, default=0.0, help="Porsi pesan yang ditolak acak (0..1).")
+    parser.add_argument("--latensi-ms", type=float, default=0.0, help="Jeda sebelum gateway menjawab.")
+    parser.add_argument("--uji", action="store_true", help="Jalankan uji otomatis dispatcher lalu keluar.")
+    args = parser.parse_args()
+
+    if args.uji:
+        try:
+            uji_dispatcher()
+        except AssertionError as e:
+            print(f"GAGAL: {e}")
+            return 1
+        return 0
+
+    server = GatewayPalsu(("127.0.0.1", args.port), args.peluang_gagal, args.latensi_ms / 1000)
+    print(f"Gateway WA palsu berjalan di {server.url} (Ctrl+C untuk berhenti)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,72 @@
+# ======================== KONFIGURASI GUNICORN (LINUX) ========================
+# Jalankan: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# - Proses master membuat tabel sekali (on_starting), worker tidak mengulanginya.
+# - Setiap worker punya pool koneksi database sendiri (profil_database.py), jadi
+#   WEB_WORKERS x (DB_POOL_SIZE + DB_MAX_OVERFLOW) harus di bawah max_connections.
+# - Worker web tidak menjalankan job latar maupun dispatcher WA (wsgi.py); keduanya
+#   berjalan di proses terpisah agar job berat CPU (impor, ekspor XLSX, regenerasi
+#   QR) tidak memperlambat scan:
+#       flask --app app job-worker
+#   Worker web cukup menulis outbox / antrian job.
+# - Worker 'gthread': koneksi /dashboard/stream (SSE) memakai satu thread selama
+#   dashboard terbuka. Jumlahnya dibatasi DASHBOARD_SSE_MAKS per worker (default 2);
+#   di atas batas dashboard beralih ke polling, sisa thread tetap untuk scan.
+# - Metrik: setiap worker menulis berkas ke METRIK_DIR (default instance/metrik)
+#   dan /metrics menjumlahkan semua worker (metrik.py). Master mengosongkan
+#   folder itu saat mulai.
+#
+# Konsistensi antar worker (trade-off WEB_WORKERS > 1):
+#   Setiap worker punya cache sendiri di memori: pengaturan & hari libur,
+#   roster keamanan, indeks identitas QR, pub/sub dashboard. Perubahan di satu
+#   worker menaikkan versi di tabel versi_cache, dan worker lain memuat ulang
+#   setelah pengecekan versi berikutnya (CACHE_CEK_VERSI_DETIK, default 2 detik,
+#   satu SELECT primary key per cache). Artinya, selama beberapa detik setelah
+#   admin mengubah pengaturan/jadwal/data siswa, scan di worker lain masih
+#   memakai data lama. Jeda lebih kecil = lebih cepat konsisten, lebih banyak
+#   query ringan; jeda 0 = cek setiap scan. Dashboard live menerima delta dari
+#   worker sendiri seketika dan sinkron ulang untuk absensi dari worker lain
+#   paling lambat DASHBOARD_SINKRON_DETIK (default 5). Satu worker dengan
+#   banyak thread menghindari semua jeda ini, tetapi dibatasi satu core (GIL).
+#
+# Konfigurasi (.env):
+#   WEB_BIND      Alamat bind (default 0.0.0.0:5001).
+#   WEB_WORKERS   Jumlah proses worker (default jumlah core CPU).
+#   WEB_THREADS   Thread per worker (default 8).
+
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "8"))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Aplikasi dibuat di setiap worker (bukan di master), agar thread latar dan
+# pool koneksi database tidak ikut tersalin saat fork
+preload_app = False
+
+# Worker tidak membuat tabel; sudah dilakukan master di on_starting
+raw_env = ["INISIALISASI_DB=0"]
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Buat tabel yang belum ada dan kosongkan folder metrik, sebelum worker pertama dijalankan."""
+    from app import create_app
+    from metrik import registri
+    from models import db
+
+    app = create_app(inisialisasi_db=True, layanan_latar=False)
+    registri.bersihkan_folder()
+    with app.app_context():
+        db.engine.dispose()
\ No newline at end of file
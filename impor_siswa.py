@@ -0,0 +1,198 @@
+# ======================== PIPELINE IMPOR SISWA ========================
+# Berkas ini memproses file CSV siswa secara massal:
+#   1. Seluruh kelas dan NIS yang sudah ada diambil dengan satu query masing-masing.
+#   2. Setiap baris divalidasi; masalah dicatat per baris (bukan flash per masalah).
+#   3. Gambar QR dibuat paralel di process pool.
+#   4. Data disimpan dengan bulk insert/update (executemany), satu commit.
+
+import csv
+import io
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy import select, insert, update
+
+from models import db, Siswa, Kelas
+from qr_cache import kunci_qr_siswa, pangkas_folder_cache, tandai_dipakai
+from utils import create_qr_siswa
+
+_pool = None
+
+
+def _process_pool():
+    """Process pool untuk render QR, dibuat sekali lalu dipakai ulang."""
+    global _pool
+    if _pool is None:
+        jumlah = int(os.getenv("IMPOR_QR_WORKERS", "0")) or None  # None = jumlah CPU
+        _pool = ProcessPoolExecutor(max_workers=jumlah)
+    return _pool
+
+
+def render_qr_siswa(tugas):
+    """
+    Dijalankan di proses pool: tulis QR siswa ke qr_path. Jika gambar dengan
+    kunci yang sama sudah ada di folder cache QR, file itu disalin tanpa render.
+    """
+    nis, nama, qr_path, folder_cache = tugas
+    path_cache = os.path.join(folder_cache, f"{kunci_qr_siswa(nis, nama)}.png")
+    if os.path.exists(path_cache):
+        tandai_dipakai(path_cache)
+    else:
+        path_tmp = f"{path_cache}.{os.getpid()}.tmp"
+        create_qr_siswa(nis, nama).save(path_tmp, 'PNG')
+        os.replace(path_tmp, path_cache)
+    shutil.copyfile(path_cache, qr_path)
+    return nis
+
+
+def _render_semua_qr(daftar_tugas, progres=None):
+    """
+    Render QR secara paralel; kembalikan {nis: pesan_error} untuk yang gagal.
+    progres(selesai, total) dipanggil berkala jika diberikan.
+    """
+    gagal = {}
+    if not daftar_tugas:
+        return gagal
+    try:
+        futures = [(t[0], _process_pool().submit(render_qr_siswa, t)) for t in daftar_tugas]
+        for nomor, (nis, future) in enumerate(futures, start=1):
+            try:
+                future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                gagal[nis] = f"Gagal membuat QR: {e}"
+            if progres and (nomor % 50 == 0 or nomor == len(futures)):
+                progres(nomor, len(futures))
+    except (BrokenProcessPool, OSError):
+        # Pool tidak tersedia (mis. dibatasi OS): render berurutan di proses ini
+        global _pool
+        _pool = None
+        gagal = {}
+        for nomor, tugas in enumerate(daftar_tugas, start=1):
+            try:
+                render_qr_siswa(tugas)
+            except Exception as e:
+                gagal[tugas[0]] = f"Gagal membuat QR: {e}"
+            if progres and (nomor % 50 == 0 or nomor == len(daftar_tugas)):
+                progres(nomor, len(daftar_tugas))
+    return gagal
+
+
+def impor_siswa_csv(teks_csv, upload_folder, folder_cache, progres=None):
+    """
+    Impor data siswa dari teks CSV (kolom: nis, nama, kelas, no_hp).
+    progres(selesai, total) dipakai job latar untuk melaporkan render QR.
+
+    Mengembalikan dict: baru, diperbarui, dilewati, dan 'error' berisi daftar
+    {"baris", "nis", "nama", "pesan"} untuk setiap baris yang tidak diimpor.
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    os.makedirs(folder_cache, exist_ok=True)
+
+    laporan = []
+    # nis.lower() -> baris valid (baris terakhir menang jika NIS ganda). Kunci huruf
+    # kecil karena kolom nis MySQL (*_ci) menganggap "A123" dan "a123" sama
+    data = {}
+
+    kelas_map = dict(db.session.execute(select(Kelas.nama, Kelas.id)).all())
+
+    # Baris 1 adalah header, data dimulai dari baris 2
+    for nomor, row in enumerate(csv.DictReader(io.StringIO(teks_csv)), start=2):
+        nis = (row.get("nis") or "").strip()
+        nama = (row.get("nama") or "").strip()
+        kelas_nama = (row.get("kelas") or "").strip()
+        no_hp = (row.get("no_hp") or "").strip() or None
+
+        if not nis or not nama or not kelas_nama:
+            laporan.append({"baris": nomor, "nis": nis, "nama": nama, "pesan": "NIS, nama, dan kelas wajib diisi."})
+            continue
+        if kelas_nama not in kelas_map:
+            laporan.append({"baris": nomor, "nis": nis, "nama": nama, "pesan": f"Kelas '{kelas_nama}' tidak ditemukan."})
+            continue
+        lama = data.get(nis.lower())
+        if lama:
+            laporan.append({"baris": lama["baris"], "nis": lama["nis"], "nama": lama["nama"],
+                            "pesan": f"NIS ganda di file, diganti oleh baris {nomor}."})
+
+        data[nis.lower()] = {
+            "baris": nomor,
+            "nis": nis,
+            "nama": nama,
+            "kelas_id": kelas_map[kelas_nama],
+            "no_hp_ortu": no_hp,
+            "qr_path": os.path.join(upload_folder, f"{nis}.png"),
+        }
+
+    # NIS yang sudah terdaftar diambil sekaligus (nis.lower() -> (nis tersimpan, id))
+    siswa_ada = {
+        nis.lower(): (nis, id_) for nis, id_ in db.session.execute(
+            select(Siswa.nis, Siswa.id).where(Siswa.nis.in_([d["nis"] for d in data.values()]))
+        ).all()
+    } if data else {}
+
+    # NIS yang hanya beda huruf besar/kecil dengan siswa terdaftar dilaporkan per baris
+    for kunci in [k for k, d in data.items() if k in siswa_ada and siswa_ada[k][0] != d["nis"]]:
+        d = data.pop(kunci)
+        laporan.append({"baris": d["baris"], "nis": d["nis"], "nama": d["nama"],
+                        "pesan": f"NIS sudah terdaftar sebagai '{siswa_ada[kunci][0]}' (beda huruf besar/kecil)."})
+
+    gagal_qr = _render_semua_qr(
+        [(d["nis"], d["nama"], d["qr_path"], folder_cache) for d in data.values()], progres
+    )
+    pangkas_folder_cache(folder_cache)
+
+    baru, diperbarui = [], []
+    for kunci, d in data.items():
+        nis = d["nis"]
+        if nis in gagal_qr:
+            laporan.append({"baris": d["baris"], "nis": nis, "nama": d["nama"], "pesan": gagal_qr[nis]})
+            continue
+        kolom = {k: d[k] for k in ("nis", "nama", "kelas_id", "no_hp_ortu", "qr_path")}
+        if kunci in siswa_ada:
+            kolom["id"] = siswa_ada[kunci][1]
+            diperbarui.append(kolom)
+        else:
+            baru.append(kolom)
+
+    if baru:
+        db.session.execute(insert(Siswa), baru)
+    if diperbarui:
+        # Bulk UPDATE berdasarkan primary key (executemany)
+        db.session.execute(update(Siswa), diperbarui)
+    db.session.commit()
+
+    laporan.sort(key=lambda item: item["baris"])
+    return {
+        "baru": len(baru),
+        "diperbarui": len(diperbarui),
+        "dilewati": len({e["baris"] for e in laporan}),
+        "error": laporan,
+    }
+
+
+
+def regenerasi_qr_siswa(upload_folder, folder_cache, progres=None):
+    """
+    Tulis ulang file QR seluruh siswa (paralel). Gambar yang kuncinya sudah ada
+    di cache cukup disalin. Mengembalikan jumlah berhasil dan daftar error.
+    """
+    os.makedirs(upload_folder, exist_ok=True)
+    os.makedirs(folder_cache, exist_ok=True)
+
+    semua = db.session.execute(select(Siswa.id, Siswa.nis, Siswa.nama)).all()
+    tugas = {nis: (id_, os.path.join(upload_folder, f"{nis}.png")) for id_, nis, _ in semua}
+    gagal = _render_semua_qr([(nis, nama, tugas[nis][1], folder_cache) for _, nis, nama in semua], progres)
+    pangkas_folder_cache(folder_cache)
+
+    berhasil = [{"id": id_, "qr_path": path} for nis, (id_, path) in tugas.items() if nis not in gagal]
+    if berhasil:
+        db.session.execute(update(Siswa), berhasil)
+    db.session.commit()
+
+    return {
+        "berhasil": len(berhasil),
+        "error": [{"nis": nis, "pesan": pesan} for nis, pesan in gagal.items()],
+    }
\ No newline at end of file
@@ -0,0 +1,168 @@
+# ======================== INDEKS IDENTITAS QR ========================
+# Berkas ini menyimpan data orang yang dibutuhkan jalur scan (nama, kelas,
+# no. HP orang tua, role) di memori proses, dengan kunci isi QR ("s<nis>" /
+# "p<no_id>", huruf kecil). Scan cukup satu lookup dict tanpa query dan tanpa
+# membuat objek ORM.
+#
+# Indeks dimuat saat aplikasi mulai. Route tambah/edit/hapus memperbarui entri
+# setelah commit; impor massal memanggil invalidate() agar indeks dimuat ulang.
+# Keduanya juga menaikkan versi bersama di database (versi_cache.py), sehingga
+# proses worker lain memuat ulang indeksnya dalam beberapa detik. ID yang belum
+# ada di indeks tetap dicari ke database sebelum dinyatakan tidak ada.
+#
+# Konfigurasi (.env):
+#   IDENTITAS_CACHE_TTL   Detik sebelum indeks dimuat ulang penuh (default 300).
+
+import os
+import threading
+import time as _time
+from typing import NamedTuple, Optional
+
+from sqlalchemy import select
+
+from models import db, Siswa, Pegawai
+from versi_cache import VersiBersama
+
+
+class IdentitasSiswa(NamedTuple):
+    nis: str
+    nama: str
+    kelas_id: Optional[int]
+    no_hp_ortu: Optional[str]
+
+
+class IdentitasPegawai(NamedTuple):
+    no_id: str
+    nama: str
+    role: str
+
+
+def _kunci(prefix, id_):
+    return f"{prefix}{id_}".lower()
+
+
+def _identitas_siswa(nis, nama, kelas_id, no_hp_ortu):
+    return _kunci("s", nis), IdentitasSiswa(nis, nama, kelas_id, no_hp_ortu)
+
+
+def _identitas_pegawai(no_id, nama, role):
+    return _kunci("p", no_id), IdentitasPegawai(no_id, nama, role)
+
+
+class IndeksIdentitas:
+    """Peta isi QR -> IdentitasSiswa / IdentitasPegawai, dimuat penuh sekali per versi."""
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._versi = 0
+        self._peta = None
+        self._versi_peta = -1
+        self._dimuat_pada = 0.0
+        self._bersama = VersiBersama("indeks_identitas")
+        self._versi_bersama_peta = None
+
+    @property
+    def ttl(self):
+        # Dibaca saat dipakai karena .env baru dimuat setelah modul ini diimpor
+        if self._ttl is None:
+            self._ttl = int(os.getenv("IDENTITAS_CACHE_TTL", "300"))
+        return self._ttl
+
+    def init_app(self, app):
+        """Muat indeks saat aplikasi mulai (tabel sudah dibuat)."""
+        with app.app_context():
+            self._ambil()
+
+    def _muat(self):
+        peta = {}
+        for baris in db.session.execute(select(Siswa.nis, Siswa.nama, Siswa.kelas_id, Siswa.no_hp_ortu)):
+            kunci, identitas = _identitas_siswa(*baris)
+            peta[kunci] = identitas
+        for baris in db.session.execute(select(Pegawai.no_id, Pegawai.nama, Pegawai.role)):
+            kunci, identitas = _identitas_pegawai(*baris)
+            peta[kunci] = identitas
+        return peta
+
+    def _basi(self):
+        return (
+            self._peta is None
+            or self._versi_peta != self._versi
+            or _time.monotonic() - self._dimuat_pada > self.ttl
+            or self._bersama.terkini() != self._versi_bersama_peta
+        )
+
+    def _ambil(self):
+        if not self._basi():
+            return self._peta
+        with self._lock:
+            if self._basi():
+                versi = self._versi
+                # Versi bersama dibaca sebelum memuat: perubahan selama pemuatan memicu muat ulang
+                versi_bersama = self._bersama.terkini(paksa=True)
+                self._peta = self._muat()
+                self._versi_peta = versi
+                self._versi_bersama_peta = versi_bersama
+                self._dimuat_pada = _time.monotonic()
+            return self._peta
+
+    def cari(self, qr_data):
+        """
+        Identitas untuk isi QR (sudah di-strip), atau None jika tidak terdaftar.
+        ID yang tidak ada di indeks dicek ke database sekali (data dari proses lain).
+        """
+        kunci = qr_data.lower()
+        identitas = self._ambil().get(kunci)
+        if identitas is not None:
+            return identitas
+
+        prefix, id_ = kunci[:1], kunci[1:]
+        if prefix == "s":
+            baris = db.session.execute(
+                select(Siswa.nis, Siswa.nama, Siswa.kelas_id, Siswa.no_hp_ortu).where(Siswa.nis == id_)
+            ).first()
+            entri = _identitas_siswa(*baris) if baris else None
+        elif prefix == "p":
+            baris = db.session.execute(
+                select(Pegawai.no_id, Pegawai.nama, Pegawai.role).where(Pegawai.no_id == id_)
+            ).first()
+            entri = _identitas_pegawai(*baris) if baris else None
+        else:
+            entri = None
+        if entri is None:
+            return None
+        self._peta[kunci] = entri[1]
+        return entri[1]
+
+    # ------------------------------------------------------------------
+    #  Pembaruan dari route CRUD (panggil setelah commit)
+    # ------------------------------------------------------------------
+    # Entri di proses ini langsung diperbarui; proses lain memuat ulang indeks
+    # setelah melihat versi bersama yang baru.
+    def perbarui_siswa(self, siswa):
+        if self._peta is not None:
+            kunci, identitas = _identitas_siswa(siswa.nis, siswa.nama, siswa.kelas_id, siswa.no_hp_ortu)
+            self._peta[kunci] = identitas
+        self._bersama.naikkan()
+
+    def perbarui_pegawai(self, pegawai):
+        if self._peta is not None:
+            kunci, identitas = _identitas_pegawai(pegawai.no_id, pegawai.nama, pegawai.role)
+            self._peta[kunci] = identitas
+        self._bersama.naikkan()
+
+    def hapus(self, prefix, id_):
+        """Hapus satu entri, prefix 's' (siswa) atau 'p' (pegawai)."""
+        if self._peta is not None:
+            self._peta.pop(_kunci(prefix, id_), None)
+        self._bersama.naikkan()
+
+    def invalidate(self):
+        """Tandai seluruh indeks usang di semua proses; dipanggil setelah impor massal."""
+        with self._lock:
+            self._versi += 1
+        self._bersama.naikkan()
+
+
+# Instance global yang dipakai route scan dan route data siswa/pegawai
+indeks_identitas = IndeksIdentitas()
\ No newline at end of file
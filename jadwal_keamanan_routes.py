@@ -5,7 +5,9 @@ from flask import (
     url_for, request, current_app
 )
 from sqlalchemy import select, delete
+from db_utils import upsert
 from models import JadwalKeamanan, Pegawai, db
+from roster_keamanan import roster_keamanan
 from utils import check_admin_session
 
 # 🟢 Inisialisasi Blueprint
@@ -80,8 +82,12 @@ def simpan_jadwal_keamanan():
     if isinstance(success, Response):
         return success
 
-    if success:
-        flash(f"Jadwal keamanan bulan {current_month}/{current_year} berhasil disimpan.", "success")
+    if success is not False:
+        flash(
+            f"Jadwal keamanan bulan {current_month}/{current_year} berhasil disimpan "
+            f"({success['ditambah']} ditambah, {success['diubah']} diubah, {success['dihapus']} dihapus).",
+            "success",
+        )
     else:
         flash("Gagal menyimpan jadwal ke database.", "danger")
 
@@ -123,29 +129,31 @@ def copy_previous_schedule():
             for sid, shifts in prev_schedules.items()
         }
 
-        curr_schedules = get_monthly_schedule(current_month, current_year)
-        if isinstance(curr_schedules, Response):
-            return curr_schedules
-
-        curr_set = set()
-        for sid, dates in curr_schedules.items():
-            for d in dates.keys():
-                curr_set.add((sid, datetime.strptime(d, "%Y-%m-%d").date()))
+        current = load_month_cells(
+            date(current_year, current_month, 1),
+            date(current_year, current_month, days_in_month),
+            security_staff_ids,
+        )
 
-        copied_count = 0
+        # Hanya slot kosong yang diisi; jadwal yang sudah ada tidak disentuh
+        desired = {}
         for sid in security_staff_ids:
             if sid not in prev_map:
                 continue
             for day in range(1, days_in_month + 1):
                 tgl = date(current_year, current_month, day)
-                if (sid, tgl) in curr_set:
+                if (sid, tgl) in current:
                     continue
                 shift = prev_map[sid].get(day)
                 if shift and shift.strip() != "":
-                    db.session.add(JadwalKeamanan(pegawai_id=sid, tanggal=tgl, shift=shift))
-                    copied_count += 1
+                    desired[(sid, tgl)] = shift
+
+        rows_upsert, _, count = diff_schedule(current, desired, removable_ids=set())
+        apply_schedule_diff(rows_upsert, [])
+        copied_count = count["ditambah"]
 
         db.session.commit()
+        roster_keamanan.invalidate()
         flash(f"Berhasil menyalin {copied_count} jadwal dari bulan sebelumnya.", "success")
 
     except Exception as e:
@@ -197,16 +205,67 @@ def get_monthly_schedule(month, year):
         current_app.logger.error(f"Error fetching monthly schedule: {e}")
         return {}
 
+def load_month_cells(start_date, end_date, staff_ids):
+    """Jadwal yang tersimpan di rentang tanggal: {(pegawai_id, tanggal): (id, shift)}."""
+    if not staff_ids:
+        return {}
+    rows = db.session.execute(
+        select(JadwalKeamanan.id, JadwalKeamanan.pegawai_id, JadwalKeamanan.tanggal, JadwalKeamanan.shift)
+        .where(
+            JadwalKeamanan.tanggal.between(start_date, end_date),
+            JadwalKeamanan.pegawai_id.in_(staff_ids),
+        )
+    ).all()
+    return {(r.pegawai_id, r.tanggal): (r.id, r.shift) for r in rows}
+
+
+def diff_schedule(current, desired, removable_ids):
+    """
+    Bandingkan jadwal tersimpan dengan jadwal yang diinginkan.
+    Mengembalikan (rows_upsert, ids_hapus, jumlah) di mana jumlah berisi
+    hitungan 'ditambah', 'diubah' dan 'dihapus'.
+    """
+    rows_upsert = []
+    count = {"ditambah": 0, "diubah": 0, "dihapus": 0}
+    for (pegawai_id, tanggal), shift in desired.items():
+        lama = current.get((pegawai_id, tanggal))
+        if lama is None:
+            count["ditambah"] += 1
+        elif lama[1] != shift:
+            count["diubah"] += 1
+        else:
+            continue
+        rows_upsert.append({"pegawai_id": pegawai_id, "tanggal": tanggal, "shift": shift})
+
+    ids_hapus = [
+        record_id for (pegawai_id, tanggal), (record_id, _) in current.items()
+        if (pegawai_id, tanggal) not in desired and pegawai_id in removable_ids
+    ]
+    count["dihapus"] = len(ids_hapus)
+    return rows_upsert, ids_hapus, count
+
+
+def apply_schedule_diff(rows_upsert, ids_hapus):
+    """Terapkan diff jadwal dengan satu upsert massal (executemany) dan satu delete."""
+    upsert(JadwalKeamanan, rows_upsert, kolom_kunci=("pegawai_id", "tanggal"), kolom_update=("shift",))
+    if ids_hapus:
+        db.session.execute(delete(JadwalKeamanan).where(JadwalKeamanan.id.in_(ids_hapus)))
+
+
 def save_monthly_schedule(month, year, form_data):
-    """Simpan atau perbarui jadwal keamanan bulanan ke database."""
+    """
+    Simpan jadwal keamanan bulanan: hanya sel yang berubah yang ditulis.
+    Mengembalikan dict jumlah perubahan (ditambah/diubah/dihapus), atau
+    False jika gagal.
+    """
     try:
         days_in_month = cal.monthrange(year, month)[1]
         start_date = date(year, month, 1)
         end_date = date(year, month, days_in_month)
 
         security_staff = get_security_staff()
-        staff_ids = [s["id"] for s in security_staff]
-        updates = []
+        staff_ids = {s["id"] for s in security_staff}
+        desired = {}
 
         for key, val in form_data.items():
             if not key.startswith("schedule_"):
@@ -216,40 +275,23 @@ def save_monthly_schedule(month, year, form_data):
             if len(parts) != 3:
                 continue
 
-            pegawai_id = int(parts[1])
-            tanggal_str = parts[2]
-
             try:
-                tanggal_obj = datetime.strptime(tanggal_str, "%Y-%m-%d").date()
+                pegawai_id = int(parts[1])
+                tanggal_obj = datetime.strptime(parts[2], "%Y-%m-%d").date()
             except ValueError:
                 continue
 
-            if start_date <= tanggal_obj <= end_date:
-                updates.append(
-                    {"pegawai_id": pegawai_id, "tanggal": tanggal_obj, "shift": val}
-                )
-
-        # Hapus jadwal lama untuk bulan ini
-        db.session.execute(
-            delete(JadwalKeamanan).filter(
-                JadwalKeamanan.tanggal.between(start_date, end_date),
-                JadwalKeamanan.pegawai_id.in_(staff_ids),
-            )
-        )
+            # Sel kosong berarti tidak ada jadwal (akan dihapus jika sebelumnya ada)
+            if start_date <= tanggal_obj <= end_date and val and val.strip() != "":
+                desired[(pegawai_id, tanggal_obj)] = val
 
-        # Tambahkan data baru
-        for item in updates:
-            if item["shift"] and item["shift"].strip() != "":
-                db.session.add(
-                    JadwalKeamanan(
-                        pegawai_id=item["pegawai_id"],
-                        tanggal=item["tanggal"],
-                        shift=item["shift"],
-                    )
-                )
+        current = load_month_cells(start_date, end_date, staff_ids | {pid for pid, _ in desired})
+        rows_upsert, ids_hapus, count = diff_schedule(current, desired, staff_ids)
+        apply_schedule_diff(rows_upsert, ids_hapus)
 
         db.session.commit()
-        return True
+        roster_keamanan.invalidate()
+        return count
 
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,263 @@
+# ======================== JOB LATAR BELAKANG ========================
+# Berkas ini berisi antrian job berbasis tabel 'job_latar' dan worker pool yang
+# menjalankannya. Operasi berat (impor CSV, regenerasi QR massal, ekspor besar)
+# cukup mendaftarkan job lalu mengembalikan ID job ke browser, sehingga worker
+# web tetap bebas melayani scan.
+#
+# Setiap worker mengklaim job 'antri' dengan UPDATE bersyarat, jadi antrian
+# aman dipakai oleh beberapa proses aplikasi sekaligus.
+#
+# Konfigurasi (.env):
+#   JOB_WORKERS        Jumlah thread worker per proses (default 2, 0 = mati).
+#   JOB_INTERVAL       Jeda polling antrian dalam detik (default 2).
+#   JOB_BATAS_MACET    Menit tanpa progres sebelum job 'berjalan' dianggap gagal (default 30).
+#   JOB_SIMPAN_JAM     Lama job & file hasil disimpan dalam jam (default 24).
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete
+
+from models import db, JobLatar
+from metrik import tahap
+
+
+class KonteksJob:
+    """Objek yang diterima fungsi job untuk melaporkan progres dan menyimpan file."""
+
+    def __init__(self, pelaksana, job_id, parameter):
+        self._pelaksana = pelaksana
+        self.id = job_id
+        self.parameter = parameter
+        self.file_hasil = None
+        self.nama_file = None
+
+    def progres(self, selesai, total=None, pesan=None):
+        """Perbarui progres job (koneksi terpisah, tidak ikut transaksi job)."""
+        nilai = {"progres": selesai, "diperbarui_pada": datetime.now()}
+        if total is not None:
+            nilai["total"] = total
+        if pesan is not None:
+            nilai["pesan"] = pesan[:255]
+        with db.engine.begin() as conn:
+            conn.execute(update(JobLatar).where(JobLatar.id == self.id).values(**nilai))
+
+    def baca_input(self):
+        """Isi file input yang diunggah bersama job (mis. CSV impor)."""
+        with open(self.path_file("input"), "rb") as f:
+            return f.read()
+
+    def path_file(self, ekstensi):
+        """Path file kerja milik job ini di folder job."""
+        return os.path.join(self._pelaksana.folder, f"{self.id}.{ekstensi}")
+
+    def simpan_hasil(self, path, nama_file):
+        """Tandai file yang bisa diunduh setelah job selesai."""
+        self.file_hasil = path
+        self.nama_file = nama_file
+
+
+class PelaksanaJob:
+    """Antrian job di database dengan worker pool thread per proses."""
+
+    def __init__(self):
+        self.app = None
+        self._fungsi = {}
+        self._berkala = []
+        self._threads = []
+        self._stop = threading.Event()
+        self._bangun = threading.Event()
+        self._bersih_terakhir = None
+
+    def tugas(self, jenis):
+        """Dekorator untuk mendaftarkan fungsi job: fungsi(job, **parameter) -> dict hasil."""
+        def daftar(fungsi):
+            self._fungsi[jenis] = fungsi
+            return fungsi
+        return daftar
+
+    def berkala(self, fungsi):
+        """Dekorator untuk fungsi penjadwal yang dipanggil worker kira-kira sekali per menit."""
+        self._berkala.append(fungsi)
+        return fungsi
+
+    def init_app(self, app, jalankan=True):
+        """
+        Baca konfigurasi, siapkan folder job dan jalankan worker.
+        jalankan=False: proses ini hanya mengirim job (dikerjakan proses lain).
+        """
+        self.app = app
+        self.folder = app.config.setdefault('JOB_FOLDER', os.path.join(app.instance_path, 'job'))
+        os.makedirs(self.folder, exist_ok=True)
+        self.jumlah_worker = int(os.getenv("JOB_WORKERS", "2"))
+        self.interval = float(os.getenv("JOB_INTERVAL", "2"))
+        self.batas_macet = timedelta(minutes=float(os.getenv("JOB_BATAS_MACET", "30")))
+        self.lama_simpan = timedelta(hours=float(os.getenv("JOB_SIMPAN_JAM", "24")))
+
+        if jalankan and self.jumlah_worker > 0:
+            self.mulai()
+
+    # ------------------------------------------------------------------
+    #  Siklus hidup worker
+    # ------------------------------------------------------------------
+    def mulai(self):
+        self._threads = [t for t in self._threads if t.is_alive()]
+        if self._threads:
+            return
+        self._stop.clear()
+        for nomor in range(self.jumlah_worker):
+            thread = threading.Thread(target=self._loop, name=f"job-latar-{nomor}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def berhenti(self, timeout=5):
+        self._stop.set()
+        self._bangun.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    dikerjakan = self.jalankan_berikutnya()
+            except Exception as e:
+                self.app.logger.error(f"Worker job error: {e}")
+                dikerjakan = False
+
+            if not dikerjakan:
+                self._bangun.wait(self.interval)
+                self._bangun.clear()
+
+    # ------------------------------------------------------------------
+    #  Antrian
+    # ------------------------------------------------------------------
+    def kirim(self, jenis, data_input=None, **parameter):
+        """
+        Daftarkan job baru ke antrian dan kembalikan ID-nya. data_input (bytes)
+        disimpan sebagai file di folder job dan dibaca job lewat baca_input().
+        """
+        if jenis not in self._fungsi:
+            raise ValueError(f"Jenis job '{jenis}' tidak dikenal.")
+        job = JobLatar(id=uuid.uuid4().hex, jenis=jenis, parameter=json.dumps(parameter), status='antri')
+        if data_input is not None:
+            with open(os.path.join(self.folder, f"{job.id}.input"), "wb") as f:
+                f.write(data_input)
+        db.session.add(job)
+        db.session.commit()
+        self._bangun.set()
+        return job.id
+
+    def _klaim(self):
+        """Ambil satu job 'antri' tertua; UPDATE bersyarat mencegah dua worker mengambil job yang sama."""
+        kandidat = db.session.execute(
+            select(JobLatar.id).where(JobLatar.status == 'antri').order_by(JobLatar.dibuat_pada.asc()).limit(5)
+        ).scalars().all()
+        for job_id in kandidat:
+            sekarang = datetime.now()
+            diklaim = db.session.execute(
+                update(JobLatar)
+                .where(JobLatar.id == job_id, JobLatar.status == 'antri')
+                .values(status='berjalan', mulai_pada=sekarang, diperbarui_pada=sekarang)
+            ).rowcount
+            db.session.commit()
+            if diklaim:
+                return db.session.get(JobLatar, job_id)
+        db.session.rollback()
+        return None
+
+    def jalankan_berikutnya(self):
+        """Jalankan satu job dari antrian. Mengembalikan False jika antrian kosong."""
+        self._rawat_antrian()
+        job = self._klaim()
+        if job is None:
+            return False
+
+        job_id, jenis = job.id, job.jenis
+        konteks = KonteksJob(self, job_id, json.loads(job.parameter or "{}"))
+        fungsi = self._fungsi.get(jenis)
+        try:
+            if fungsi is None:
+                raise ValueError(f"Jenis job '{jenis}' tidak dikenal.")
+            with tahap("job", jenis):
+                hasil = fungsi(konteks, **konteks.parameter)
+        except Exception as e:
+            db.session.rollback()
+            self.app.logger.error(f"Job {job_id} ({jenis}) gagal: {e}")
+            self._selesai(job_id, status='gagal', pesan=str(e)[:255])
+        else:
+            self._selesai(
+                job_id, status='selesai', hasil=json.dumps(hasil or {}, default=str),
+                file_hasil=konteks.file_hasil, nama_file=konteks.nama_file,
+            )
+        finally:
+            path_input = konteks.path_file("input")
+            if os.path.exists(path_input):
+                os.remove(path_input)
+        return True
+
+    def _selesai(self, job_id, **nilai):
+        db.session.execute(
+            update(JobLatar).where(JobLatar.id == job_id)
+            .values(selesai_pada=datetime.now(), diperbarui_pada=datetime.now(), **nilai)
+        )
+        db.session.commit()
+
+    def _rawat_antrian(self):
+        """
+        Tandai job macet sebagai gagal, hapus job lama dan jalankan penjadwal
+        berkala (maks. sekali per menit).
+        """
+        sekarang = datetime.now()
+        if self._bersih_terakhir and sekarang - self._bersih_terakhir < timedelta(minutes=1):
+            return
+        self._bersih_terakhir = sekarang
+
+        db.session.execute(
+            update(JobLatar)
+            .where(JobLatar.status == 'berjalan', JobLatar.diperbarui_pada < sekarang - self.batas_macet)
+            .values(status='gagal', pesan="Job terhenti (tidak ada progres).", selesai_pada=sekarang)
+        )
+        batas = sekarang - self.lama_simpan
+        lama = set(db.session.execute(
+            select(JobLatar.id).where(JobLatar.status.in_(['selesai', 'gagal']), JobLatar.selesai_pada < batas)
+        ).scalars())
+        if lama:
+            # File job (input maupun hasil) diberi nama "<id_job>.<ekstensi>"
+            for nama in os.listdir(self.folder):
+                if nama.split(".")[0] in lama:
+                    os.remove(os.path.join(self.folder, nama))
+            db.session.execute(delete(JobLatar).where(JobLatar.id.in_(lama)))
+        db.session.commit()
+
+        for fungsi in self._berkala:
+            try:
+                fungsi(self)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Penjadwal {fungsi.__name__} error: {e}")
+
+
+def status_job(job):
+    """Ringkasan status job dalam bentuk dict (untuk JSON dan template)."""
+    return {
+        "id": job.id,
+        "jenis": job.jenis,
+        "status": job.status,
+        "progres": job.progres,
+        "total": job.total,
+        "persen": int(job.progres * 100 / job.total) if job.total else (100 if job.status == 'selesai' else 0),
+        "pesan": job.pesan,
+        "hasil": json.loads(job.hasil) if job.hasil else None,
+        "ada_file": bool(job.file_hasil),
+        "dibuat_pada": job.dibuat_pada.strftime("%Y-%m-%d %H:%M:%S") if job.dibuat_pada else None,
+        "selesai_pada": job.selesai_pada.strftime("%Y-%m-%d %H:%M:%S") if job.selesai_pada else None,
+    }
+
+
+# Instance global yang dipakai app dan route
+pelaksana_job = PelaksanaJob()
@@ -0,0 +1,74 @@
+import os
+
+from flask import Blueprint, render_template, jsonify, send_file, flash, redirect, url_for, abort
+from models import db, JobLatar
+from job_latar import status_job
+from utils import check_admin_session
+
+job_bp = Blueprint("job_bp", __name__, url_prefix="/job")
+
+# Judul dan halaman asal untuk setiap jenis job
+INFO_JOB = {
+    "impor_siswa": ("Impor Data Siswa", "siswa_bp.siswa"),
+    "regenerasi_qr_siswa": ("Regenerasi QR Siswa", "siswa_bp.siswa"),
+    "impor_pegawai": ("Impor Data Pegawai", "pegawai_bp.pegawai"),
+    "regenerasi_qr_pegawai": ("Regenerasi QR Pegawai", "pegawai_bp.pegawai"),
+    "ekspor_laporan": ("Ekspor Laporan", "export_bp.export_laporan"),
+    "alfa_otomatis": ("Alfa Otomatis", "absensi_bp.absensi"),
+}
+
+
+def _ambil_job(job_id):
+    job = db.session.get(JobLatar, job_id)
+    if job is None:
+        abort(404)
+    return job
+
+
+# =======================================================================
+#  ROUTE: HALAMAN STATUS JOB (PROGRES DIPERBARUI DENGAN POLLING)
+# =======================================================================
+@job_bp.route("/<job_id>")
+def status_job_page(job_id):
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    job = _ambil_job(job_id)
+    judul, endpoint_kembali = INFO_JOB.get(job.jenis, (job.jenis, "dashboard_bp.dashboard"))
+    return render_template(
+        "job_status.html",
+        job=status_job(job),
+        judul=judul,
+        url_kembali=url_for(endpoint_kembali),
+    )
+
+
+# =======================================================================
+#  API: STATUS JOB (JSON)
+# =======================================================================
+@job_bp.route("/<job_id>/status")
+def status_job_api(job_id):
+    """Status dan progres job dalam format JSON (dipakai polling halaman status)."""
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    return jsonify(status_job(_ambil_job(job_id)))
+
+
+# =======================================================================
+#  ROUTE: UNDUH FILE HASIL JOB
+# =======================================================================
+@job_bp.route("/<job_id>/unduh")
+def unduh_hasil(job_id):
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
+
+    job = _ambil_job(job_id)
+    if job.status != 'selesai' or not job.file_hasil or not os.path.exists(job.file_hasil):
+        flash("File hasil job tidak tersedia.", "warning")
+        return redirect(url_for("job_bp.status_job_page", job_id=job_id))
+
+    return send_file(os.path.abspath(job.file_hasil), as_attachment=True, download_name=job.nama_file)
\ No newline at end of file
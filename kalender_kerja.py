@@ -0,0 +1,85 @@
+# ======================== KALENDER HARI KERJA ========================
+# Berkas ini menggabungkan libur rutin mingguan (SettingWaktu.hari_libur_rutin)
+# dan libur khusus (tabel hari_libur) menjadi satu kalender. Per tahun dibuat
+# bitmap hari kerja (1 byte per tanggal) beserta jumlah kumulatifnya, sehingga
+# cek hari kerja dan hitung jumlah hari kerja dalam rentang tanggal cukup O(1).
+#
+# Kalender dibangun bersama snapshot pengaturan (pengaturan_cache.py), jadi
+# ikut diperbarui setiap kali pengaturan atau hari libur diubah.
+
+from array import array
+from calendar import isleap
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import NamedTuple
+
+# Nama hari Bahasa Indonesia sesuai date.weekday() (0 = Senin)
+NAMA_HARI = ("Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu")
+
+
+class KeteranganLibur(NamedTuple):
+    """Alasan sebuah tanggal libur. rutin=True: keterangan berisi nama hari."""
+    rutin: bool
+    keterangan: str
+
+
+class KalenderKerja:
+    """Bitmap hari kerja per tahun, dibuat saat tahun tersebut pertama kali dipakai."""
+
+    def __init__(self, hari_libur_rutin, hari_libur):
+        self._hari_rutin = frozenset(i for i, nama in enumerate(NAMA_HARI) if nama in hari_libur_rutin)
+        self._hari_libur = dict(hari_libur)
+        self._per_tahun = {}  # tahun -> (ordinal 1 Jan, bitmap, kumulatif)
+
+    def _tahun(self, tahun):
+        peta = self._per_tahun.get(tahun)
+        if peta is None:
+            awal = date(tahun, 1, 1)
+            jumlah_hari = 366 if isleap(tahun) else 365
+            hari_awal = awal.weekday()
+            bitmap = bytearray(
+                0 if (hari_awal + i) % 7 in self._hari_rutin else 1 for i in range(jumlah_hari)
+            )
+            for tanggal in self._hari_libur:
+                if tanggal.year == tahun:
+                    bitmap[(tanggal - awal).days] = 0
+            # kumulatif[i] = jumlah hari kerja sebelum hari ke-i dalam tahun
+            kumulatif = array("H", accumulate(bitmap, initial=0))
+            peta = (awal.toordinal(), bytes(bitmap), kumulatif)
+            # Hasil selalu sama untuk tahun yang sama, jadi aman tanpa lock
+            self._per_tahun[tahun] = peta
+        return peta
+
+    def hari_kerja(self, tanggal):
+        """True jika tanggal bukan libur rutin maupun libur khusus."""
+        ordinal_awal, bitmap, _ = self._tahun(tanggal.year)
+        return bitmap[tanggal.toordinal() - ordinal_awal] == 1
+
+    def jumlah_hari_kerja(self, dari, sampai):
+        """Jumlah hari kerja dalam rentang [dari, sampai] (inklusif)."""
+        total = 0
+        for tahun in range(dari.year, sampai.year + 1):
+            ordinal_awal, _, kumulatif = self._tahun(tahun)
+            i = (dari.toordinal() - ordinal_awal) if tahun == dari.year else 0
+            j = (sampai.toordinal() - ordinal_awal + 1) if tahun == sampai.year else len(kumulatif) - 1
+            total += kumulatif[j] - kumulatif[i]
+        return max(total, 0)
+
+    def daftar_hari_kerja(self, dari, sampai):
+        """Daftar tanggal hari kerja dalam rentang [dari, sampai] (inklusif)."""
+        hasil = []
+        tanggal = dari
+        while tanggal <= sampai:
+            if self.hari_kerja(tanggal):
+                hasil.append(tanggal)
+            tanggal += timedelta(days=1)
+        return hasil
+
+    def keterangan_libur(self, tanggal):
+        """KeteranganLibur jika tanggal libur (libur rutin didahulukan), None jika hari kerja."""
+        if self.hari_kerja(tanggal):
+            return None
+        hari = tanggal.weekday()
+        if hari in self._hari_rutin:
+            return KeteranganLibur(True, NAMA_HARI[hari])
+        return KeteranganLibur(False, self._hari_libur[tanggal])
\ No newline at end of file
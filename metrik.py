@@ -0,0 +1,349 @@
+# ======================== METRIK LATENSI (FORMAT PROMETHEUS) ========================
+# Berkas ini mengumpulkan histogram durasi dan counter hasil di memori proses,
+# lalu menampilkannya di /metrics (metrik_routes.py) dalam format teks Prometheus.
+#
+# Yang diukur:
+#   absensi_http_durasi_detik      Durasi setiap permintaan HTTP per endpoint
+#                                  (sampai respons selesai dikirim, termasuk unduhan stream).
+#   absensi_tahap_durasi_detik     Durasi per tahap jalur scan (validasi, simpan, commit),
+#                                  pengiriman WhatsApp dan job latar.
+#   absensi_scan_total             Jumlah scan per hasil (berhasil, sudah_absen, ditolak, gagal).
+#   absensi_wa_kirim_total         Jumlah pengiriman WhatsApp per hasil.
+#   absensi_db_tunggu_pool_detik   Lama menunggu koneksi dari pool MySQL (profil_database.py).
+#
+# p50/p95/p99 dihitung di Prometheus dari bucket histogram, misalnya:
+#   histogram_quantile(0.95, sum by (le) (rate(absensi_tahap_durasi_detik_bucket{jalur="scan"}[5m])))
+#
+# Banyak proses: worker gunicorn berbagi satu port, jadi scrape /metrics hanya
+# mengenai satu worker. Setiap proses (termasuk job-worker) menulis salinan
+# metriknya ke folder bersama sebagai metrik_<pid>_<acak>.json (tulis atomik,
+# paling lambat setiap METRIK_TULIS_DETIK), dan /metrics menjumlahkan semua
+# berkas di folder itu, seperti mode multiprocess prometheus_client. Berkas
+# proses yang sudah berhenti tetap dihitung agar counter tidak turun; folder
+# dikosongkan saat master gunicorn mulai (gunicorn.conf.py).
+#
+# Konfigurasi (.env):
+#   METRIK_TOKEN        Token Bearer untuk scraper Prometheus. Tanpa token, /metrics
+#                       hanya bisa dibuka dengan sesi admin.
+#   METRIK_DIR          Folder berkas metrik bersama (default instance/metrik).
+#   METRIK_TULIS_DETIK  Jeda penulisan berkas metrik per proses (default 5).
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time as _time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Batas bucket dalam detik: scan normal di bawah 50 ms, laporan besar bisa beberapa detik
+BATAS_DETIK = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(nilai):
+    return str(nilai).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_label(nama_label, nilai_label, tambahan=""):
+    pasangan = [f'{nama}="{_escape(nilai)}"' for nama, nilai in zip(nama_label, nilai_label)]
+    if tambahan:
+        pasangan.append(tambahan)
+    return "{" + ",".join(pasangan) + "}" if pasangan else ""
+
+
+def _format_angka(nilai):
+    return repr(float(nilai)) if isinstance(nilai, float) else str(nilai)
+
+
+class Counter:
+    """Counter monoton per kombinasi label."""
+
+    tipe = "counter"
+
+    def __init__(self, nama, bantuan, label=(), saat_berubah=None):
+        self.nama, self.bantuan, self.label = nama, bantuan, tuple(label)
+        self._saat_berubah = saat_berubah
+        self._lock = threading.Lock()
+        self._nilai = {}  # tuple nilai label -> jumlah
+
+    def tambah(self, jumlah=1, **label):
+        kunci = tuple(str(label[n]) for n in self.label)
+        with self._lock:
+            self._nilai[kunci] = self._nilai.get(kunci, 0) + jumlah
+        if self._saat_berubah:
+            self._saat_berubah()
+
+    def nilai(self, **label):
+        return self._nilai.get(tuple(str(label[n]) for n in self.label), 0)
+
+    def salin(self):
+        """Salinan nilai proses ini: {tuple label: jumlah}."""
+        with self._lock:
+            return dict(self._nilai)
+
+    @staticmethod
+    def gabung(a, b):
+        return a + b
+
+    def baris(self, salinan=None):
+        salinan = self.salin() if salinan is None else salinan
+        for kunci, jumlah in sorted(salinan.items()):
+            yield f"{self.nama}{_format_label(self.label, kunci)} {_format_angka(jumlah)}"
+
+
+class Histogram:
+    """Histogram durasi per kombinasi label dengan bucket tetap (BATAS_DETIK)."""
+
+    tipe = "histogram"
+
+    def __init__(self, nama, bantuan, label=(), batas=BATAS_DETIK, saat_berubah=None):
+        self.nama, self.bantuan, self.label = nama, bantuan, tuple(label)
+        self.batas = tuple(batas)
+        self._saat_berubah = saat_berubah
+        self._lock = threading.Lock()
+        self._seri = {}  # tuple nilai label -> [jumlah per bucket..., +Inf], total, jumlah
+
+    def amati(self, nilai, **label):
+        kunci = tuple(str(label[n]) for n in self.label)
+        # Bucket pertama yang batasnya >= nilai (le = "kurang dari atau sama dengan")
+        indeks = bisect_left(self.batas, nilai)
+        with self._lock:
+            seri = self._seri.get(kunci)
+            if seri is None:
+                seri = self._seri[kunci] = [[0] * (len(self.batas) + 1), 0.0, 0]
+            seri[0][indeks] += 1
+            seri[1] += nilai
+            seri[2] += 1
+        if self._saat_berubah:
+            self._saat_berubah()
+
+    @contextmanager
+    def ukur(self, **label):
+        """Catat durasi blok 'with' (juga ketika blok melempar exception)."""
+        mulai = _time.perf_counter()
+        try:
+            yield
+        finally:
+            self.amati(_time.perf_counter() - mulai, **label)
+
+    def jumlah(self, **label):
+        seri = self._seri.get(tuple(str(label[n]) for n in self.label))
+        return seri[2] if seri else 0
+
+    def kuantil(self, q, **label):
+        """
+        Perkiraan kuantil (0..1) dari bucket dengan interpolasi linear, cara yang
+        sama dengan histogram_quantile Prometheus. None jika belum ada data.
+        """
+        seri = self._seri.get(tuple(str(label[n]) for n in self.label))
+        if not seri or not seri[2]:
+            return None
+        target = q * seri[2]
+        kumulatif = 0
+        for indeks, isi in enumerate(seri[0]):
+            if isi and kumulatif + isi >= target:
+                if indeks == len(self.batas):
+                    return self.batas[-1]
+                bawah = self.batas[indeks - 1] if indeks else 0.0
+                return bawah + (self.batas[indeks] - bawah) * (target - kumulatif) / isi
+            kumulatif += isi
+        return self.batas[-1]
+
+    def salin(self):
+        """Salinan seri proses ini: {tuple label: [isi bucket, total, jumlah]}."""
+        with self._lock:
+            return {kunci: [list(seri[0]), seri[1], seri[2]] for kunci, seri in self._seri.items()}
+
+    @staticmethod
+    def gabung(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+    def baris(self, salinan=None):
+        salinan = self.salin() if salinan is None else salinan
+        for kunci, (isi, total, jumlah) in sorted(salinan.items()):
+            kumulatif = 0
+            for batas, n in zip(self.batas + (float("inf"),), isi):
+                kumulatif += n
+                le = "+Inf" if batas == float("inf") else repr(batas)
+                label = _format_label(self.label, kunci, f'le="{le}"')
+                yield f"{self.nama}_bucket{label} {kumulatif}"
+            label = _format_label(self.label, kunci)
+            yield f"{self.nama}_sum{label} {_format_angka(total)}"
+            yield f"{self.nama}_count{label} {jumlah}"
+
+
+class RegistriMetrik:
+    """
+    Kumpulan metrik yang diekspor bersama di /metrics. Dengan folder bersama
+    (atur_folder), salinan metrik proses ini ditulis berkala oleh thread penulis
+    dan ekspor() menjumlahkan berkas semua proses.
+    """
+
+    def __init__(self):
+        self._metrik = []
+        self.folder = None
+        self.jeda_tulis = 5.0
+        self._lock = threading.Lock()
+        self._berubah = threading.Event()
+        self._pid_penulis = None
+        self._path_berkas = None
+
+    def counter(self, nama, bantuan, label=()):
+        metrik = Counter(nama, bantuan, label, saat_berubah=self._tandai_berubah)
+        self._metrik.append(metrik)
+        return metrik
+
+    def histogram(self, nama, bantuan, label=(), batas=BATAS_DETIK):
+        metrik = Histogram(nama, bantuan, label, batas, saat_berubah=self._tandai_berubah)
+        self._metrik.append(metrik)
+        return metrik
+
+    # ------------------------------------------------------------------
+    #  Berkas metrik bersama (banyak proses)
+    # ------------------------------------------------------------------
+    def atur_folder(self, folder, jeda_tulis=5.0):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.jeda_tulis = jeda_tulis
+
+    def _tandai_berubah(self):
+        self._berubah.set()
+        # Thread penulis dibuat saat metrik pertama tercatat di proses ini (juga
+        # setelah fork), sehingga proses yang tidak mencatat apa pun (mis. master
+        # gunicorn) tidak menulis berkas
+        if self.folder and self._pid_penulis != os.getpid():
+            with self._lock:
+                if self._pid_penulis != os.getpid():
+                    self._pid_penulis = os.getpid()
+                    self._path_berkas = os.path.join(
+                        self.folder, f"metrik_{os.getpid()}_{uuid.uuid4().hex[:8]}.json"
+                    )
+                    threading.Thread(target=self._loop_penulis, name="metrik-penulis", daemon=True).start()
+                    atexit.register(self.tulis)
+
+    def _loop_penulis(self):
+        while True:
+            self._berubah.wait()
+            _time.sleep(self.jeda_tulis)
+            self._berubah.clear()
+            try:
+                self.tulis()
+            except OSError:
+                pass
+
+    def tulis(self):
+        """Tulis salinan metrik proses ini ke berkasnya secara atomik (tmp + rename)."""
+        if not self.folder or self._pid_penulis != os.getpid():
+            return
+        data = {
+            metrik.nama: [[list(kunci), nilai] for kunci, nilai in metrik.salin().items()]
+            for metrik in self._metrik
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.folder, prefix=".metrik_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self._path_berkas)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def bersihkan_folder(self):
+        """Hapus berkas metrik proses lama; dipanggil sekali saat server mulai."""
+        if self.folder:
+            for path in glob.glob(os.path.join(self.folder, "metrik_*.json")):
+                os.remove(path)
+
+    def _gabungan(self):
+        """{nama metrik: {tuple label: nilai}} dijumlahkan dari semua berkas proses."""
+        if not self.folder:
+            return {metrik.nama: metrik.salin() for metrik in self._metrik}
+        self.tulis()
+        per_nama = {metrik.nama: metrik for metrik in self._metrik}
+        hasil = {nama: {} for nama in per_nama}
+        for path in glob.glob(os.path.join(self.folder, "metrik_*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # berkas dihapus/diganti saat dibaca
+            for nama, seri in data.items():
+                metrik = per_nama.get(nama)
+                if metrik is None:
+                    continue
+                tujuan = hasil[nama]
+                for kunci, nilai in seri:
+                    kunci = tuple(kunci)
+                    tujuan[kunci] = metrik.gabung(tujuan[kunci], nilai) if kunci in tujuan else nilai
+        return hasil
+
+    def ekspor(self):
+        """Seluruh metrik (semua proses) dalam format teks Prometheus (text/plain; version=0.0.4)."""
+        gabungan = self._gabungan()
+        baris = []
+        for metrik in self._metrik:
+            baris.append(f"# HELP {metrik.nama} {metrik.bantuan}")
+            baris.append(f"# TYPE {metrik.nama} {metrik.tipe}")
+            baris.extend(metrik.baris(gabungan.get(metrik.nama, {})))
+        return "\n".join(baris) + "\n"
+
+
+# ==============================================================================
+#  INSTANCE GLOBAL
+# ==============================================================================
+registri = RegistriMetrik()
+
+durasi_http = registri.histogram(
+    "absensi_http_durasi_detik", "Durasi permintaan HTTP per endpoint (detik).",
+    ("endpoint", "metode", "kode"),
+)
+durasi_tahap = registri.histogram(
+    "absensi_tahap_durasi_detik", "Durasi per tahap jalur scan, pengiriman WA dan job latar (detik).",
+    ("jalur", "tahap"),
+)
+hasil_scan = registri.counter(
+    "absensi_scan_total", "Jumlah scan per jalur dan hasil.", ("jalur", "hasil"),
+)
+hasil_kirim_wa = registri.counter(
+    "absensi_wa_kirim_total", "Jumlah pengiriman WhatsApp per hasil.", ("hasil",),
+)
+tunggu_pool_db = registri.histogram(
+    "absensi_db_tunggu_pool_detik", "Lama checkout koneksi dari pool database (detik).",
+)
+
+# Endpoint yang tidak diukur: koneksi SSE terbuka berjam-jam dan akan merusak histogram
+ENDPOINT_TIDAK_DIUKUR = {"dashboard_bp.stream"}
+
+
+def tahap(jalur, nama):
+    """Span durasi satu tahap: with tahap("scan", "commit"): ..."""
+    return durasi_tahap.ukur(jalur=jalur, tahap=nama)
+
+
+def init_app(app):
+    """Siapkan folder metrik bersama dan pasang pengukur durasi HTTP untuk semua endpoint."""
+    from flask import g, request
+
+    registri.atur_folder(
+        os.getenv("METRIK_DIR") or os.path.join(app.instance_path, "metrik"),
+        float(os.getenv("METRIK_TULIS_DETIK", "5")),
+    )
+
+    @app.before_request
+    def _mulai_ukur():
+        g.metrik_mulai = _time.perf_counter()
+
+    @app.after_request
+    def _selesai_ukur(response):
+        mulai = g.pop("metrik_mulai", None)
+        endpoint = request.endpoint or "tidak_dikenal"
+        if mulai is None or endpoint in ENDPOINT_TIDAK_DIUKUR:
+            return response
+        label = {"endpoint": endpoint, "metode": request.method, "kode": response.status_code}
+        # Dicatat saat respons ditutup, agar unduhan stream terhitung sampai selesai
+        response.call_on_close(lambda: durasi_http.amati(_time.perf_counter() - mulai, **label))
+        return response
\ No newline at end of file
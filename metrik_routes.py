@@ -0,0 +1,23 @@
+import hmac
+import os
+
+from flask import Blueprint, Response, request, session, abort
+from metrik import registri
+
+metrik_bp = Blueprint("metrik_bp", __name__)
+
+
+# =======================================================================
+#  ROUTE: METRIK PROMETHEUS
+#  Scraper mengirim header "Authorization: Bearer <METRIK_TOKEN>".
+#  Tanpa METRIK_TOKEN di .env, hanya sesi admin yang boleh membuka.
+# =======================================================================
+@metrik_bp.route("/metrics")
+def metrics():
+    token = os.getenv("METRIK_TOKEN")
+    diizinkan = "admin" in session
+    if token and not diizinkan:
+        diizinkan = hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not diizinkan:
+        abort(403)
+    return Response(registri.ekspor(), mimetype="text/plain; version=0.0.4; charset=utf-8")
\ No newline at end of file
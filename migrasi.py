@@ -0,0 +1,119 @@
+# ======================== MIGRASI DATABASE ========================
+# db.create_all() hanya membuat tabel baru, tidak menambahkan indeks ke tabel
+# yang sudah ada. Berkas ini berisi perintah CLI untuk memperbarui database
+# lama (MySQL) agar sesuai dengan definisi di models.py.
+#
+# Pemakaian:
+#   flask --app app migrasi-indeks          # laporkan catatan ganda, buat indeks yang aman
+#   flask --app app migrasi-indeks --hapus  # hapus catatan ganda lalu buat unique index
+#
+# Catatan ganda per (id, tanggal, jenis_absen): untuk masuk/pulang yang disimpan
+# adalah scan paling awal, untuk 'lainnya' (Sakit/Izin/Alfa yang diisi admin)
+# yang disimpan adalah koreksi terakhir.
+
+from itertools import groupby
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, func, inspect, select
+
+from models import db, Absensi, AbsensiPegawai
+from rekap import rebuild_rekap
+
+# Tabel absensi beserta kolom identitas yang menjadi kunci unik harian
+TABEL_ABSENSI = [
+    (Absensi, "nis"),
+    (AbsensiPegawai, "no_id"),
+]
+
+
+def cari_duplikat_absensi(model, kolom_id):
+    """
+    Catatan yang akan dihapus agar (id, tanggal, jenis_absen) unik, sebagai
+    list baris (id, id orang, tanggal, jenis_absen, waktu, status).
+    """
+    kolom = getattr(model, kolom_id)
+    kunci = (kolom, model.tanggal, model.jenis_absen)
+    ganda = (
+        select(*kunci)
+        .where(model.jenis_absen.isnot(None))
+        .group_by(*kunci)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    baris = db.session.execute(
+        select(model.id, kolom, model.tanggal, model.jenis_absen, model.waktu, model.status)
+        .join(ganda, and_(kolom == ganda.c[kolom_id], model.tanggal == ganda.c.tanggal,
+                          model.jenis_absen == ganda.c.jenis_absen))
+        .order_by(kolom, model.tanggal, model.jenis_absen, model.id)
+    ).all()
+
+    dihapus = []
+    # ID dibandingkan tanpa membedakan huruf besar/kecil, sama seperti unique index MySQL
+    for (_, _, jenis_absen), grup in groupby(baris, key=lambda b: (b[1].lower(), b[2], b[3])):
+        grup = list(grup)
+        simpan = grup[-1] if jenis_absen == "lainnya" else grup[0]
+        dihapus.extend(b for b in grup if b is not simpan)
+    return dihapus
+
+
+def hapus_duplikat_absensi(model, daftar_id):
+    """Hapus catatan absensi berdasarkan primary key lalu commit."""
+    for awal in range(0, len(daftar_id), 500):
+        db.session.execute(delete(model).where(model.id.in_(daftar_id[awal:awal + 500])))
+    db.session.commit()
+    return len(daftar_id)
+
+
+def migrasi_indeks_absensi(hapus=False):
+    """
+    Tambahkan indeks komposit dan unique constraint pada tabel absensi.
+    Tanpa hapus=True catatan ganda hanya dilaporkan dan unique index dilewati.
+    """
+    pesan = []
+    for model, kolom_id in TABEL_ABSENSI:
+        tabel = model.__table__
+        sudah_ada = {ix["name"] for ix in inspect(db.engine).get_indexes(tabel.name)}
+        indeks_baru = [ix for ix in tabel.indexes if ix.name not in sudah_ada]
+
+        if not indeks_baru:
+            pesan.append(f"{tabel.name}: semua indeks sudah ada.")
+            continue
+
+        # Unique index gagal dibuat jika masih ada data ganda
+        if any(ix.unique for ix in indeks_baru):
+            duplikat = cari_duplikat_absensi(model, kolom_id)
+            if duplikat and hapus:
+                jumlah = hapus_duplikat_absensi(model, [b.id for b in duplikat])
+                # Rekap harian tanggal yang terdampak dihitung ulang dari tabel absensi
+                tanggal = [b.tanggal for b in duplikat]
+                rebuild_rekap(min(tanggal), max(tanggal))
+                pesan.append(f"{tabel.name}: {jumlah} catatan ganda dihapus.")
+            elif duplikat:
+                pesan.append(f"{tabel.name}: {len(duplikat)} catatan ganda akan dihapus dengan --hapus:")
+                pesan.extend(
+                    f"  id={b.id} {kolom_id}={b[1]} {b.tanggal} {b.jenis_absen} {b.waktu} {b.status}"
+                    for b in duplikat
+                )
+                pesan.append(f"{tabel.name}: unique index dilewati sampai catatan ganda dihapus.")
+                indeks_baru = [ix for ix in indeks_baru if not ix.unique]
+
+        for ix in indeks_baru:
+            ix.create(bind=db.engine)
+            pesan.append(f"{tabel.name}: indeks {ix.name} dibuat.")
+    return pesan
+
+
+@click.command("migrasi-indeks")
+@click.option("--hapus", is_flag=True,
+              help="Hapus catatan absensi ganda agar unique index bisa dibuat (tanpa opsi ini hanya dilaporkan).")
+@with_appcontext
+def migrasi_indeks_command(hapus):
+    """Tambahkan indeks & unique constraint absensi ke database yang sudah ada."""
+    for baris in migrasi_indeks_absensi(hapus=hapus):
+        click.echo(baris)
+
+
+def init_app(app):
+    """Daftarkan perintah migrasi ke Flask CLI."""
+    app.cli.add_command(migrasi_indeks_command)
@@ -4,7 +4,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, time, date
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import UniqueConstraint, ForeignKey, String, Integer, Date, Time
+from sqlalchemy import UniqueConstraint, Index, ForeignKey, String, Integer, Date, Time, DateTime, Text
 
 # Inisialisasi objek SQLAlchemy
 db = SQLAlchemy()
@@ -49,6 +49,13 @@ class Absensi(db.Model):
     keterangan: Mapped[str] = mapped_column(String(100), nullable=True)
     jenis_absen: Mapped[str] = mapped_column(String(10), nullable=True)
 
+    # Satu siswa hanya boleh punya satu catatan per (tanggal, jenis_absen);
+    # indeks tanggal dipakai oleh tampilan harian dan statistik dashboard.
+    __table_args__ = (
+        Index('uq_absensi_nis_tanggal_jenis', 'nis', 'tanggal', 'jenis_absen', unique=True),
+        Index('ix_absensi_tanggal_status_jenis', 'tanggal', 'status', 'jenis_absen'),
+    )
+
 
 # --- Model untuk Pengaturan Waktu Siswa ---
 class SettingWaktu(db.Model):
@@ -116,6 +123,11 @@ class AbsensiPegawai(db.Model):
     jenis_absen: Mapped[str] = mapped_column(String(10), nullable=True)
     pegawai_relasi: Mapped["Pegawai"] = relationship(back_populates="absensi_list")
 
+    __table_args__ = (
+        Index('uq_absensi_pegawai_no_id_tanggal_jenis', 'no_id', 'tanggal', 'jenis_absen', unique=True),
+        Index('ix_absensi_pegawai_tanggal_status_jenis', 'tanggal', 'status', 'jenis_absen'),
+    )
+
 
 # --- Model untuk Pengaturan Waktu Guru & Staf ---
 class SettingWaktuGuruStaf(db.Model):
@@ -150,4 +162,97 @@ class HariLibur(db.Model):
     keterangan: Mapped[str] = mapped_column(String(150), nullable=False)
 
     def __repr__(self):
-        return f'<HariLibur {self.tanggal.strftime("%Y-%m-%d")}: {self.keterangan}>'
\ No newline at end of file
+        return f'<HariLibur {self.tanggal.strftime("%Y-%m-%d")}: {self.keterangan}>'
+
+# --- Model untuk Antrian (Outbox) Notifikasi WhatsApp ---
+class NotifikasiWA(db.Model):
+    """Model tabel 'notifikasi_wa' sebagai outbox pesan WhatsApp yang dikirim di latar belakang."""
+    __tablename__ = 'notifikasi_wa'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    target: Mapped[str] = mapped_column(String(20), nullable=False)
+    pesan: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default='pending')  # pending / mengirim / terkirim / gagal
+    percobaan: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    jadwal_kirim: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    dibuat_pada: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    terkirim_pada: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    diklaim_pada: Mapped[datetime] = mapped_column(DateTime, nullable=True)  # saat diklaim dispatcher (status 'mengirim')
+    error_terakhir: Mapped[str] = mapped_column(String(255), nullable=True)
+
+    __table_args__ = (Index('ix_notifikasi_wa_status_jadwal', 'status', 'jadwal_kirim'),)
+
+    def __repr__(self):
+        return f'<NotifikasiWA {self.target} ({self.status})>'
+
+
+# --- Model untuk Rekap Harian (Tabel Ringkasan Absensi) ---
+class RekapHarian(db.Model):
+    """Model tabel 'rekap_harian' berisi jumlah catatan absensi per tanggal, grup dan status."""
+    __tablename__ = 'rekap_harian'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tanggal: Mapped[date] = mapped_column(Date, nullable=False)
+    tipe: Mapped[str] = mapped_column(String(10), nullable=False)         # 'siswa' / 'pegawai'
+    grup: Mapped[str] = mapped_column(String(50), nullable=False)         # kelas_id (siswa) atau role (pegawai)
+    jenis_absen: Mapped[str] = mapped_column(String(10), nullable=False)  # masuk / pulang / lainnya
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    jumlah: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint('tanggal', 'tipe', 'grup', 'jenis_absen', 'status', name='_rekap_harian_uc'),)
+
+    def __repr__(self):
+        return f'<RekapHarian {self.tanggal} {self.tipe}:{self.grup} {self.jenis_absen}/{self.status}={self.jumlah}>'
+
+
+# --- Model untuk Delta Rekap Harian (ditulis per transaksi absensi) ---
+class RekapDelta(db.Model):
+    """Model tabel 'rekap_delta': perubahan jumlah rekap yang belum dilipat ke 'rekap_harian'."""
+    __tablename__ = 'rekap_delta'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tanggal: Mapped[date] = mapped_column(Date, nullable=False)
+    tipe: Mapped[str] = mapped_column(String(10), nullable=False)
+    grup: Mapped[str] = mapped_column(String(50), nullable=False)
+    jenis_absen: Mapped[str] = mapped_column(String(10), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False)
+    jumlah: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    __table_args__ = (Index('ix_rekap_delta_tipe_tanggal', 'tipe', 'tanggal'),)
+
+    def __repr__(self):
+        return f'<RekapDelta {self.tanggal} {self.tipe}:{self.grup} {self.jenis_absen}/{self.status}{self.jumlah:+d}>'
+
+
+# --- Model untuk Job Latar Belakang (Impor, Ekspor, Regenerasi QR) ---
+class JobLatar(db.Model):
+    """Model tabel 'job_latar' sebagai antrian dan status job yang berjalan di latar belakang."""
+    __tablename__ = 'job_latar'
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    jenis: Mapped[str] = mapped_column(String(30), nullable=False)
+    parameter: Mapped[str] = mapped_column(Text, nullable=True)           # JSON
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default='antri')  # antri / berjalan / selesai / gagal
+    progres: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    pesan: Mapped[str] = mapped_column(String(255), nullable=True)
+    hasil: Mapped[str] = mapped_column(Text, nullable=True)               # JSON
+    file_hasil: Mapped[str] = mapped_column(String(255), nullable=True)
+    nama_file: Mapped[str] = mapped_column(String(150), nullable=True)
+    dibuat_pada: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    mulai_pada: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    diperbarui_pada: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    selesai_pada: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (Index('ix_job_latar_status_dibuat', 'status', 'dibuat_pada'),)
+
+    def __repr__(self):
+        return f'<JobLatar {self.id} {self.jenis} ({self.status})>'
+
+
+# --- Model untuk Versi Cache Bersama (sinkronisasi cache antar proses) ---
+class VersiCache(db.Model):
+    """Model tabel 'versi_cache': satu nomor versi per cache di memori proses (lihat versi_cache.py)."""
+    __tablename__ = 'versi_cache'
+    nama: Mapped[str] = mapped_column(String(50), primary_key=True)
+    versi: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    diperbarui_pada: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<VersiCache {self.nama}={self.versi}>'
\ No newline at end of file
@@ -0,0 +1,266 @@
+# ======================== PENGIRIM NOTIFIKASI WHATSAPP ========================
+# Berkas ini berisi dispatcher latar belakang yang menguras tabel outbox
+# 'notifikasi_wa'. Route scan cukup menambahkan baris outbox di transaksi yang
+# sama dengan data absensi; pengiriman ke gateway (Fonnte) dilakukan di sini
+# sehingga latensi scan tidak lagi bergantung pada gateway.
+#
+# Tidak ada transaksi database yang terbuka selama panggilan HTTP:
+#   1. klaim: baris 'pending' yang jatuh tempo diubah menjadi 'mengirim' (plus
+#      diklaim_pada) dalam transaksi pendek, lalu commit;
+#   2. kirim: pesan dikirim ke gateway tanpa transaksi (dan tanpa lock) terbuka;
+#   3. catat: hasil setiap pesan disimpan dalam transaksi pendek kedua.
+# Dengan begitu INSERT outbox dari route scan tidak pernah menunggu gap lock
+# milik dispatcher. Klaim yang tertinggal (proses mati saat mengirim)
+# dikembalikan ke 'pending' setelah WA_KLAIM_KEDALUWARSA detik.
+#
+# Konfigurasi (.env):
+#   WA_API_URL            URL gateway (default: https://api.fonnte.com/send).
+#                         Arahkan ke gateway palsu lokal untuk pengujian.
+#   WA_API_TOKEN          Token otorisasi gateway. Tanpa token dispatcher tidak
+#                         dijalankan (pesan tetap antre di outbox).
+#   WA_DISPATCHER_AKTIF   "0" untuk mematikan thread dispatcher.
+#   WA_BATCH              Jumlah pesan yang diambil per putaran (default 20).
+#   WA_RATE_PER_DETIK     Batas pengiriman per detik (default 5).
+#   WA_MAKS_PERCOBAAN     Batas percobaan sebelum pesan ditandai gagal (default 5).
+#   WA_TIMEOUT            Timeout HTTP dalam detik (default 10).
+#   WA_KLAIM_KEDALUWARSA  Detik sebelum klaim 'mengirim' dianggap tertinggal
+#                         (default: perkiraan waktu satu batch + 60).
+#
+# Pengujian lokal tanpa gateway sungguhan: gateway_wa_palsu.py.
+
+import os
+import random
+import threading
+import time as _time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import select, update
+
+from models import db, NotifikasiWA
+from metrik import tahap, hasil_kirim_wa
+
+DEFAULT_API_URL = "https://api.fonnte.com/send"
+
+
+class PesanKlaim(NamedTuple):
+    """Salinan baris outbox yang sudah diklaim, dipakai di luar transaksi."""
+    id: int
+    target: str
+    pesan: str
+    percobaan: int
+
+
+def buat_notifikasi_absensi(nomor, nama, jenis_absen, status_absen, waktu):
+    """Buat baris outbox untuk notifikasi absensi siswa ke orang tua."""
+    pesan = (
+        f"📚 *Notifikasi Absensi Sekolah*\n\n"
+        f"Anak Anda, {nama}, telah melakukan absen *{jenis_absen}* "
+        f"dengan status *{status_absen}* pada pukul {waktu.strftime('%H:%M:%S')}."
+    )
+    return NotifikasiWA(target=nomor, pesan=pesan)
+
+
+class PengirimWA:
+    """Dispatcher outbox WhatsApp dengan batching, retry/backoff dan rate limit."""
+
+    def __init__(self):
+        self.app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._bangun = threading.Event()
+        self._rate_lock = threading.Lock()
+        self._kirim_terakhir = 0.0
+        self._sesi = None
+
+    def init_app(self, app, jalankan=True):
+        """
+        Baca konfigurasi dari environment dan jalankan thread dispatcher.
+        jalankan=False: hanya konfigurasi (proses lain yang mengirim pesan).
+        """
+        self.app = app
+        self.api_url = os.getenv("WA_API_URL", DEFAULT_API_URL)
+        self.api_token = os.getenv("WA_API_TOKEN", "")
+        self.batch = int(os.getenv("WA_BATCH", "20"))
+        self.rate_per_detik = float(os.getenv("WA_RATE_PER_DETIK", "5"))
+        self.maks_percobaan = int(os.getenv("WA_MAKS_PERCOBAAN", "5"))
+        self.timeout = float(os.getenv("WA_TIMEOUT", "10"))
+        self.interval = float(os.getenv("WA_INTERVAL", "2"))
+        jeda_rate = 1.0 / self.rate_per_detik if self.rate_per_detik > 0 else 0.0
+        self.klaim_kedaluwarsa = float(os.getenv(
+            "WA_KLAIM_KEDALUWARSA", self.batch * (self.timeout + jeda_rate) + 60
+        ))
+
+        if not jalankan or os.getenv("WA_DISPATCHER_AKTIF", "1") != "1":
+            return
+        if not self.api_token:
+            app.logger.warning("WA_API_TOKEN belum diisi; dispatcher WhatsApp tidak dijalankan.")
+            return
+        self.mulai()
+
+    # ------------------------------------------------------------------
+    #  Siklus hidup thread
+    # ------------------------------------------------------------------
+    def mulai(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="pengirim-wa", daemon=True)
+        self._thread.start()
+
+    @property
+    def aktif(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def berhenti(self, timeout=5):
+        self._stop.set()
+        self._bangun.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def bangunkan(self):
+        """Beri tahu dispatcher bahwa ada pesan baru di outbox."""
+        self._bangun.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    jumlah = self.proses_batch()
+            except Exception as e:
+                self.app.logger.error(f"Dispatcher WA error: {e}")
+                jumlah = 0
+
+            # Batch penuh berarti kemungkinan masih ada antrian, langsung lanjut
+            if jumlah < self.batch:
+                self._bangun.wait(self.interval)
+                self._bangun.clear()
+
+    # ------------------------------------------------------------------
+    #  Pengiriman
+    # ------------------------------------------------------------------
+    def _session(self):
+        """Session HTTP dengan connection pool yang dipakai ulang antar pesan."""
+        if self._sesi is None:
+            sesi = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            sesi.mount("http://", adapter)
+            sesi.mount("https://", adapter)
+            sesi.headers["Authorization"] = self.api_token
+            self._sesi = sesi
+        return self._sesi
+
+    def _tunggu_rate(self):
+        """Batasi laju pengiriman agar tidak melebihi WA_RATE_PER_DETIK."""
+        if self.rate_per_detik <= 0:
+            return
+        jeda_minimum = 1.0 / self.rate_per_detik
+        with self._rate_lock:
+            sisa = self._kirim_terakhir + jeda_minimum - _time.monotonic()
+            if sisa > 0:
+                _time.sleep(sisa)
+            self._kirim_terakhir = _time.monotonic()
+
+    def _kirim(self, notifikasi):
+        """Kirim satu pesan. Mengembalikan None jika berhasil, atau pesan error."""
+        try:
+            response = self._session().post(
+                self.api_url,
+                data={"target": notifikasi.target, "message": notifikasi.pesan},
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            return str(e)
+
+        if response.status_code != 200:
+            return f"HTTP {response.status_code}"
+
+        # Fonnte menjawab 200 dengan {"status": false, "reason": ...} bila gagal
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        if isinstance(body, dict) and body.get("status") is False:
+            return str(body.get("reason") or "Ditolak gateway")
+        return None
+
+    def _jeda_backoff(self, percobaan):
+        """Backoff eksponensial (maks. 15 menit) dengan sedikit jitter."""
+        dasar = min(900, 10 * (2 ** (percobaan - 1)))
+        return timedelta(seconds=dasar + random.uniform(0, dasar / 4))
+
+    def klaim_batch(self):
+        """
+        Transaksi pendek: kembalikan klaim yang tertinggal, klaim satu batch
+        pesan yang jatuh tempo ('pending' -> 'mengirim'), lalu commit.
+        """
+        sekarang = datetime.now()
+        db.session.execute(
+            update(NotifikasiWA)
+            .where(
+                NotifikasiWA.status == 'mengirim',
+                NotifikasiWA.diklaim_pada < sekarang - timedelta(seconds=self.klaim_kedaluwarsa),
+            )
+            .values(status='pending', diklaim_pada=None)
+        )
+        baris = db.session.execute(
+            select(NotifikasiWA.id, NotifikasiWA.target, NotifikasiWA.pesan, NotifikasiWA.percobaan)
+            .where(NotifikasiWA.status == 'pending', NotifikasiWA.jadwal_kirim <= sekarang)
+            .order_by(NotifikasiWA.id.asc())
+            .limit(self.batch)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if baris:
+            db.session.execute(
+                update(NotifikasiWA)
+                .where(NotifikasiWA.id.in_([b.id for b in baris]))
+                .values(status='mengirim', diklaim_pada=sekarang)
+            )
+        db.session.commit()
+        return [PesanKlaim(*b) for b in baris]
+
+    def catat_hasil(self, hasil):
+        """Transaksi pendek: simpan hasil pengiriman [(PesanKlaim, error atau None)]."""
+        for pesan, error in hasil:
+            if error is None:
+                nilai = dict(status='terkirim', terkirim_pada=datetime.now(), error_terakhir=None)
+            else:
+                percobaan = pesan.percobaan + 1
+                nilai = dict(percobaan=percobaan, error_terakhir=error[:255])
+                if percobaan >= self.maks_percobaan:
+                    nilai["status"] = 'gagal'
+                else:
+                    nilai["status"] = 'pending'
+                    nilai["jadwal_kirim"] = datetime.now() + self._jeda_backoff(percobaan)
+            db.session.execute(
+                update(NotifikasiWA)
+                .where(NotifikasiWA.id == pesan.id, NotifikasiWA.status == 'mengirim')
+                .values(diklaim_pada=None, **nilai)
+            )
+        db.session.commit()
+
+    def proses_batch(self):
+        """Klaim satu batch pesan yang jatuh tempo, kirim tanpa transaksi terbuka, lalu simpan hasilnya."""
+        antrian = self.klaim_batch()
+        if not antrian:
+            return 0
+
+        hasil = []
+        try:
+            for pesan in antrian:
+                self._tunggu_rate()
+                with tahap("wa", "kirim"):
+                    error = self._kirim(pesan)
+                hasil_kirim_wa.tambah(hasil="terkirim" if error is None else "error")
+                hasil.append((pesan, error))
+        finally:
+            # Hasil yang sudah didapat tetap dicatat; sisanya menunggu klaim kedaluwarsa
+            if hasil:
+                self.catat_hasil(hasil)
+        return len(antrian)
+
+
+# Instance global yang dipakai oleh app dan route scan
+pengirim_wa = PengirimWA()
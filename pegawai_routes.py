@@ -1,9 +1,13 @@
 import csv
 import io
 import os
-from flask import Blueprint, request, flash, render_template, redirect, url_for, send_file, current_app
+from flask import Blueprint, request, flash, render_template, redirect, url_for, current_app
+from sqlalchemy import select
 from models import Pegawai, db
-from utils import check_admin_session, create_qr_pegawai
+from job_latar import pelaksana_job
+from indeks_identitas import indeks_identitas
+from qr_cache import response_qr_pegawai, simpan_qr_pegawai
+from utils import check_admin_session
 
 pegawai_bp = Blueprint("pegawai_bp", __name__, url_prefix="/pegawai")
 
@@ -44,14 +48,14 @@ def pegawai():
 
         qr_filename = f"{no_id}.png"
         qr_path = os.path.join(upload_folder, qr_filename)
-        qr_image = create_qr_pegawai(no_id, nama, role)
-        qr_image.save(qr_path)
+        simpan_qr_pegawai(no_id, nama, role, qr_path)
 
         if pegawai_edit:
             pegawai_edit.nama = nama
             pegawai_edit.role = role
             pegawai_edit.qr_path = qr_path
             db.session.commit()
+            indeks_identitas.perbarui_pegawai(pegawai_edit)
             flash("Data pegawai berhasil diperbarui.", "success")
         else:
             if Pegawai.query.filter_by(no_id=no_id).first():
@@ -61,6 +65,7 @@ def pegawai():
             pegawai_baru = Pegawai(no_id=no_id, nama=nama, role=role, qr_path=qr_path)
             db.session.add(pegawai_baru)
             db.session.commit()
+            indeks_identitas.perbarui_pegawai(pegawai_baru)
             flash("Data pegawai berhasil ditambahkan.", "success")
 
         return redirect(url_for("pegawai_bp.pegawai"))
@@ -95,12 +100,8 @@ def view_qr_pegawai(no_id):
     if not pegawai_data:
         return "Pegawai tidak ditemukan", 404
 
-    img = create_qr_pegawai(pegawai_data.no_id, pegawai_data.nama, pegawai_data.role)
-    img_io = io.BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
-
-    return send_file(img_io, mimetype='image/png')
+    # Gambar diambil dari cache QR (ETag/304), hanya dibuat ulang jika data berubah
+    return response_qr_pegawai(pegawai_data.no_id, pegawai_data.nama, pegawai_data.role)
 
 
 @pegawai_bp.route('/download_qr/<no_id>')
@@ -110,13 +111,8 @@ def download_qr_pegawai(no_id):
         flash("Pegawai tidak ditemukan.", "danger")
         return redirect(url_for("pegawai_bp.pegawai"))
 
-    img = create_qr_pegawai(pegawai_data.no_id, pegawai_data.nama, pegawai_data.role)
-    img_io = io.BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
-
     filename = f"{pegawai_data.nama}_{pegawai_data.no_id}.png"
-    return send_file(img_io, mimetype='image/png', as_attachment=True, download_name=filename)
+    return response_qr_pegawai(pegawai_data.no_id, pegawai_data.nama, pegawai_data.role, download_name=filename)
 
 
 # =======================================================================
@@ -138,6 +134,7 @@ def hapus_pegawai(id):
 
         db.session.delete(pegawai)
         db.session.commit()
+        indeks_identitas.hapus("p", pegawai.no_id)
         flash("Data pegawai berhasil dihapus.", "success")
 
     return redirect(url_for("pegawai_bp.pegawai"))
@@ -161,43 +158,80 @@ def import_pegawai():
         flash("Pilih file CSV yang valid.", "danger")
         return redirect(url_for("pegawai_bp.pegawai"))
 
-    try:
-        stream = io.StringIO(file.stream.read().decode("UTF-8"))
-        csv_input = csv.DictReader(stream)
-
-        upload_folder = current_app.config['QR_FOLDER_PEGAWAI']
-        os.makedirs(upload_folder, exist_ok=True)
-
-        count_new = 0
-        count_skip = 0
-
-        for row in csv_input:
-            no_id = row.get("no_id")
-            nama = row.get("nama")
-            role = row.get("role")
-
-            if not no_id or not nama or not role:
-                count_skip += 1
-                continue
-
-            if Pegawai.query.filter_by(no_id=no_id).first():
-                count_skip += 1
-                continue
+    # Impor dijalankan di job latar; browser diarahkan ke halaman progres job
+    job_id = pelaksana_job.kirim("impor_pegawai", data_input=file.stream.read())
+    return redirect(url_for("job_bp.status_job_page", job_id=job_id))
 
-            qr_filename = f"{no_id}.png"
-            qr_path = os.path.join(upload_folder, qr_filename)
-            qr_image = create_qr_pegawai(no_id, nama, role)
-            qr_image.save(qr_path)
 
-            pegawai_baru = Pegawai(no_id=no_id, nama=nama, role=role, qr_path=qr_path)
-            db.session.add(pegawai_baru)
-            count_new += 1
+# =======================================================================
+# ROUTE: REGENERASI QR SEMUA PEGAWAI
+# =======================================================================
+@pegawai_bp.route("/regenerasi_qr", methods=["POST"])
+def regenerasi_qr():
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
 
-        db.session.commit()
-        flash(f"Impor selesai: {count_new} pegawai baru ditambahkan, {count_skip} dilewati.", "success")
+    job_id = pelaksana_job.kirim("regenerasi_qr_pegawai")
+    return redirect(url_for("job_bp.status_job_page", job_id=job_id))
 
-    except Exception as e:
-        db.session.rollback()
-        flash(f"Terjadi kesalahan saat mengimpor: {str(e)}", "danger")
 
-    return redirect(url_for("pegawai_bp.pegawai"))
\ No newline at end of file
+# =======================================================================
+# JOB LATAR: IMPOR & REGENERASI QR PEGAWAI
+# =======================================================================
+@pelaksana_job.tugas("impor_pegawai")
+def job_impor_pegawai(job):
+    csv_input = list(csv.DictReader(io.StringIO(job.baca_input().decode("utf-8-sig"))))
+
+    upload_folder = current_app.config['QR_FOLDER_PEGAWAI']
+    os.makedirs(upload_folder, exist_ok=True)
+
+    # Seluruh no_id yang sudah terdaftar diambil sekali, bukan satu query per baris
+    sudah_ada = set(db.session.execute(select(Pegawai.no_id)).scalars())
+    count_new = 0
+    count_skip = 0
+
+    for nomor, row in enumerate(csv_input, start=1):
+        no_id = row.get("no_id")
+        nama = row.get("nama")
+        role = row.get("role")
+
+        if not no_id or not nama or not role or no_id in sudah_ada:
+            count_skip += 1
+            continue
+
+        qr_path = os.path.join(upload_folder, f"{no_id}.png")
+        simpan_qr_pegawai(no_id, nama, role, qr_path)
+
+        db.session.add(Pegawai(no_id=no_id, nama=nama, role=role, qr_path=qr_path))
+        sudah_ada.add(no_id)
+        count_new += 1
+
+        if nomor % 50 == 0:
+            job.progres(nomor, len(csv_input))
+
+    db.session.commit()
+    # Impor massal: indeks identitas dimuat ulang penuh saat scan berikutnya
+    indeks_identitas.invalidate()
+    job.progres(len(csv_input), len(csv_input))
+    return {
+        "baru": count_new,
+        "dilewati": count_skip,
+        "ringkasan": f"Impor selesai: {count_new} pegawai baru ditambahkan, {count_skip} dilewati.",
+    }
+
+
+@pelaksana_job.tugas("regenerasi_qr_pegawai")
+def job_regenerasi_qr_pegawai(job):
+    upload_folder = current_app.config['QR_FOLDER_PEGAWAI']
+    os.makedirs(upload_folder, exist_ok=True)
+
+    semua = Pegawai.query.all()
+    for nomor, pegawai in enumerate(semua, start=1):
+        pegawai.qr_path = os.path.join(upload_folder, f"{pegawai.no_id}.png")
+        simpan_qr_pegawai(pegawai.no_id, pegawai.nama, pegawai.role, pegawai.qr_path)
+        if nomor % 50 == 0 or nomor == len(semua):
+            job.progres(nomor, len(semua))
+
+    db.session.commit()
+    return {"berhasil": len(semua), "ringkasan": f"QR {len(semua)} pegawai berhasil dibuat ulang."}
\ No newline at end of file
@@ -0,0 +1,141 @@
+# ======================== CACHE PENGATURAN & HARI LIBUR ========================
+# Berkas ini menyimpan salinan (snapshot) seluruh pengaturan waktu absensi dan
+# daftar hari libur di memori proses, agar jalur scan tidak perlu membaca tabel
+# pengaturan pada setiap request. Perubahan di proses lain terdeteksi lewat
+# versi bersama di database (versi_cache.py).
+
+import os
+import threading
+import time as _time
+from datetime import time
+from typing import NamedTuple, Optional
+
+from kalender_kerja import KalenderKerja
+from models import SettingWaktu, SettingWaktuGuruStaf, SettingWaktuKeamanan, HariLibur
+from resolver_waktu import ResolverJadwal
+from versi_cache import VersiBersama
+
+
+class JendelaWaktu(NamedTuple):
+    """Salinan ringan rentang waktu absensi (tidak terikat sesi ORM)."""
+    jam_masuk_mulai: time
+    jam_masuk_selesai: time
+    jam_terlambat_selesai: Optional[time]
+    jam_pulang_mulai: time
+    jam_pulang_selesai: time
+
+
+class SnapshotPengaturan(NamedTuple):
+    """Seluruh pengaturan waktu dan hari libur pada satu versi cache."""
+    versi: int
+    setting_siswa: Optional[JendelaWaktu]
+    setting_guru_staf: Optional[JendelaWaktu]
+    settings_keamanan: dict      # nama_shift -> JendelaWaktu
+    hari_libur_rutin: frozenset  # nama hari (Bahasa Indonesia)
+    hari_libur: dict             # tanggal -> keterangan
+    resolver_siswa: Optional[ResolverJadwal]
+    resolver_guru_staf: Optional[ResolverJadwal]
+    resolver_keamanan: dict      # nama_shift -> ResolverJadwal
+    kalender: KalenderKerja      # bitmap hari kerja (libur rutin + libur khusus)
+
+
+def _jendela(setting):
+    """Ubah baris pengaturan waktu menjadi JendelaWaktu."""
+    if not setting:
+        return None
+    return JendelaWaktu(
+        setting.jam_masuk_mulai,
+        setting.jam_masuk_selesai,
+        setting.jam_terlambat_selesai,
+        setting.jam_pulang_mulai,
+        setting.jam_pulang_selesai,
+    )
+
+
+class PengaturanCache:
+    """
+    Cache berversi untuk pengaturan waktu dan hari libur.
+
+    Setiap route yang mengubah pengaturan memanggil invalidate(), yang menaikkan
+    nomor versi lokal dan versi bersama di database, sehingga get() berikutnya
+    di proses mana pun memuat ulang dari database. TTL tetap menjadi batas basi
+    jika versi bersama tidak dapat dibaca.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._versi = 0
+        self._snapshot = None
+        self._dimuat_pada = 0.0
+        self._bersama = VersiBersama("pengaturan")
+        self._versi_bersama_snapshot = None
+
+    @property
+    def ttl(self):
+        # Dibaca saat dipakai karena .env baru dimuat setelah modul ini diimpor
+        if self._ttl is None:
+            self._ttl = int(os.getenv("PENGATURAN_CACHE_TTL", "300"))
+        return self._ttl
+
+    def _basi(self):
+        snapshot = self._snapshot
+        return (
+            snapshot is None
+            or snapshot.versi != self._versi
+            or _time.monotonic() - self._dimuat_pada > self.ttl
+            or self._bersama.terkini() != self._versi_bersama_snapshot
+        )
+
+    def _muat(self):
+        setting_siswa = SettingWaktu.query.first()
+        libur_rutin = []
+        if setting_siswa and setting_siswa.hari_libur_rutin:
+            libur_rutin = [h.strip() for h in setting_siswa.hari_libur_rutin.split(',') if h.strip()]
+
+        jendela_siswa = _jendela(setting_siswa)
+        jendela_guru_staf = _jendela(SettingWaktuGuruStaf.query.first())
+        jendela_keamanan = {s.nama_shift: _jendela(s) for s in SettingWaktuKeamanan.query.all()}
+        hari_libur = {h.tanggal: h.keterangan for h in HariLibur.query.all()}
+
+        # Resolver interval dibangun sekali per versi cache, bukan per scan
+        return SnapshotPengaturan(
+            versi=self._versi,
+            setting_siswa=jendela_siswa,
+            setting_guru_staf=jendela_guru_staf,
+            settings_keamanan=jendela_keamanan,
+            hari_libur_rutin=frozenset(libur_rutin),
+            hari_libur=hari_libur,
+            resolver_siswa=ResolverJadwal(jendela_siswa) if jendela_siswa else None,
+            resolver_guru_staf=ResolverJadwal(jendela_guru_staf) if jendela_guru_staf else None,
+            resolver_keamanan={nama: ResolverJadwal(j) for nama, j in jendela_keamanan.items()},
+            kalender=KalenderKerja(libur_rutin, hari_libur),
+        )
+
+    def get(self):
+        """Ambil snapshot terbaru, muat ulang dari database bila versi berubah."""
+        if not self._basi():
+            return self._snapshot
+
+        with self._lock:
+            if self._basi():
+                # Versi bersama dibaca sebelum memuat: perubahan selama pemuatan memicu muat ulang
+                versi_bersama = self._bersama.terkini(paksa=True)
+                self._snapshot = self._muat()
+                self._versi_bersama_snapshot = versi_bersama
+                self._dimuat_pada = _time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        """Tandai cache usang di semua proses; dipanggil setelah pengaturan/hari libur diubah."""
+        with self._lock:
+            self._versi += 1
+        self._bersama.naikkan()
+
+    @property
+    def versi(self):
+        return self._versi
+
+
+# Instance global yang dipakai bersama oleh seluruh blueprint
+pengaturan_cache = PengaturanCache()
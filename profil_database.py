@@ -0,0 +1,119 @@
+# ======================== PROFIL ENGINE & POOL KONEKSI DATABASE ========================
+# Berkas ini menyusun URI database dan opsi engine SQLAlchemy dari .env, agar
+# ukuran pool, recycle, pre-ping dan timeout bisa disesuaikan dengan jumlah
+# worker tanpa mengubah kode.
+#
+# - pool_pre_ping + pool_recycle: koneksi yang diputus MySQL (wait_timeout)
+#   atau firewall setelah semalam idle diganti otomatis sebelum dipakai, jadi
+#   scan pertama di pagi hari tidak gagal.
+# - Waktu tunggu checkout koneksi dari pool dicatat di metrik
+#   absensi_db_tunggu_pool_detik (/metrics), dan ditulis ke log jika lebih lama
+#   dari DB_POOL_LOG_TUNGGU_MS.
+#
+# Panduan ukuran: pool_size kira-kira sama dengan jumlah thread per proses
+# worker. Total koneksi = jumlah proses x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# harus di bawah max_connections MySQL.
+#
+# Konfigurasi (.env):
+#   DATABASE_URL             URI lengkap; menggantikan DB_USER/DB_PASSWORD/DB_HOST/DB_NAME.
+#   DB_DRIVER                mysqlconnector (default), pymysql, atau mysqldb (mysqlclient, C).
+#   DB_POOL_SIZE             Koneksi tetap per proses (default 10).
+#   DB_MAX_OVERFLOW          Koneksi tambahan saat puncak (default 10).
+#   DB_POOL_TIMEOUT          Detik menunggu koneksi bebas sebelum error (default 10).
+#   DB_POOL_RECYCLE          Umur maksimal koneksi dalam detik (default 1800).
+#   DB_POOL_PRE_PING         1 = cek koneksi sebelum dipakai (default), 0 = mati.
+#   DB_CONNECT_TIMEOUT       Detik timeout membuka koneksi baru (default 5; mysqlconnector:
+#                            hanya jika diisi, karena ikut membatasi setiap baca socket).
+#   DB_STATEMENT_TIMEOUT_MS  Batas waktu query SELECT (max_execution_time), 0 = tanpa batas.
+#   DB_LOCK_WAIT_TIMEOUT     Detik menunggu row lock InnoDB (default bawaan server).
+#   DB_ISOLATION_LEVEL       Mis. READ COMMITTED (default bawaan server).
+#   DB_POOL_LOG_TUNGGU_MS    Batas waktu tunggu pool yang ditulis ke log (default 100).
+
+import logging
+import os
+import time as _time
+
+from sqlalchemy.pool import QueuePool
+
+from metrik import tunggu_pool_db
+
+logger = logging.getLogger(__name__)
+
+DRIVER_MYSQL = ("mysqlconnector", "pymysql", "mysqldb")
+
+
+class PoolTerukur(QueuePool):
+    """QueuePool yang mencatat lama checkout koneksi (termasuk membuka koneksi baru)."""
+
+    batas_log_detik = 0.1
+
+    def _do_get(self):
+        mulai = _time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            durasi = _time.perf_counter() - mulai
+            tunggu_pool_db.amati(durasi)
+            if durasi >= self.batas_log_detik:
+                logger.warning(f"Menunggu koneksi database {durasi * 1000:.0f} ms ({self.status()})")
+
+
+def uri_database():
+    """URI dari DATABASE_URL, atau MySQL dari DB_USER/DB_PASSWORD/DB_HOST/DB_NAME."""
+    uri = os.getenv("DATABASE_URL")
+    if uri:
+        return uri
+    driver = os.getenv("DB_DRIVER", "mysqlconnector")
+    if driver not in DRIVER_MYSQL:
+        raise ValueError(f"DB_DRIVER '{driver}' tidak dikenal. Pilihan: {', '.join(DRIVER_MYSQL)}.")
+    user, password = os.getenv("DB_USER"), os.getenv("DB_PASSWORD")
+    host, nama = os.getenv("DB_HOST"), os.getenv("DB_NAME")
+    return f"mysql+{driver}://{user}:{password}@{host}/{nama}"
+
+
+def _perintah_sesi():
+    """Perintah SET SESSION yang dijalankan setiap kali koneksi baru dibuka."""
+    perintah = []
+    timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+    if timeout_ms > 0:
+        perintah.append(f"max_execution_time = {timeout_ms}")
+    lock_wait = os.getenv("DB_LOCK_WAIT_TIMEOUT")
+    if lock_wait:
+        perintah.append(f"innodb_lock_wait_timeout = {int(lock_wait)}")
+    return "SET SESSION " + ", ".join(perintah) if perintah else None
+
+
+def opsi_engine(uri):
+    """
+    Nilai SQLALCHEMY_ENGINE_OPTIONS untuk URI. Profil pool hanya dipakai untuk
+    MySQL; database lain (mis. SQLite untuk benchmark) memakai bawaan SQLAlchemy.
+    """
+    if not uri.startswith("mysql"):
+        return {}
+
+    PoolTerukur.batas_log_detik = int(os.getenv("DB_POOL_LOG_TUNGGU_MS", "100")) / 1000
+    opsi = {
+        "poolclass": PoolTerukur,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+    if os.getenv("DB_ISOLATION_LEVEL"):
+        opsi["isolation_level"] = os.getenv("DB_ISOLATION_LEVEL").upper()
+
+    # Nama argumen timeout koneksi berbeda antar driver. Pada mysql-connector
+    # timeout ini juga berlaku untuk setiap baca socket (query panjang ikut
+    # terputus), jadi hanya dipasang jika DB_CONNECT_TIMEOUT diisi.
+    connect_args = {}
+    if uri.startswith("mysql+mysqlconnector"):
+        if os.getenv("DB_CONNECT_TIMEOUT"):
+            connect_args["connection_timeout"] = int(os.getenv("DB_CONNECT_TIMEOUT"))
+    else:
+        connect_args["connect_timeout"] = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+    init_command = _perintah_sesi()
+    if init_command:
+        connect_args["init_command"] = init_command
+    opsi["connect_args"] = connect_args
+    return opsi
\ No newline at end of file
@@ -0,0 +1,197 @@
+# ======================== CACHE GAMBAR QR ========================
+# Berkas ini menyimpan PNG QR code yang sudah jadi, dengan kunci berupa hash
+# dari isi QR + nama + role. Selama kuncinya sama, gambar tidak dibuat ulang:
+# bytes diambil dari LRU di memori atau dari file di folder cache.
+#
+# Setiap ganti nama atau impor ulang menghasilkan kunci baru, jadi folder cache
+# dipangkas secara LRU: mtime file diperbarui setiap kali dipakai, dan file yang
+# paling lama tidak dipakai dihapus jika jumlahnya melebihi batas.
+#
+# Konfigurasi (.env):
+#   QR_CACHE_MAKS_FILE   Batas jumlah PNG di folder cache (default 5000; sebaiknya
+#                        di atas jumlah siswa + pegawai).
+
+import hashlib
+import io
+import os
+import threading
+import time as _time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, request
+
+from utils import create_qr_siswa, create_qr_pegawai
+
+
+def kunci_qr(payload, nama, role):
+    """Kunci cache (sha256) dari data yang menentukan tampilan gambar QR."""
+    return hashlib.sha256(f"{payload}\x1f{nama}\x1f{role}".encode("utf-8")).hexdigest()
+
+
+def tandai_dipakai(path):
+    """Perbarui mtime file cache agar tidak ikut dipangkas (urutan LRU)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def pangkas_folder_cache(folder, maks_file=None):
+    """
+    Hapus PNG yang paling lama tidak dipakai (mtime tertua) sampai jumlahnya
+    tidak melebihi maks_file. Mengembalikan jumlah file yang dihapus.
+    """
+    if maks_file is None:
+        maks_file = int(os.getenv("QR_CACHE_MAKS_FILE", "5000"))
+    try:
+        entri = [e for e in os.scandir(folder) if e.name.endswith(".png")]
+    except FileNotFoundError:
+        return 0
+    lebih = len(entri) - maks_file
+    if lebih <= 0:
+        return 0
+
+    def mtime(e):
+        try:
+            return e.stat().st_mtime
+        except OSError:
+            return 0
+
+    dihapus = 0
+    for e in sorted(entri, key=mtime)[:lebih]:
+        try:
+            os.remove(e.path)
+            dihapus += 1
+        except OSError:
+            pass
+    return dihapus
+
+
+class CacheQR:
+    """Cache PNG QR dua tingkat: LRU di memori (terbatas) lalu file di disk."""
+
+    def __init__(self, maks_item=256, jeda_pangkas=60):
+        self.maks_item = maks_item
+        self.jeda_pangkas = jeda_pangkas
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._pangkas_terakhir = 0.0
+
+    def _folder(self):
+        folder = current_app.config['QR_FOLDER_CACHE']
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def _simpan_lru(self, kunci, item):
+        with self._lock:
+            self._lru[kunci] = item
+            self._lru.move_to_end(kunci)
+            while len(self._lru) > self.maks_item:
+                self._lru.popitem(last=False)
+
+    def ambil(self, kunci, buat_gambar):
+        """
+        Ambil (bytes PNG, waktu dibuat) untuk kunci. buat_gambar() hanya
+        dipanggil jika kunci belum ada di memori maupun di disk.
+        """
+        with self._lock:
+            item = self._lru.get(kunci)
+            if item:
+                self._lru.move_to_end(kunci)
+                return item
+
+        path = os.path.join(self._folder(), f"{kunci}.png")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            tandai_dipakai(path)
+            item = (data, datetime.fromtimestamp(os.path.getmtime(path)))
+        else:
+            img_io = io.BytesIO()
+            buat_gambar().save(img_io, 'PNG')
+            data = img_io.getvalue()
+            # Tulis ke file sementara lalu rename agar request paralel tidak membaca file setengah jadi
+            path_tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(path_tmp, "wb") as f:
+                f.write(data)
+            os.replace(path_tmp, path)
+            item = (data, datetime.fromtimestamp(os.path.getmtime(path)))
+            self._pangkas()
+
+        self._simpan_lru(kunci, item)
+        return item
+
+    def _pangkas(self):
+        """Pangkas folder cache setelah file baru ditulis, paling sering sekali per jeda_pangkas detik."""
+        sekarang = _time.monotonic()
+        with self._lock:
+            if sekarang - self._pangkas_terakhir < self.jeda_pangkas:
+                return
+            self._pangkas_terakhir = sekarang
+        pangkas_folder_cache(self._folder())
+
+    def simpan_ke(self, kunci, buat_gambar, path_tujuan):
+        """Tulis PNG dari cache ke path tujuan (mis. qr_path siswa/pegawai)."""
+        data, _ = self.ambil(kunci, buat_gambar)
+        with open(path_tujuan, "wb") as f:
+            f.write(data)
+
+    def response(self, kunci, buat_gambar, download_name=None):
+        """
+        Response PNG dengan ETag (= kunci) dan Last-Modified. Jika browser
+        mengirim If-None-Match yang cocok, langsung jawab 304 tanpa membaca
+        gambar sama sekali.
+        """
+        response = current_app.response_class(mimetype="image/png")
+        response.set_etag(kunci)
+        # Isi gambar bisa berubah untuk URL yang sama (mis. nama diganti), jadi selalu revalidasi
+        response.cache_control.no_cache = True
+
+        if request.if_none_match.contains(kunci):
+            response.status_code = 304
+            return response
+
+        data, dibuat = self.ambil(kunci, buat_gambar)
+        response.set_data(data)
+        response.last_modified = dibuat
+        if download_name:
+            response.headers.set("Content-Disposition", "attachment", filename=download_name)
+        return response.make_conditional(request)
+
+
+# Instance global yang dipakai route siswa & pegawai
+qr_cache = CacheQR()
+
+
+# ==============================================================================
+#  HELPER PER JENIS QR
+# ==============================================================================
+def kunci_qr_siswa(nis, nama):
+    return kunci_qr(f"S{nis}", nama, "siswa")
+
+
+def kunci_qr_pegawai(no_id, nama, role):
+    return kunci_qr(f"P{no_id}", nama, role)
+
+
+def response_qr_siswa(nis, nama, download_name=None):
+    return qr_cache.response(kunci_qr_siswa(nis, nama), lambda: create_qr_siswa(nis, nama), download_name)
+
+
+def response_qr_pegawai(no_id, nama, role, download_name=None):
+    return qr_cache.response(
+        kunci_qr_pegawai(no_id, nama, role), lambda: create_qr_pegawai(no_id, nama, role), download_name
+    )
+
+
+def simpan_qr_siswa(nis, nama, path_tujuan):
+    """Simpan QR siswa ke path tujuan; gambar hanya dibuat ulang jika kuncinya berubah."""
+    qr_cache.simpan_ke(kunci_qr_siswa(nis, nama), lambda: create_qr_siswa(nis, nama), path_tujuan)
+
+
+def simpan_qr_pegawai(no_id, nama, role, path_tujuan):
+    """Simpan QR pegawai ke path tujuan; gambar hanya dibuat ulang jika kuncinya berubah."""
+    qr_cache.simpan_ke(
+        kunci_qr_pegawai(no_id, nama, role), lambda: create_qr_pegawai(no_id, nama, role), path_tujuan
+    )
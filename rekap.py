@@ -0,0 +1,320 @@
+# ======================== REKAP HARIAN (TABEL RINGKASAN) ========================
+# Berkas ini memelihara tabel 'rekap_harian' secara inkremental. Route yang
+# menambah/menghapus catatan absensi memanggil catat_absensi() atau
+# kurangi_rekap_absensi(); perubahan dikumpulkan di sesi lalu ditulis tepat
+# sebelum commit, sehingga berada di transaksi yang sama dengan perubahan
+# absensi. Jika transaksi gagal, rekap ikut batal. Setelah commit berhasil,
+# perubahan yang sama disiarkan ke dashboard live.
+#
+# Perubahan ditulis sebagai baris baru di 'rekap_delta' (INSERT saja), bukan
+# upsert ke 'rekap_harian': saat puncak scan pagi semua siswa satu kelas akan
+# mengantre pada row lock baris (tanggal, kelas, masuk, Hadir) yang sama.
+# Penjadwal berkala di worker job melipat delta ke 'rekap_harian' dalam satu
+# transaksi pendek; pembacaan (ambil_tren) menjumlahkan keduanya sehingga
+# hasilnya selalu terkini.
+#
+# Pemakaian CLI:
+#   flask --app app rekap-rebuild [--dari YYYY-MM-DD] [--sampai YYYY-MM-DD]
+#   flask --app app rekap-lipat
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, NamedTuple
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, select, insert, delete, func, cast, literal, union_all, String
+from sqlalchemy.orm import Session
+
+from db_utils import upsert
+from job_latar import pelaksana_job
+from models import db, Absensi, AbsensiPegawai, Siswa, Pegawai, RekapHarian, RekapDelta
+from siaran_dashboard import siaran_dashboard
+
+KUNCI_SESI = "rekap_tertunda"
+KUNCI_SIARAN = "rekap_disiarkan"
+KUNCI_SAVEPOINT = "rekap_savepoint"
+
+
+class SumberAbsensi(NamedTuple):
+    """Tabel absensi dan tabel orang untuk satu tipe data ('siswa' / 'pegawai')."""
+    model: Any        # model absensi (Absensi / AbsensiPegawai)
+    kolom_id: Any     # kolom identitas di tabel absensi (nis / no_id)
+    orang: Any        # model orang (Siswa / Pegawai)
+    kolom_orang: Any  # kolom identitas di tabel orang
+    grup: Any         # ekspresi grup rekap (kelas_id sebagai teks / role)
+
+
+def sumber_absensi(tipe):
+    """Model absensi, kolom identitas dan ekspresi grup untuk tipe data."""
+    if tipe == "siswa":
+        return SumberAbsensi(Absensi, Absensi.nis, Siswa, Siswa.nis, cast(Siswa.kelas_id, String))
+    return SumberAbsensi(AbsensiPegawai, AbsensiPegawai.no_id, Pegawai, Pegawai.no_id, Pegawai.role)
+
+
+# ==============================================================================
+#  PENCATATAN PERUBAHAN (INKREMENTAL)
+# ==============================================================================
+def catat_rekap(tanggal, tipe, grup, jenis_absen, status, delta=1):
+    """Tambahkan perubahan jumlah rekap ke antrian sesi (ditulis saat commit)."""
+    tertunda = db.session.info.setdefault(KUNCI_SESI, Counter())
+    kunci = (tanggal, tipe, "" if grup is None else str(grup), jenis_absen or "", status or "")
+    tertunda[kunci] += delta
+
+
+def catat_absensi(tipe, grup, *daftar_absensi):
+    """Catat penambahan rekap untuk objek Absensi/AbsensiPegawai yang baru dibuat."""
+    for absen in daftar_absensi:
+        catat_rekap(absen.tanggal, tipe, grup, absen.jenis_absen, absen.status)
+
+
+def grup_per_id(tipe, ids):
+    """
+    Peta nis/no_id -> grup rekap (kelas_id untuk siswa, role untuk pegawai).
+    Kunci dalam huruf kecil, karena ID dari scan disimpan huruf kecil sedangkan
+    kolom ID MySQL (collation *_ci) cocok tanpa membedakan huruf; cari dengan id.lower().
+    """
+    return {kunci: g for kunci, (_, g) in orang_per_id(tipe, ids).items()}
+
+
+def orang_per_id(tipe, ids):
+    """Seperti grup_per_id, tetapi nilainya (ID seperti tersimpan di tabel orang, grup)."""
+    sumber = sumber_absensi(tipe)
+    baris = db.session.execute(select(sumber.kolom_orang, sumber.grup).where(sumber.kolom_orang.in_(ids))).all()
+    return {id_.lower(): (id_, g) for id_, g in baris}
+
+
+def kurangi_rekap_absensi(tipe, ids, tanggal):
+    """Catat pengurangan rekap untuk semua absensi milik ids pada tanggal (panggil sebelum delete)."""
+    model, kolom_id, orang, kolom_orang, grup = sumber_absensi(tipe)
+    baris = db.session.execute(
+        select(func.coalesce(grup, ""), model.jenis_absen, model.status, func.count())
+        .select_from(model)
+        .outerjoin(orang, kolom_orang == kolom_id)
+        .where(kolom_id.in_(ids), model.tanggal == tanggal)
+        .group_by(func.coalesce(grup, ""), model.jenis_absen, model.status)
+    ).all()
+    for g, jenis_absen, status, jumlah in baris:
+        catat_rekap(tanggal, tipe, g, jenis_absen, status, -jumlah)
+
+
+@event.listens_for(Session, "before_commit")
+def _tulis_rekap_tertunda(session):
+    # Commit savepoint (begin_nested) juga memicu event ini; rekap ditulis saat commit terluar
+    if session.in_nested_transaction():
+        return
+    tertunda = session.info.pop(KUNCI_SESI, None)
+    if not tertunda:
+        return
+    rows = [
+        {"tanggal": k[0], "tipe": k[1], "grup": k[2], "jenis_absen": k[3], "status": k[4], "jumlah": delta}
+        for k, delta in tertunda.items() if delta
+    ]
+    if rows:
+        # Baris terakhir disisipkan tersendiri agar id-nya (tertinggi di commit ini)
+        # diketahui; dashboard proses ini tidak perlu sinkron ulang karena commit sendiri
+        *awal, akhir = rows
+        if awal:
+            session.execute(insert(RekapDelta), awal)
+        id_akhir = session.execute(insert(RekapDelta).values(**akhir)).inserted_primary_key[0]
+        siaran_dashboard.catat_delta_sendiri(id_akhir)
+    # Disimpan untuk disiarkan ke dashboard setelah commit benar-benar berhasil
+    session.info[KUNCI_SIARAN] = tertunda
+
+
+@event.listens_for(Session, "after_commit")
+def _siarkan_rekap(session):
+    perubahan = session.info.pop(KUNCI_SIARAN, None)
+    if perubahan:
+        siaran_dashboard.terbitkan_rekap(perubahan)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _simpan_rekap_savepoint(session, transaction):
+    # Salinan rekap tertunda saat savepoint (begin_nested) dibuka, untuk dikembalikan jika savepoint batal
+    if transaction.nested:
+        session.info.setdefault(KUNCI_SAVEPOINT, {})[transaction] = Counter(session.info.get(KUNCI_SESI, ()))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _lepas_rekap_savepoint(session, transaction):
+    # Event ini berjalan sebelum after_soft_rollback savepoint, jadi salinan dilepas saat transaksi terluar selesai
+    if transaction.parent is None:
+        session.info.pop(KUNCI_SAVEPOINT, None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _buang_rekap_tertunda(session, previous_transaction):
+    # Rollback transaksi terluar membuang semua rekap tertunda; rollback savepoint
+    # hanya membuang rekap yang dicatat setelah savepoint dibuka. Flush yang gagal
+    # melaporkan transaksi internal flush, batas rollback-nya induk terdekat.
+    batas = previous_transaction
+    while batas.parent is not None and not batas.nested:
+        batas = batas.parent
+    if batas.parent is None:
+        session.info.pop(KUNCI_SESI, None)
+        session.info.pop(KUNCI_SIARAN, None)
+    else:
+        salinan = session.info.get(KUNCI_SAVEPOINT, {}).pop(batas, None)
+        if salinan is not None:
+            session.info[KUNCI_SESI] = Counter(salinan)
+
+
+# ==============================================================================
+#  PELIPATAN DELTA KE REKAP_HARIAN
+# ==============================================================================
+def lipat_rekap_delta(batas=5000):
+    """
+    Jumlahkan maksimal 'batas' baris rekap_delta tertua ke rekap_harian lalu
+    hapus, dalam satu transaksi. Baris delta dihapus per primary key (tanpa
+    range lock), sehingga INSERT delta dari route scan tidak ikut menunggu.
+    Mengembalikan jumlah baris delta yang dilipat.
+    """
+    baris = db.session.execute(
+        select(RekapDelta.id, RekapDelta.tanggal, RekapDelta.tipe, RekapDelta.grup,
+               RekapDelta.jenis_absen, RekapDelta.status, RekapDelta.jumlah)
+        .order_by(RekapDelta.id.asc())
+        .limit(batas)
+    ).all()
+    if not baris:
+        db.session.rollback()
+        return 0
+
+    ids = [b.id for b in baris]
+    terhapus = sum(
+        db.session.execute(delete(RekapDelta).where(RekapDelta.id.in_(ids[awal:awal + 500]))).rowcount
+        for awal in range(0, len(ids), 500)
+    )
+    # Proses lain sudah melipat sebagian baris yang sama: batalkan agar tidak terhitung dua kali
+    if terhapus != len(ids):
+        db.session.rollback()
+        return 0
+
+    total = Counter()
+    for b in baris:
+        total[(b.tanggal, b.tipe, b.grup, b.jenis_absen, b.status)] += b.jumlah
+    upsert(
+        RekapHarian,
+        [
+            {"tanggal": k[0], "tipe": k[1], "grup": k[2], "jenis_absen": k[3], "status": k[4], "jumlah": jumlah}
+            for k, jumlah in total.items() if jumlah
+        ],
+        kolom_kunci=("tanggal", "tipe", "grup", "jenis_absen", "status"),
+        kolom_tambah=("jumlah",),
+    )
+    db.session.commit()
+    return len(ids)
+
+
+@pelaksana_job.berkala
+def lipat_rekap_berkala(pelaksana):
+    """Lipat delta rekap yang terkumpul sejak putaran sebelumnya."""
+    while lipat_rekap_delta() >= 5000:
+        pass
+
+
+# ==============================================================================
+#  REBUILD DARI DATA HISTORIS
+# ==============================================================================
+def rebuild_rekap(dari=None, sampai=None):
+    """Hitung ulang rekap_harian dari tabel absensi (seluruhnya atau rentang tanggal)."""
+    def dalam_rentang(kolom):
+        kondisi = []
+        if dari:
+            kondisi.append(kolom >= dari)
+        if sampai:
+            kondisi.append(kolom <= sampai)
+        return kondisi
+
+    db.session.execute(delete(RekapHarian).where(*dalam_rentang(RekapHarian.tanggal)))
+    db.session.execute(delete(RekapDelta).where(*dalam_rentang(RekapDelta.tanggal)))
+
+    hasil = {}
+    for tipe in ("siswa", "pegawai"):
+        model, kolom_id, orang, kolom_orang, grup = sumber_absensi(tipe)
+        grup = func.coalesce(grup, "")
+        jenis_absen = func.coalesce(model.jenis_absen, "")
+        status = func.coalesce(model.status, "")
+        sumber = (
+            select(model.tanggal, literal(tipe), grup, jenis_absen, status, func.count())
+            .select_from(model)
+            .outerjoin(orang, kolom_orang == kolom_id)
+            .where(*dalam_rentang(model.tanggal))
+            .group_by(model.tanggal, grup, jenis_absen, status)
+        )
+        hasil[tipe] = db.session.execute(
+            insert(RekapHarian).from_select(
+                ["tanggal", "tipe", "grup", "jenis_absen", "status", "jumlah"], sumber
+            )
+        ).rowcount
+
+    db.session.commit()
+    return hasil
+
+
+@click.command("rekap-rebuild")
+@click.option("--dari", help="Tanggal awal (YYYY-MM-DD).")
+@click.option("--sampai", help="Tanggal akhir (YYYY-MM-DD).")
+@with_appcontext
+def rekap_rebuild_command(dari, sampai):
+    """Bangun ulang tabel rekap_harian dari data absensi historis."""
+    dari = datetime.strptime(dari, "%Y-%m-%d").date() if dari else None
+    sampai = datetime.strptime(sampai, "%Y-%m-%d").date() if sampai else None
+    hasil = rebuild_rekap(dari, sampai)
+    click.echo(f"Rekap dibangun ulang: {hasil['siswa']} baris siswa, {hasil['pegawai']} baris pegawai.")
+
+
+@click.command("rekap-lipat")
+@with_appcontext
+def rekap_lipat_command():
+    """Lipat seluruh delta rekap ke tabel rekap_harian sekarang."""
+    total = 0
+    while True:
+        jumlah = lipat_rekap_delta()
+        total += jumlah
+        if not jumlah:
+            break
+    click.echo(f"{total} baris delta rekap dilipat.")
+
+
+def init_app(app):
+    """Daftarkan perintah rekap ke Flask CLI."""
+    app.cli.add_command(rekap_rebuild_command)
+    app.cli.add_command(rekap_lipat_command)
+
+
+# ==============================================================================
+#  PEMBACAAN REKAP
+# ==============================================================================
+def _rekap_terkini(tipe, dari, sampai, grup=None):
+    """Subquery baris rekap_harian ditambah delta yang belum dilipat."""
+    bagian = []
+    for model in (RekapHarian, RekapDelta):
+        query = select(model.tanggal, model.status, model.jumlah).where(
+            model.tipe == tipe,
+            model.tanggal.between(dari, sampai),
+            model.jenis_absen.in_(["masuk", "lainnya"]),
+        )
+        if grup is not None:
+            query = query.where(model.grup == str(grup))
+        bagian.append(query)
+    return union_all(*bagian).subquery()
+
+
+def ambil_tren(tipe, dari, sampai, grup=None):
+    """
+    Jumlah orang per status per tanggal dari rekap_harian (plus delta terbaru).
+    Hanya catatan 'masuk' dan 'lainnya' yang dihitung agar satu orang tidak
+    terhitung dua kali (masuk + pulang).
+    """
+    rekap = _rekap_terkini(tipe, dari, sampai, grup)
+    query = (
+        select(rekap.c.tanggal, rekap.c.status, func.sum(rekap.c.jumlah))
+        .group_by(rekap.c.tanggal, rekap.c.status)
+        .order_by(rekap.c.tanggal.asc())
+    )
+
+    tren = {}
+    for tanggal, status, jumlah in db.session.execute(query).all():
+        tren.setdefault(tanggal.strftime("%Y-%m-%d"), {})[status] = int(jumlah or 0)
+    return tren
@@ -0,0 +1,84 @@
+# ======================== RESOLVER JENDELA WAKTU ABSENSI ========================
+# Berkas ini mengubah satu pengaturan waktu (masuk / terlambat / pulang) menjadi
+# tabel interval terurut yang dicari dengan bisect. Resolver dibangun sekali
+# saat snapshot pengaturan dimuat, sehingga klasifikasi scan cukup satu lookup.
+#
+# Semua batas dinormalisasi relatif terhadap jam_masuk_mulai: batas yang lebih
+# awal dari jam masuk dianggap milik hari berikutnya. Dengan begitu shift yang
+# melewati tengah malam (mis. masuk 19:00, pulang 07:00) dapat diekspresikan.
+
+from bisect import bisect_right
+from typing import NamedTuple, Optional
+
+# Resolusi mikrodetik agar perbandingan sama persis dengan perbandingan objek time
+SATU_HARI = 24 * 60 * 60 * 1_000_000
+
+
+class HasilJendela(NamedTuple):
+    """Hasil klasifikasi scan. geser_hari = -1 berarti absensi milik shift kemarin."""
+    jenis_absen: str
+    status: str
+    geser_hari: int = 0
+
+
+def _mikrodetik(waktu):
+    return ((waktu.hour * 60 + waktu.minute) * 60 + waktu.second) * 1_000_000 + waktu.microsecond
+
+
+class ResolverJadwal:
+    """Tabel interval (awal, hasil) terurut untuk satu jendela waktu absensi."""
+
+    def __init__(self, jendela):
+        awal_hari = _mikrodetik(jendela.jam_masuk_mulai)
+
+        def titik(waktu):
+            nilai = _mikrodetik(waktu)
+            return nilai + SATU_HARI if nilai < awal_hari else nilai
+
+        masuk_mulai, masuk_selesai = titik(jendela.jam_masuk_mulai), titik(jendela.jam_masuk_selesai)
+        # Interval setengah terbuka [awal, akhir); +1 karena batas akhir pengaturan inklusif.
+        # Urutan daftar = prioritas bila interval bertumpuk (sama seperti urutan if lama).
+        interval = [(masuk_mulai, masuk_selesai + 1, HasilJendela("masuk", "Hadir"))]
+        if jendela.jam_terlambat_selesai:
+            interval.append((masuk_selesai + 1, titik(jendela.jam_terlambat_selesai) + 1,
+                             HasilJendela("masuk", "Terlambat")))
+        interval.append((titik(jendela.jam_pulang_mulai), titik(jendela.jam_pulang_selesai) + 1,
+                         HasilJendela("pulang", "Hadir")))
+
+        # Pecah menjadi segmen elementer tanpa tumpang tindih; tiap segmen diisi
+        # interval pertama (prioritas tertinggi) yang menutupinya
+        batas = sorted({b for a, z, _ in interval if a < z for b in (a, z)})
+        self._awal, self._hasil = [], []
+        for a, z in zip(batas, batas[1:]):
+            hasil = next((h for ia, iz, h in interval if ia <= a and z <= iz), None)
+            if self._hasil and self._hasil[-1] == hasil:
+                continue
+            self._awal.append(a)
+            self._hasil.append(hasil)
+        if batas:
+            self._awal.append(batas[-1])
+            self._hasil.append(None)
+
+        # Shift melewati tengah malam jika ada segmen berisi setelah pukul 24:00
+        self.lintas_hari = any(z > SATU_HARI for a, z, _ in interval if a < z)
+
+    def _cari_titik(self, nilai):
+        i = bisect_right(self._awal, nilai) - 1
+        return self._hasil[i] if i >= 0 else None
+
+    def cari(self, waktu, geser_hari=None) -> Optional[HasilJendela]:
+        """
+        Klasifikasikan jam scan menjadi HasilJendela, atau None jika di luar jendela.
+        geser_hari=0 hanya mencari di shift yang dimulai hari ini, geser_hari=-1
+        hanya di bagian shift kemarin yang lewat tengah malam, None keduanya.
+        """
+        nilai = _mikrodetik(waktu)
+        if geser_hari in (None, 0):
+            hasil = self._cari_titik(nilai)
+            if hasil:
+                return hasil
+        if geser_hari in (None, -1) and self.lintas_hari:
+            hasil = self._cari_titik(nilai + SATU_HARI)
+            if hasil:
+                return hasil._replace(geser_hari=-1)
+        return None
@@ -0,0 +1,102 @@
+# ======================== INDEKS ROSTER KEAMANAN ========================
+# Berkas ini menyimpan jadwal shift keamanan per tanggal di memori proses
+# (no_id -> nama shift), sehingga scan pegawai keamanan tidak perlu query ke
+# tabel jadwal_keamanan. Satu tanggal dimuat sekali; route jadwal memanggil
+# invalidate() setelah menyimpan atau menyalin jadwal, yang juga menaikkan versi
+# bersama di database agar roster di proses lain ikut dimuat ulang (versi_cache.py).
+
+import os
+import threading
+import time as _time
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from models import db, JadwalKeamanan, Pegawai
+from versi_cache import VersiBersama
+
+# Jumlah tanggal yang disimpan (hari ini, kemarin, dan scan offline yang tertunda)
+MAKS_TANGGAL = 8
+
+
+class RosterKeamanan:
+    """Cache berversi jadwal keamanan per tanggal: {tanggal: {no_id: shift}}."""
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._versi = 0
+        self._bersama = VersiBersama("roster_keamanan")
+        self._per_tanggal = {}  # tanggal -> (versi, versi bersama, dimuat_pada, {no_id: shift})
+
+    @property
+    def ttl(self):
+        # Dibaca saat dipakai karena .env baru dimuat setelah modul ini diimpor
+        if self._ttl is None:
+            self._ttl = int(os.getenv("ROSTER_CACHE_TTL", "300"))
+        return self._ttl
+
+    def _muat(self, daftar_tanggal):
+        """Muat jadwal beberapa tanggal sekaligus dalam satu query."""
+        hasil = {tanggal: {} for tanggal in daftar_tanggal}
+        baris = db.session.execute(
+            select(JadwalKeamanan.tanggal, Pegawai.no_id, JadwalKeamanan.shift)
+            .join(Pegawai, JadwalKeamanan.pegawai_id == Pegawai.id)
+            .where(JadwalKeamanan.tanggal.in_(daftar_tanggal))
+        ).all()
+        for tanggal, no_id, shift in baris:
+            # Data QR di-lowercase saat scan, jadi kunci juga di-lowercase
+            hasil[tanggal][no_id.lower()] = shift
+        return hasil
+
+    def _segar(self, entri, versi_bersama):
+        return (
+            entri and entri[0] == self._versi and entri[1] == versi_bersama
+            and _time.monotonic() - entri[2] <= self.ttl
+        )
+
+    def _ambil(self, daftar_tanggal):
+        hasil = {}
+        versi_bersama = self._bersama.terkini()
+        for tanggal in daftar_tanggal:
+            entri = self._per_tanggal.get(tanggal)
+            if self._segar(entri, versi_bersama):
+                hasil[tanggal] = entri[3]
+
+        kurang = [t for t in daftar_tanggal if t not in hasil]
+        if kurang:
+            with self._lock:
+                versi, sekarang = self._versi, _time.monotonic()
+                versi_bersama = self._bersama.terkini(paksa=True)
+                for tanggal, peta in self._muat(kurang).items():
+                    self._per_tanggal[tanggal] = (versi, versi_bersama, sekarang, peta)
+                    hasil[tanggal] = peta
+                if len(self._per_tanggal) > MAKS_TANGGAL:
+                    for tanggal in sorted(self._per_tanggal)[:-MAKS_TANGGAL]:
+                        del self._per_tanggal[tanggal]
+        return hasil
+
+    def kandidat(self, no_id, hari_ini, pengaturan):
+        """
+        Daftar (resolver, geser_hari) untuk scan keamanan pada hari_ini: shift
+        hari ini, lalu shift kemarin yang mungkin berakhir setelah tengah malam.
+        Resolver None berarti shift terjadwal tetapi pengaturan waktunya belum ada.
+        """
+        kemarin = hari_ini - timedelta(days=1)
+        roster = self._ambil([hari_ini, kemarin])
+        kandidat = []
+        for tanggal, geser_hari in ((hari_ini, 0), (kemarin, -1)):
+            shift = roster[tanggal].get(no_id.lower())
+            if shift not in (None, 'Off', ''):
+                kandidat.append((pengaturan.resolver_keamanan.get(shift), geser_hari))
+        return kandidat
+
+    def invalidate(self):
+        """Tandai seluruh roster usang di semua proses; dipanggil setelah jadwal keamanan diubah."""
+        with self._lock:
+            self._versi += 1
+        self._bersama.naikkan()
+
+
+# Instance global yang dipakai route scan dan route jadwal keamanan
+roster_keamanan = RosterKeamanan()
@@ -1,16 +1,35 @@
-import calendar
-from datetime import datetime
-from flask import render_template, jsonify, Blueprint, request
-from models import (
-    Siswa, SettingWaktu, Absensi, Pegawai,
-    AbsensiPegawai, SettingWaktuGuruStaf,
-    SettingWaktuKeamanan, db, JadwalKeamanan, HariLibur
-)
+import hashlib
+import hmac
+import os
+from datetime import datetime, timedelta
+import click
+from flask import render_template, jsonify, Blueprint, request, current_app
+from sqlalchemy import exc
+from models import Absensi, AbsensiPegawai, db
+from pengaturan_cache import pengaturan_cache
+from roster_keamanan import roster_keamanan
+from indeks_identitas import indeks_identitas
+from notifikasi_wa import pengirim_wa, buat_notifikasi_absensi
+from rekap import catat_absensi
+from alfa_otomatis import hapus_alfa_otomatis_orang, alfa_jatuh_tempo, kelompok_dari
+from metrik import tahap, hasil_scan
 from utils import format_nomor_hp
-import requests
 
 scan_bp = Blueprint("scan_bp", __name__, url_prefix="/scan")
 
+# Batas untuk endpoint batch (scanner offline)
+MAKS_SCAN_PER_BATCH = 200
+TOLERANSI_WAKTU_DEPAN = timedelta(minutes=2)  # toleransi selisih jam kiosk vs server
+
+# Token kiosk scanner (endpoint batch). Konfigurasi (.env):
+#   SCAN_KIOSK_KUNCI       Kunci rahasia HMAC; token kiosk = HMAC-SHA256(kunci, id kiosk).
+#                          Tanpa kunci ini endpoint batch menolak semua permintaan; scan
+#                          online tetap lewat /scan/submit_scan, hanya antrian offline
+#                          yang membutuhkan kiosk terdaftar.
+#   SCAN_KIOSK_DAFTAR      Daftar id kiosk yang diizinkan, dipisah koma (kosong = semua id).
+#   SCAN_MAKS_UMUR_MENIT   Umur maksimal scan antrian offline dalam menit (default 10).
+# Token dibuat dengan: flask --app app kiosk-token <id_kiosk>
+
 # =======================================================================
 #  ROUTE: HALAMAN SCAN QR (Tidak Berubah)
 # =======================================================================
@@ -21,159 +40,349 @@ def scan():
 
 
 # =======================================================================
-#  ROUTE: PROSES SUBMIT QR (DENGAN INTEGRASI HARI LIBUR)
+#  LOGIKA INTI SCAN (DIPAKAI SUBMIT TUNGGAL & BATCH)
 # =======================================================================
-@scan_bp.route("/submit_scan", methods=["POST"])
-def submit_scan():
-    """Proses hasil scan QR untuk mencatat absensi."""
-    qr_data = request.form.get("qr_data") or request.form.get("identifier")
+class ScanDitolak(Exception):
+    """
+    Scan tidak dicatat; status ('warning'/'danger') dan pesan dikirim ke scanner.
+    'hasil' adalah label metrik absensi_scan_total ('ditolak' atau 'sudah_absen').
+    """
 
-    if not qr_data:
-        return jsonify({'status': 'danger', 'message': 'Data QR tidak ditemukan.'})
-    
-    now = datetime.now()
-    hari_ini = now.date()
-    nama_hari_ini = calendar.day_name[hari_ini.weekday()]
+    def __init__(self, status, message, hasil="ditolak"):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.hasil = hasil
 
-    # ==============================================================================
-    #  INTEGRASI: Lakukan Pengecekan Hari Libur Berlapis
-    # ==============================================================================
-    
-    # 1. Cek Libur Rutin (Mingguan)
-    setting_waktu = SettingWaktu.query.first()
-    if setting_waktu and setting_waktu.hari_libur_rutin:
-        libur_rutin = setting_waktu.hari_libur_rutin.split(',')
-        if nama_hari_ini in libur_rutin:
-            return jsonify({
-                'status': 'warning',
-                'message': f"Hari {nama_hari_ini} adalah hari libur rutin. Absensi tidak dicatat."
-            })
 
-    # 2. Cek Libur Spesial (Tanggal Merah)
-    libur_spesial = HariLibur.query.filter_by(tanggal=hari_ini).first()
-    if libur_spesial:
-        return jsonify({
-            'status': 'warning',
-            'message': f"Hari ini libur: {libur_spesial.keterangan}. Absensi tidak dicatat."
-        })
-    # ==============================================================================
+def siapkan_absensi(qr_data, now):
+    """
+    Validasi satu scan terhadap hari libur, data orang dan jendela waktu pada
+    waktu scan 'now'. Mengembalikan dict rencana penyimpanan, atau melempar
+    ScanDitolak jika scan tidak boleh dicatat.
+    """
+    hari_ini = now.date()
+
+    # Pengaturan waktu & kalender hari kerja diambil dari cache (tanpa query ke database)
+    pengaturan = pengaturan_cache.get()
 
     qr_data = qr_data.strip().lower()
     if len(qr_data) < 2:
-        return jsonify({'status': 'danger', 'message': 'Format QR tidak valid. Data terlalu pendek.'})
+        raise ScanDitolak('danger', 'Format QR tidak valid. Data terlalu pendek.')
 
     prefix = qr_data[0]
     identifier = qr_data[1:]
     waktu_skrg = now.time()
 
-    entity = None
-    model = None
-    setting = None
-    field = None
     send_wa = False
-    role = None
-    shift = None
-    
+
     # ====================== SISWA ======================
     if prefix == 's':
-        entity = Siswa.query.filter_by(nis=identifier).first()
+        # Data orang dari indeks identitas di memori (tanpa query ke database)
+        entity = indeks_identitas.cari(qr_data)
         if not entity:
-            return jsonify({'status': 'danger', 'message': f'Siswa dengan NIS {identifier} tidak ditemukan.'})
+            raise ScanDitolak('danger', f'Siswa dengan NIS {identifier} tidak ditemukan.')
 
         model = Absensi
         field = "nis"
-        setting = SettingWaktu.query.first()
+        tipe, grup = "siswa", entity.kelas_id
+        kandidat = [(pengaturan.resolver_siswa, None)]
         send_wa = True
 
     # ====================== PEGAWAI ======================
     elif prefix == 'p':
-        entity = Pegawai.query.filter_by(no_id=identifier).first()
+        entity = indeks_identitas.cari(qr_data)
         if not entity:
-            return jsonify({'status': 'danger', 'message': f'Pegawai dengan ID {identifier} tidak ditemukan.'})
+            raise ScanDitolak('danger', f'Pegawai dengan ID {identifier} tidak ditemukan.')
 
         model = AbsensiPegawai
         field = "no_id"
         role = entity.role
+        tipe, grup = "pegawai", role
 
         if role in ('guru', 'staf'):
-            setting = SettingWaktuGuruStaf.query.first()
+            kandidat = [(pengaturan.resolver_guru_staf, None)]
         elif role == 'keamanan':
-            # AMBIL SHIFT DARI JADWAL KEAMANAN BERDASARKAN HARI INI
-            jadwal_hari_ini = JadwalKeamanan.query.filter_by(pegawai_id=entity.id, tanggal=hari_ini).first()
-            if jadwal_hari_ini and jadwal_hari_ini.shift not in ['Off', '']:
-                shift = jadwal_hari_ini.shift
-                setting = SettingWaktuKeamanan.query.filter_by(nama_shift=shift).first()
-            else:
-                return jsonify({'status': 'danger', 'message': 'Jadwal keamanan untuk hari ini tidak ditemukan atau sedang libur.'})
+            # AMBIL SHIFT DARI INDEKS ROSTER (HARI INI DAN KEMARIN, TANPA QUERY)
+            # (shift malam kemarin bisa berakhir pagi ini)
+            kandidat = roster_keamanan.kandidat(identifier, hari_ini, pengaturan)
+            if not kandidat:
+                raise ScanDitolak('danger', 'Jadwal keamanan untuk hari ini tidak ditemukan atau sedang libur.')
         else:
-            return jsonify({'status': 'danger', 'message': f'Role {role} tidak dikenali.'})
+            raise ScanDitolak('danger', f'Role {role} tidak dikenali.')
 
     else:
-        return jsonify({'status': 'danger', 'message': 'Format QR tidak valid. Gunakan format S<ID> atau P<ID>.'})
+        raise ScanDitolak('danger', 'Format QR tidak valid. Gunakan format S<ID> atau P<ID>.')
 
-    if not setting:
-        return jsonify({'status': 'danger', 'message': 'Pengaturan waktu absensi belum diatur oleh admin.'})
+    if not any(resolver for resolver, _ in kandidat):
+        raise ScanDitolak('danger', 'Pengaturan waktu absensi belum diatur oleh admin.')
 
     # ====================== CEK WAKTU ABSEN ======================
-    if setting.jam_masuk_mulai <= waktu_skrg <= setting.jam_masuk_selesai:
-        jenis_absen = "masuk"
-        status_absen_db = "Hadir"
-    elif setting.jam_terlambat_selesai and setting.jam_masuk_selesai < waktu_skrg <= setting.jam_terlambat_selesai:
-        jenis_absen = "masuk"
-        status_absen_db = "Terlambat"
-    elif setting.jam_pulang_mulai <= waktu_skrg <= setting.jam_pulang_selesai:
-        jenis_absen = "pulang"
-        status_absen_db = "Hadir"
-    else:
-        return jsonify({'status': 'danger', 'message': 'Bukan waktu absensi yang valid.'})
+    # Resolver (interval terurut + bisect) dibangun sekali di snapshot pengaturan
+    hasil = None
+    for resolver, geser_hari in kandidat:
+        hasil = resolver.cari(waktu_skrg, geser_hari) if resolver else None
+        if hasil:
+            break
+    if not hasil:
+        raise ScanDitolak('danger', 'Bukan waktu absensi yang valid.')
 
-    # ====================== CEK SUDAH ABSEN BELUM ======================
-    filter_conditions = {field: identifier, "tanggal": hari_ini, "jenis_absen": jenis_absen}
-    sudah_absen = model.query.filter_by(**filter_conditions).first()
-    if sudah_absen:
-        return jsonify({'status': 'warning', 'message': f"{entity.nama} sudah absen {jenis_absen} hari ini."})
+    jenis_absen, status_absen_db = hasil.jenis_absen, hasil.status
+    # Bagian shift yang lewat tengah malam dicatat pada tanggal shift dimulai
+    tanggal_absen = hari_ini + timedelta(days=hasil.geser_hari)
 
-    # ====================== SIMPAN ABSENSI ======================
-    absensi_data = {
+    # ==============================================================================
+    #  INTEGRASI: Lakukan Pengecekan Hari Libur Berlapis
+    # ==============================================================================
+    # Dicek terhadap tanggal absen (tanggal mulai shift), bukan tanggal scan:
+    # scan pulang shift malam kemarin tetap milik hari kemarin
+    libur = pengaturan.kalender.keterangan_libur(tanggal_absen)
+    hari = "Hari ini" if tanggal_absen == hari_ini else f"Tanggal {tanggal_absen.strftime('%d-%m-%Y')}"
+
+    # 1. Cek Libur Rutin (Mingguan)
+    if libur and libur.rutin:
+        raise ScanDitolak('warning', f"Hari {libur.keterangan} adalah hari libur rutin. Absensi tidak dicatat.")
+
+    # 2. Cek Libur Spesial (Tanggal Merah)
+    if libur:
+        raise ScanDitolak('warning', f"{hari} libur: {libur.keterangan}. Absensi tidak dicatat.")
+    # ==============================================================================
+
+    absensi = model(**{
         field: identifier,
         "status": status_absen_db,
         "jenis_absen": jenis_absen,
-        "tanggal": hari_ini,
-        "waktu": now.time()
+        "tanggal": tanggal_absen,
+        "waktu": waktu_skrg,
+    })
+
+    # Notifikasi WA (hanya siswa) masuk outbox pada transaksi yang sama,
+    # lalu dikirim oleh dispatcher latar belakang (notifikasi_wa.py)
+    notifikasi = None
+    if send_wa and entity.no_hp_ortu:
+        notifikasi = buat_notifikasi_absensi(
+            format_nomor_hp(entity.no_hp_ortu), entity.nama, jenis_absen, status_absen_db, now
+        )
+
+    return {
+        "absensi": absensi,
+        "id": identifier,
+        "notifikasi": notifikasi,
+        "tipe": tipe,
+        "grup": grup,
+        "nama": entity.nama,
+        "jenis_absen": jenis_absen,
+        "status": status_absen_db,
+        "tanggal": tanggal_absen,
     }
 
+
+def hapus_alfa_tertimpa(rencana, waktu_scan, diterima):
+    """
+    Scan masuk antrian offline menggantikan Alfa otomatis orang itu pada tanggal
+    yang sama. Hanya perlu jika scan tertunda dan tiba setelah batas masuk
+    (job Alfa mungkin sudah berjalan); scan lain tidak menjalankan DELETE.
+    Dipanggil setelah rencana['absensi'] ditambahkan ke sesi: autoflush
+    menjalankan insert (dan cek scan ganda) lebih dulu.
+    """
+    if rencana["jenis_absen"] != "masuk" or waktu_scan >= diterima:
+        return
+    if alfa_jatuh_tempo(kelompok_dari(rencana["tipe"], rencana["grup"]), rencana["tanggal"], diterima):
+        hapus_alfa_otomatis_orang(rencana["tipe"], rencana["id"], rencana["tanggal"], rencana["grup"])
+
+
+def pesan_berhasil(rencana):
+    pesan = f"Absen {rencana['jenis_absen']} berhasil ({rencana['status']})."
+    if rencana["notifikasi"] is not None:
+        pesan += " Notifikasi WA dalam antrian."
+    return pesan
+
+
+def pesan_sudah_absen(rencana):
+    tanggal = rencana["tanggal"]
+    keterangan = "hari ini" if tanggal == datetime.now().date() else f"pada {tanggal.strftime('%d-%m-%Y')}"
+    return f"{rencana['nama']} sudah absen {rencana['jenis_absen']} {keterangan}."
+
+
+# =======================================================================
+#  ROUTE: PROSES SUBMIT QR (DENGAN INTEGRASI HARI LIBUR)
+# =======================================================================
+@scan_bp.route("/submit_scan", methods=["POST"])
+def submit_scan():
+    """Proses hasil scan QR untuk mencatat absensi."""
+    qr_data = request.form.get("qr_data") or request.form.get("identifier")
+
+    if not qr_data:
+        hasil_scan.tambah(jalur="scan", hasil="ditolak")
+        return jsonify({'status': 'danger', 'message': 'Data QR tidak ditemukan.'})
+
+    now = datetime.now()
+    try:
+        with tahap("scan", "validasi"):
+            rencana = siapkan_absensi(qr_data, now)
+    except ScanDitolak as e:
+        hasil_scan.tambah(jalur="scan", hasil=e.hasil)
+        return jsonify({'status': e.status, 'message': e.message})
+
+    # ====================== SIMPAN ABSENSI ======================
+    # Cek "sudah absen" ditangani unique index (id, tanggal, jenis_absen):
+    # insert langsung dicoba, pelanggaran constraint berarti scan ganda.
+    # Tahap 'commit' mencakup flush insert, cek unique index dan tulis rekap
     try:
-        db.session.add(model(**absensi_data))
-        db.session.commit()
+        with tahap("scan", "simpan"):
+            db.session.add(rencana["absensi"])
+            catat_absensi(rencana["tipe"], rencana["grup"], rencana["absensi"])
+            if rencana["notifikasi"] is not None:
+                db.session.add(rencana["notifikasi"])
+        with tahap("scan", "commit"):
+            db.session.commit()
+    except exc.IntegrityError:
+        db.session.rollback()
+        hasil_scan.tambah(jalur="scan", hasil="sudah_absen")
+        return jsonify({'status': 'warning', 'message': pesan_sudah_absen(rencana)})
     except Exception as e:
         db.session.rollback()
-        print("Database Error:", e)
+        hasil_scan.tambah(jalur="scan", hasil="gagal")
+        current_app.logger.error(f"Gagal menyimpan scan: {e}")
         return jsonify({'status': 'danger', 'message': 'Gagal menyimpan data absensi.'})
 
-    # ====================== KIRIM WHATSAPP (HANYA SISWA) ======================
-    if send_wa and entity.no_hp_ortu:
-        nomor = format_nomor_hp(entity.no_hp_ortu)
-        pesan = (
-            f"📚 *Notifikasi Absensi Sekolah*\n\n"
-            f"Anak Anda, {entity.nama}, telah melakukan absen *{jenis_absen}* "
-            f"dengan status *{status_absen_db}* pada pukul {now.strftime('%H:%M:%S')}."
-        )
+    if rencana["notifikasi"] is not None:
+        pengirim_wa.bangunkan()
+    hasil_scan.tambah(jalur="scan", hasil="berhasil")
+    return jsonify({'status': 'success', 'message': pesan_berhasil(rencana)})
+
 
+# =======================================================================
+#  ROUTE: SUBMIT BATCH (SCANNER OFFLINE / ANTRIAN LOKAL)
+# =======================================================================
+def _kunci_kiosk():
+    return os.getenv("SCAN_KIOSK_KUNCI", "")
+
+
+def buat_token_kiosk(kiosk_id, kunci=None):
+    """Token kiosk: HMAC-SHA256 dari id kiosk dengan SCAN_KIOSK_KUNCI (hex)."""
+    kunci = kunci if kunci is not None else _kunci_kiosk()
+    return hmac.new(kunci.encode("utf-8"), kiosk_id.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def periksa_token_kiosk(kiosk_id, token):
+    """True jika header X-Kiosk-Id/X-Kiosk-Token sah untuk kiosk yang diizinkan."""
+    kunci = _kunci_kiosk()
+    if not kunci or not kiosk_id or not token:
+        return False
+    daftar = {k.strip() for k in os.getenv("SCAN_KIOSK_DAFTAR", "").split(",") if k.strip()}
+    if daftar and kiosk_id not in daftar:
+        return False
+    return hmac.compare_digest(buat_token_kiosk(kiosk_id, kunci), token)
+
+
+@click.command("kiosk-token")
+@click.argument("kiosk_id")
+def kiosk_token_command(kiosk_id):
+    """Cetak token kiosk scanner untuk KIOSK_ID (butuh SCAN_KIOSK_KUNCI)."""
+    if not _kunci_kiosk():
+        raise click.ClickException("SCAN_KIOSK_KUNCI belum diisi di .env.")
+    token = buat_token_kiosk(kiosk_id)
+    click.echo(f"Token kiosk {kiosk_id}: {token}")
+    click.echo(f"Buka sekali di perangkat kiosk: /scan/#kiosk={kiosk_id}&token={token}")
+
+
+def _parse_waktu_scan(nilai, sekarang):
+    """Parse waktu scan ISO (waktu lokal kiosk) dan tolak yang di luar batas wajar."""
+    if not isinstance(nilai, str):
+        raise ScanDitolak('danger', 'Waktu scan tidak valid.')
+    try:
+        waktu = datetime.fromisoformat(nilai)
+    except ValueError:
+        raise ScanDitolak('danger', 'Waktu scan tidak valid.')
+    if waktu.tzinfo is not None:
+        waktu = waktu.astimezone().replace(tzinfo=None)
+    if waktu > sekarang + TOLERANSI_WAKTU_DEPAN:
+        raise ScanDitolak('danger', 'Waktu scan berada di masa depan. Periksa jam perangkat scanner.')
+    if waktu < sekarang - timedelta(minutes=float(os.getenv("SCAN_MAKS_UMUR_MENIT", "10"))):
+        raise ScanDitolak('danger', 'Scan terlalu lama tertunda dan tidak dapat dicatat.')
+    return waktu
+
+
+@scan_bp.route("/submit_batch", methods=["POST"])
+def submit_batch():
+    """
+    Catat banyak scan sekaligus: {"scans": [{"id", "qr_data", "waktu"}, ...]}.
+    Hanya untuk kiosk terdaftar (header X-Kiosk-Id dan X-Kiosk-Token). Setiap
+    scan divalidasi terhadap jendela waktu pada waktu scan (bukan waktu
+    server), disimpan dalam satu transaksi dengan savepoint per item, dan
+    hasilnya dikembalikan per item.
+    """
+    kiosk_id = request.headers.get("X-Kiosk-Id", "")
+    if not periksa_token_kiosk(kiosk_id, request.headers.get("X-Kiosk-Token", "")):
+        hasil_scan.tambah(jalur="batch", hasil="ditolak")
+        return jsonify({'status': 'danger', 'message': 'Perangkat scanner belum terdaftar sebagai kiosk.'}), 401
+
+    data = request.get_json(silent=True)
+    daftar_scan = data.get("scans") if isinstance(data, dict) else None
+    if not isinstance(daftar_scan, list) or not daftar_scan:
+        return jsonify({'status': 'danger', 'message': 'Daftar scan kosong atau tidak valid.'}), 400
+    if len(daftar_scan) > MAKS_SCAN_PER_BATCH:
+        return jsonify({'status': 'danger', 'message': f'Maksimal {MAKS_SCAN_PER_BATCH} scan per batch.'}), 400
+
+    sekarang = datetime.now()
+    hasil = []
+    hasil_metrik = []
+    ada_notifikasi = False
+
+    for item in daftar_scan:
+        item = item if isinstance(item, dict) else {}
+        hasil_item = {'id': item.get("id")}
         try:
-            token = "m7sWNBLHrGi2AHZNj2x3"  # Ganti dengan token kamu sendiri
-            response = requests.post(
-                "https://api.fonnte.com/send",
-                headers={"Authorization": token},
-                data={"target": nomor, "message": pesan}
-            )
-
-            if response.status_code == 200:
-                return jsonify({'status': 'success', 'message': f"Absen {jenis_absen} berhasil & WA terkirim."})
-            else:
-                return jsonify({'status': 'warning', 'message': f"Absen berhasil tapi WA gagal. ({response.status_code})"})
+            qr_data = item.get("qr_data")
+            if not isinstance(qr_data, str) or not qr_data.strip():
+                raise ScanDitolak('danger', 'Data QR tidak ditemukan.')
+            waktu = _parse_waktu_scan(item.get("waktu", sekarang.isoformat()), sekarang)
+            with tahap("batch", "validasi"):
+                rencana = siapkan_absensi(qr_data, waktu)
 
+            # Savepoint per item: scan ganda hanya membatalkan item itu sendiri
+            try:
+                # Rekap yang dicatat di dalam savepoint ikut batal jika savepoint di-rollback
+                with tahap("batch", "simpan"), db.session.begin_nested():
+                    db.session.add(rencana["absensi"])
+                    catat_absensi(rencana["tipe"], rencana["grup"], rencana["absensi"])
+                    if rencana["notifikasi"] is not None:
+                        db.session.add(rencana["notifikasi"])
+                    hapus_alfa_tertimpa(rencana, waktu, sekarang)
+            except exc.IntegrityError:
+                raise ScanDitolak('warning', pesan_sudah_absen(rencana), hasil="sudah_absen")
+
+            ada_notifikasi = ada_notifikasi or rencana["notifikasi"] is not None
+            hasil_item.update(status='success', message=pesan_berhasil(rencana))
+            hasil_metrik.append("berhasil")
+        except ScanDitolak as e:
+            hasil_item.update(status=e.status, message=e.message)
+            hasil_metrik.append(e.hasil)
         except Exception as e:
-            print("WA Error:", e)
-            return jsonify({'status': 'warning', 'message': f"Absen berhasil tapi WA gagal: {str(e)}"})
+            # Item rusak tidak boleh menggagalkan batch (antrian kiosk akan mengirim ulang terus)
+            current_app.logger.error(f"Gagal memproses scan batch dari kiosk {kiosk_id}: {e!r}")
+            hasil_item.update(status='danger', message='Scan tidak dapat diproses.')
+            hasil_metrik.append("gagal")
+        hasil.append(hasil_item)
+
+    try:
+        with tahap("batch", "commit"):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        hasil_scan.tambah(len(hasil), jalur="batch", hasil="gagal")
+        current_app.logger.error(f"Gagal menyimpan batch scan: {e}")
+        return jsonify({'status': 'danger', 'message': 'Gagal menyimpan data absensi.'}), 500
+
+    for label in hasil_metrik:
+        hasil_scan.tambah(jalur="batch", hasil=label)
+
+    if ada_notifikasi:
+        pengirim_wa.bangunkan()
 
-    return jsonify({'status': 'success', 'message': f"Absen {jenis_absen} berhasil ({status_absen_db})."})
\ No newline at end of file
+    return jsonify({
+        'status': 'success',
+        'tercatat': sum(1 for h in hasil if h['status'] == 'success'),
+        'hasil': hasil,
+    })
\ No newline at end of file
@@ -0,0 +1,144 @@
+# ======================== SIARAN DASHBOARD (PUB/SUB DALAM PROSES) ========================
+# Berkas ini meneruskan perubahan jumlah absensi ke dashboard yang sedang dibuka
+# lewat Server-Sent Events (/dashboard/stream). Sumber datanya adalah perubahan
+# rekap harian yang baru saja di-commit (lihat rekap.py), sehingga setiap route
+# yang memperbarui rekap (scan, scan batch, ubah status) otomatis ikut tersiar.
+#
+# Pub/sub ini hanya berlaku di dalam satu proses. Absensi yang di-commit worker
+# lain dideteksi dari MAX(id) tabel rekap_delta (dibaca lewat primary key): jika
+# berubah dan baris terbaru bukan tulisan proses ini sendiri (sudah tersiar
+# langsung), semua pelanggan proses ini diminta sinkron ulang dari
+# /dashboard/api/statistik. Pengecekan dilakukan paling sering sekali
+# per DASHBOARD_SINKRON_DETIK (default 5) per proses, hanya selama ada pelanggan.
+#
+# Setiap koneksi SSE menahan satu thread worker gthread selama dashboard dibuka,
+# jadi jumlah pelanggan per proses dibatasi (DASHBOARD_SSE_MAKS, default 2).
+# Di atas batas, /dashboard/stream menjawab 503 dan dashboard beralih ke polling.
+
+import os
+import queue
+import threading
+import time as _time
+
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import db, RekapDelta
+
+# Batas pesan yang menunggu per pelanggan; jika penuh, pelanggan diminta sinkron ulang
+MAKS_ANTRIAN = 100
+
+
+def delta_dashboard(perubahan):
+    """
+    Ubah perubahan rekap {(tanggal, tipe, grup, jenis_absen, status): delta}
+    menjadi delta angka dashboard per tanggal:
+    {tanggal: {"siswa": {"hadir": 1, ...}, "pegawai": {...}}}.
+    Aturannya sama dengan statistik.py: hadir/terlambat dari catatan 'masuk',
+    sakit/izin dari status apa pun (catatan 'lainnya').
+    """
+    hasil = {}
+    for (tanggal, tipe, _grup, jenis_absen, status), delta in perubahan.items():
+        if not delta:
+            continue
+        if jenis_absen == "masuk" and status in ("Hadir", "Terlambat"):
+            kunci = status.lower()
+        elif status in ("Sakit", "Izin"):
+            kunci = status.lower()
+        else:
+            continue
+        per_tipe = hasil.setdefault(tanggal, {}).setdefault(tipe, {})
+        per_tipe[kunci] = per_tipe.get(kunci, 0) + delta
+    return hasil
+
+
+class SiaranDashboard:
+    """Daftar pelanggan (satu queue per koneksi SSE) dan penerbitan pesan ke semuanya."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pelanggan = set()
+        self._penanda = None       # MAX(rekap_delta.id) pada pengecekan terakhir
+        self._delta_sendiri = None  # id rekap_delta tertinggi yang ditulis proses ini
+        self._dicek_pada = None
+
+    @property
+    def jeda_sinkron(self):
+        return float(os.getenv("DASHBOARD_SINKRON_DETIK", "5"))
+
+    @property
+    def maks_pelanggan(self):
+        return int(os.getenv("DASHBOARD_SSE_MAKS", "2"))
+
+    def langganan(self):
+        """
+        Daftarkan koneksi baru; kembalikan queue yang dibaca generator SSE, atau
+        None jika jumlah pelanggan proses ini sudah mencapai batas.
+        """
+        antrian = queue.Queue(maxsize=MAKS_ANTRIAN)
+        with self._lock:
+            if len(self._pelanggan) >= self.maks_pelanggan:
+                return None
+            self._pelanggan.add(antrian)
+        return antrian
+
+    def berhenti(self, antrian):
+        with self._lock:
+            self._pelanggan.discard(antrian)
+
+    @property
+    def jumlah_pelanggan(self):
+        return len(self._pelanggan)
+
+    def terbitkan(self, pesan):
+        """Kirim pesan ke semua pelanggan tanpa pernah memblokir pengirim."""
+        with self._lock:
+            daftar = list(self._pelanggan)
+        for antrian in daftar:
+            try:
+                antrian.put_nowait(pesan)
+            except queue.Full:
+                # Pelanggan lambat: buang antriannya dan minta sinkron ulang penuh
+                with antrian.mutex:
+                    antrian.queue.clear()
+                antrian.put_nowait({"sinkron": True})
+
+    def catat_delta_sendiri(self, id_delta):
+        """Dipanggil rekap.py dengan id rekap_delta tertinggi yang baru ditulis proses ini."""
+        with self._lock:
+            if self._delta_sendiri is None or id_delta > self._delta_sendiri:
+                self._delta_sendiri = id_delta
+
+    def periksa_proses_lain(self, app):
+        """
+        Minta pelanggan sinkron ulang jika ada absensi yang di-commit proses lain
+        sejak pengecekan terakhir. Commit proses ini sendiri sudah tersiar lewat
+        terbitkan_rekap, jadi MAX(id) yang berasal dari proses ini diabaikan.
+        Aman dipanggil sering: hanya satu query per jeda_sinkron untuk seluruh
+        pelanggan proses ini.
+        """
+        sekarang = _time.monotonic()
+        with self._lock:
+            if self._dicek_pada is not None and sekarang - self._dicek_pada < self.jeda_sinkron:
+                return
+            pertama = self._dicek_pada is None
+            self._dicek_pada = sekarang
+        try:
+            with app.app_context(), db.engine.connect() as conn:
+                penanda = conn.execute(select(func.max(RekapDelta.id))).scalar()
+        except SQLAlchemyError:
+            return
+        if not pertama and penanda != self._penanda and penanda != self._delta_sendiri:
+            self.terbitkan({"sinkron": True})
+        self._penanda = penanda
+
+    def terbitkan_rekap(self, perubahan):
+        """Dipanggil setelah commit dengan perubahan rekap yang baru ditulis."""
+        if not self._pelanggan:
+            return
+        for tanggal, per_tipe in delta_dashboard(perubahan).items():
+            self.terbitkan({"tanggal": tanggal.strftime("%Y-%m-%d"), **per_tipe})
+
+
+# Instance global yang dipakai rekap.py dan route dashboard
+siaran_dashboard = SiaranDashboard()
@@ -1,10 +1,12 @@
-import csv
 import os
-import io
 
-from flask import Blueprint, flash, request, render_template, url_for, redirect, send_file, session, current_app
+from flask import Blueprint, flash, request, render_template, url_for, redirect, session, current_app
 from models import Siswa, Kelas, db
-from utils import create_qr_siswa, check_admin_session
+from qr_cache import response_qr_siswa, simpan_qr_siswa
+from impor_siswa import impor_siswa_csv, regenerasi_qr_siswa
+from job_latar import pelaksana_job
+from indeks_identitas import indeks_identitas
+from utils import check_admin_session
 
 # 🟢 Inisialisasi Blueprint
 siswa_bp = Blueprint("siswa_bp", __name__, url_prefix="/siswa")
@@ -58,8 +60,7 @@ def siswa():
 
         qr_filename = f"{nis}.png"
         qr_path = os.path.join(upload_folder, qr_filename)
-        qr_image = create_qr_siswa(nis, nama)
-        qr_image.save(qr_path)
+        simpan_qr_siswa(nis, nama, qr_path)
 
         if siswa_edit:
             siswa_edit.nama = nama
@@ -67,6 +68,7 @@ def siswa():
             siswa_edit.no_hp_ortu = no_hp
             siswa_edit.qr_path = qr_path
             db.session.commit()
+            indeks_identitas.perbarui_siswa(siswa_edit)
             flash("Data siswa berhasil diperbarui", "success")
         else:
             siswa_exist = Siswa.query.filter_by(nis=nis).first()
@@ -83,6 +85,7 @@ def siswa():
             )
             db.session.add(siswa_baru)
             db.session.commit()
+            indeks_identitas.perbarui_siswa(siswa_baru)
             flash("Data siswa berhasil ditambahkan", "success")
 
         return redirect(url_for("siswa_bp.siswa"))
@@ -129,6 +132,7 @@ def hapus_siswa(id):
 
         db.session.delete(siswa_to_delete)
         db.session.commit()
+        indeks_identitas.hapus("s", siswa_to_delete.nis)
         flash("Data siswa berhasil dihapus", "success")
     else:
         flash("Siswa tidak ditemukan.", "danger")
@@ -146,13 +150,9 @@ def download_qr(nis):
         flash("Siswa tidak ditemukan.", "danger")
         return redirect(url_for("siswa_bp.siswa"))
 
-    img = create_qr_siswa(siswa_data.nis, siswa_data.nama)
-    img_io = io.BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
-
+    # Gambar diambil dari cache QR (ETag/304), hanya dibuat ulang jika data berubah
     filename = f"{siswa_data.nama}_{siswa_data.nis}.png"
-    return send_file(img_io, mimetype='image/png', as_attachment=True, download_name=filename)
+    return response_qr_siswa(siswa_data.nis, siswa_data.nama, download_name=filename)
 
 
 @siswa_bp.route('/view_qr/<nis>')
@@ -161,12 +161,7 @@ def view_qr(nis):
     if not siswa_data:
         return "Siswa tidak ditemukan", 404
 
-    img = create_qr_siswa(siswa_data.nis, siswa_data.nama)
-    img_io = io.BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
-
-    return send_file(img_io, mimetype='image/png')
+    return response_qr_siswa(siswa_data.nis, siswa_data.nama)
 
 
 # =======================================================================
@@ -187,56 +182,50 @@ def import_siswa():
         flash("Nama file tidak valid.", "danger")
         return redirect(url_for("siswa_bp.siswa"))
 
-    try:
-        stream = io.StringIO(file.stream.read().decode("utf-8"))
-        csv_input = csv.DictReader(stream)
-
-        upload_folder = current_app.config['QR_FOLDER_SISWA']
-        os.makedirs(upload_folder, exist_ok=True)
-
-        count_new = 0
-        count_update = 0
-        for row in csv_input:
-            nis = row.get("nis")
-            nama = row.get("nama")
-            no_hp = row.get("no_hp")
-            kelas_nama = row.get("kelas")
+    # Impor dijalankan di job latar; browser diarahkan ke halaman progres job
+    job_id = pelaksana_job.kirim("impor_siswa", data_input=file.stream.read())
+    return redirect(url_for("job_bp.status_job_page", job_id=job_id))
 
-            if not nis or not nama or not kelas_nama:
-                continue
 
-            kelas = Kelas.query.filter_by(nama=kelas_nama).first()
-            if not kelas:
-                flash(f"Kelas '{kelas_nama}' tidak ditemukan, data {nama} dilewati.", "warning")
-                continue
+# =======================================================================
+# ROUTE: REGENERASI QR SEMUA SISWA
+# =======================================================================
+@siswa_bp.route("/regenerasi_qr", methods=["POST"])
+def regenerasi_qr():
+    auth_check = check_admin_session()
+    if auth_check:
+        return auth_check
 
-            qr_filename = f"{nis}.png"
-            qr_path = os.path.join(upload_folder, qr_filename)
-            qr_image = create_qr_siswa(nis, nama)
-            qr_image.save(qr_path)
+    job_id = pelaksana_job.kirim("regenerasi_qr_siswa")
+    return redirect(url_for("job_bp.status_job_page", job_id=job_id))
 
-            siswa_exist = Siswa.query.filter_by(nis=nis).first()
-            if siswa_exist:
-                siswa_exist.nama = nama
-                siswa_exist.kelas_id = kelas.id
-                siswa_exist.no_hp_ortu = no_hp
-                siswa_exist.qr_path = qr_path
-                count_update += 1
-            else:
-                siswa_baru = Siswa(
-                    nis=nis,
-                    nama=nama,
-                    kelas_id=kelas.id,
-                    no_hp_ortu=no_hp,
-                    qr_path=qr_path
-                )
-                db.session.add(siswa_baru)
-                count_new += 1
 
-        db.session.commit()
-        flash(f"Impor selesai: {count_new} siswa baru, {count_update} diperbarui.", "success")
+# =======================================================================
+# JOB LATAR: IMPOR & REGENERASI QR SISWA
+# =======================================================================
+@pelaksana_job.tugas("impor_siswa")
+def job_impor_siswa(job):
+    hasil = impor_siswa_csv(
+        job.baca_input().decode("utf-8-sig"),
+        current_app.config['QR_FOLDER_SISWA'],
+        current_app.config['QR_FOLDER_CACHE'],
+        progres=job.progres,
+    )
+    # Impor massal: indeks identitas dimuat ulang penuh saat scan berikutnya
+    indeks_identitas.invalidate()
+    hasil["ringkasan"] = (
+        f"Impor selesai: {hasil['baru']} siswa baru, {hasil['diperbarui']} diperbarui, "
+        f"{hasil['dilewati']} baris dilewati."
+    )
+    return hasil
 
-    except Exception as e:
-        flash(f"Terjadi kesalahan saat mengimpor: {str(e)}", "danger")
 
-    return redirect(url_for("siswa_bp.siswa"))
\ No newline at end of file
+@pelaksana_job.tugas("regenerasi_qr_siswa")
+def job_regenerasi_qr_siswa(job):
+    hasil = regenerasi_qr_siswa(
+        current_app.config['QR_FOLDER_SISWA'],
+        current_app.config['QR_FOLDER_CACHE'],
+        progres=job.progres,
+    )
+    hasil["ringkasan"] = f"QR {hasil['berhasil']} siswa berhasil dibuat ulang."
+    return hasil
\ No newline at end of file
@@ -0,0 +1,117 @@
+# ======================== LAYANAN STATISTIK ABSENSI ========================
+# Berkas ini menghitung statistik absensi harian (siswa & pegawai) dengan satu
+# query agregat per tabel. Dipakai oleh dashboard dan API statistik.
+
+from datetime import datetime, time
+
+from sqlalchemy import select, func, distinct, case, and_, or_
+
+from models import db, Siswa, Kelas, Absensi, Pegawai, AbsensiPegawai
+from pengaturan_cache import pengaturan_cache
+
+# Batas absen masuk bawaan jika jam_terlambat_selesai belum diatur
+BATAS_MASUK_DEFAULT = time(8, 0, 0)
+
+
+def _hitung_per_status(model, kolom_id, tanggal, **total_subquery):
+    """
+    Hitung jumlah orang per status untuk satu tanggal dalam satu query.
+    Setiap angka adalah COUNT(DISTINCT id) bersyarat, sehingga hasilnya sama
+    dengan perhitungan lama yang menjalankan satu query per status.
+    Total (jumlah siswa, kelas, dst.) ikut diambil sebagai scalar subquery.
+    """
+    kolom = getattr(model, kolom_id)
+    masuk = model.jenis_absen == "masuk"
+
+    def jumlah_jika(kondisi):
+        return func.count(distinct(case((kondisi, kolom))))
+
+    query = select(
+        jumlah_jika(and_(masuk, model.status == "Hadir")).label("hadir"),
+        jumlah_jika(and_(masuk, model.status == "Terlambat")).label("terlambat"),
+        jumlah_jika(model.status == "Sakit").label("sakit"),
+        jumlah_jika(model.status == "Izin").label("izin"),
+        jumlah_jika(or_(
+            and_(masuk, model.status.in_(["Hadir", "Terlambat"])),
+            model.status.in_(["Sakit", "Izin"]),
+        )).label("berstatus"),
+        *[subquery.label(nama) for nama, subquery in total_subquery.items()],
+    ).where(model.tanggal == tanggal)
+
+    return db.session.execute(query).one()._asdict()
+
+
+def _total_subquery(model):
+    return select(func.count()).select_from(model).scalar_subquery()
+
+
+def cek_hari_libur(tanggal):
+    """Kembalikan pesan libur untuk tanggal tersebut, atau None jika hari kerja."""
+    libur = pengaturan_cache.get().kalender.keterangan_libur(tanggal)
+    if libur is None:
+        return None
+    if libur.rutin:
+        return f"Hari {libur.keterangan} adalah hari libur rutin."
+    return f"Hari ini libur: {libur.keterangan}."
+
+
+def info_libur_tanggal(tanggal):
+    """Pesan libur lengkap dengan tanggal (halaman absensi), atau None jika hari kerja."""
+    libur = pengaturan_cache.get().kalender.keterangan_libur(tanggal)
+    if libur is None:
+        return None
+    if libur.rutin:
+        return f"Tanggal {tanggal.strftime('%d %B %Y')} adalah hari libur rutin ({libur.keterangan})."
+    return f"Tanggal {tanggal.strftime('%d %B %Y')} adalah hari libur: {libur.keterangan}."
+
+
+def statistik_harian(tanggal=None, sekarang=None):
+    """
+    Statistik absensi siswa dan pegawai untuk satu tanggal.
+
+    Mengembalikan dict berisi 'info_libur', 'siswa', 'pegawai', 'total_kelas' dan
+    'alfa_dihitung' (True jika batas absen masuk sudah lewat).
+    Total dihitung di query yang sama (scalar subquery), sehingga seluruh
+    statistik cukup 2 round trip ke database.
+    """
+    sekarang = sekarang or datetime.now()
+    tanggal = tanggal or sekarang.date()
+    info_libur = cek_hari_libur(tanggal)
+
+    kosong = {"hadir": 0, "terlambat": 0, "sakit": 0, "izin": 0, "alfa": 0}
+
+    if info_libur:
+        # Hari libur: statistik nol, hanya total yang perlu diambil
+        total = db.session.execute(select(
+            _total_subquery(Siswa).label("siswa"),
+            _total_subquery(Pegawai).label("pegawai"),
+            _total_subquery(Kelas).label("kelas"),
+        )).one()
+        return {
+            "info_libur": info_libur,
+            "siswa": dict(kosong, total=total.siswa),
+            "pegawai": dict(kosong, total=total.pegawai),
+            "total_kelas": total.kelas,
+            "alfa_dihitung": False,
+        }
+
+    siswa = _hitung_per_status(
+        Absensi, "nis", tanggal,
+        total=_total_subquery(Siswa), total_kelas=_total_subquery(Kelas),
+    )
+    pegawai = _hitung_per_status(AbsensiPegawai, "no_id", tanggal, total=_total_subquery(Pegawai))
+    total_kelas = siswa.pop("total_kelas")
+
+    # Alfa (siswa) / tidak tercatat (pegawai) baru dihitung setelah batas absen masuk
+    setting = pengaturan_cache.get().setting_siswa
+    batas_masuk = setting.jam_terlambat_selesai if setting and setting.jam_terlambat_selesai else BATAS_MASUK_DEFAULT
+    lewat_batas = tanggal < sekarang.date() or (tanggal == sekarang.date() and sekarang.time() > batas_masuk)
+
+    for data in (siswa, pegawai):
+        berstatus = data.pop("berstatus")
+        data["alfa"] = max(0, data["total"] - berstatus) if lewat_batas else 0
+
+    return {
+        "info_libur": None, "siswa": siswa, "pegawai": pegawai,
+        "total_kelas": total_kelas, "alfa_dihitung": lewat_batas,
+    }
@@ -0,0 +1,106 @@
+# ======================== UBAH STATUS ABSENSI MASSAL ========================
+# Berkas ini menerapkan koreksi status absensi (Hadir / Sakit / Izin / Alfa)
+# untuk banyak siswa atau pegawai sekaligus pada satu tanggal: satu DELETE,
+# satu INSERT massal dan satu pembaruan rekap, semuanya dalam satu transaksi.
+# Dipakai oleh endpoint /absensi/update_massal dan /absensi_pegawai/update_massal.
+
+from datetime import datetime
+
+from sqlalchemy import delete, insert
+
+from models import db
+from rekap import catat_rekap, orang_per_id, kurangi_rekap_absensi, sumber_absensi
+
+STATUS_VALID = ('Hadir', 'Sakit', 'Izin', 'Alfa')
+
+# Batas jumlah pasangan (id, status) per permintaan
+MAKS_PER_PERMINTAAN = 500
+
+
+def ubah_status_massal(tipe, tanggal, daftar_perubahan, waktu=None):
+    """
+    Terapkan daftar (id, status) untuk tipe 'siswa' atau 'pegawai' pada tanggal.
+    Semua catatan lama orang tersebut pada tanggal itu diganti: 'Hadir' menjadi
+    catatan masuk + pulang, status lain menjadi satu catatan 'lainnya'.
+    Jika id muncul lebih dari sekali (tanpa membedakan huruf besar/kecil),
+    status terakhir yang dipakai. Catatan baru memakai ID seperti tersimpan di
+    tabel siswa/pegawai.
+
+    Mengembalikan (diperbarui, gagal) dengan gagal = [{"id", "pesan"}].
+    Commit dilakukan pemanggil.
+    """
+    sumber = sumber_absensi(tipe)
+    model, kolom = sumber.model, sumber.kolom_id.key
+    waktu = waktu or datetime.now().time()
+
+    gagal = []
+    # Kunci huruf kecil: "A01" dan "a01" adalah orang yang sama (kolom ID MySQL *_ci)
+    permintaan = {}
+    diminta = set()
+    for id_, status in daftar_perubahan:
+        if status not in STATUS_VALID:
+            gagal.append({"id": id_, "pesan": f"Status '{status}' tidak valid."})
+        else:
+            permintaan[id_.lower()] = (id_, status)
+            diminta.add(id_)
+
+    orang = orang_per_id(tipe, list(diminta)) if permintaan else {}
+    status_per_id = {}
+    grup = {}
+    for kunci, (id_, status) in permintaan.items():
+        if kunci not in orang:
+            gagal.append({"id": id_, "pesan": "ID tidak ditemukan."})
+            continue
+        id_tersimpan, grup[id_tersimpan] = orang[kunci]
+        status_per_id[id_tersimpan] = status
+    if not status_per_id:
+        return 0, gagal
+
+    ids = list(status_per_id)
+    kurangi_rekap_absensi(tipe, ids, tanggal)
+    db.session.execute(delete(model).where(getattr(model, kolom).in_(ids), model.tanggal == tanggal))
+
+    rows = []
+    for id_, status in status_per_id.items():
+        if status == 'Hadir':
+            catatan = [("masuk", "Konfirmasi Hadir"), ("pulang", "Konfirmasi Pulang")]
+        else:
+            catatan = [("lainnya", status)]
+        for jenis_absen, keterangan in catatan:
+            rows.append({
+                kolom: id_, "tanggal": tanggal, "status": status,
+                "jenis_absen": jenis_absen, "keterangan": keterangan, "waktu": waktu,
+            })
+            catat_rekap(tanggal, tipe, grup[id_], jenis_absen, status)
+    db.session.execute(insert(model), rows)
+    return len(status_per_id), gagal
+
+
+def baca_permintaan_massal(data):
+    """
+    Validasi body JSON {"tanggal": "YYYY-MM-DD", "data": [{"id", "status"}, ...]}.
+    Mengembalikan (tanggal, daftar_perubahan) atau melempar ValueError berisi pesan.
+    Tanggal boleh di masa lalu (koreksi), tetapi tidak di masa depan.
+    """
+    hari_ini = datetime.today().date()
+    tanggal = hari_ini
+    if data.get("tanggal"):
+        try:
+            tanggal = datetime.strptime(str(data["tanggal"]), "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError("Format tanggal tidak valid (YYYY-MM-DD).")
+    if tanggal > hari_ini:
+        raise ValueError("Tidak dapat mengubah absensi untuk tanggal yang akan datang.")
+
+    daftar = data.get("data")
+    if not isinstance(daftar, list) or not daftar:
+        raise ValueError("Daftar perubahan kosong atau tidak valid.")
+    if len(daftar) > MAKS_PER_PERMINTAAN:
+        raise ValueError(f"Maksimal {MAKS_PER_PERMINTAAN} perubahan per permintaan.")
+
+    perubahan = []
+    for item in daftar:
+        if not isinstance(item, dict) or not item.get("id"):
+            raise ValueError("Setiap perubahan harus berisi 'id' dan 'status'.")
+        perubahan.append((str(item["id"]), item.get("status")))
+    return tanggal, perubahan
\ No newline at end of file
@@ -1,3 +1,4 @@
+import functools
 import qrcode
 from PIL import Image, ImageDraw, ImageFont
 from flask import session, redirect, url_for, flash
@@ -17,6 +18,15 @@ def format_nomor_hp(nomor):
     return "62" + nomor[1:] if nomor.startswith("0") else nomor[1:] if nomor.startswith("+62") else nomor
 
 
+@functools.lru_cache(maxsize=1)
+def muat_font_label():
+    """Muat font label QR sekali saja (dipakai ulang oleh semua pembuatan QR)."""
+    try:
+        return ImageFont.truetype("arial.ttf", 20)
+    except IOError:
+        return ImageFont.load_default()
+
+
 def create_qr_siswa(nis, nama):
     """Buat QR code untuk Siswa dengan data prefiks 'S'."""
     data_qr = f"S{nis}"  # Data QR yang baru
@@ -27,10 +37,7 @@ def create_qr_siswa(nis, nama):
     qr.make(fit=True)
     qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
 
-    try:
-        font = ImageFont.truetype("arial.ttf", 20)
-    except IOError:
-        font = ImageFont.load_default()
+    font = muat_font_label()
 
     draw_tmp = ImageDraw.Draw(qr_img)
     bbox = draw_tmp.textbbox((0, 0), text, font=font)
@@ -58,10 +65,7 @@ def create_qr_pegawai(no_id, nama, role):
     qr.make(fit=True)
     qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
 
-    try:
-        font = ImageFont.truetype("arial.ttf", 20)
-    except IOError:
-        font = ImageFont.load_default()
+    font = muat_font_label()
 
     draw_tmp = ImageDraw.Draw(qr_img)
     bbox = draw_tmp.textbbox((0, 0), text, font=font)
@@ -0,0 +1,77 @@
+# ======================== VERSI CACHE BERSAMA (ANTAR PROSES) ========================
+# Cache di memori proses (indeks identitas, pengaturan, roster keamanan) hanya
+# tahu perubahan yang terjadi di prosesnya sendiri. Dengan beberapa worker
+# gunicorn dan proses job-worker, edit di satu proses harus sampai ke semua.
+#
+# Tabel 'versi_cache' menyimpan satu nomor versi per cache. invalidate() di
+# proses mana pun menaikkan nomor itu; setiap proses membandingkannya dengan
+# versi yang dipakai saat cache terakhir dimuat, paling sering sekali per
+# CACHE_CEK_VERSI_DETIK. Pengecekan berupa satu SELECT berdasarkan primary key
+# di koneksi terpisah (tidak ikut transaksi request).
+#
+# Konfigurasi (.env):
+#   CACHE_CEK_VERSI_DETIK   Jeda minimal antar pengecekan versi per cache (default 2).
+#                           Ini batas basi antar proses; TTL tiap cache tetap berlaku.
+
+import os
+import threading
+import time as _time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from db_utils import upsert
+from models import db, VersiCache
+
+
+class VersiBersama:
+    """Nomor versi satu cache yang disimpan di database dan dibaca dengan jeda."""
+
+    def __init__(self, nama, jeda=None):
+        self.nama = nama
+        self._jeda = jeda
+        self._lock = threading.Lock()
+        self._versi = None
+        self._dicek_pada = None
+
+    @property
+    def jeda(self):
+        # Dibaca saat dipakai karena .env baru dimuat setelah modul ini diimpor
+        if self._jeda is None:
+            self._jeda = float(os.getenv("CACHE_CEK_VERSI_DETIK", "2"))
+        return self._jeda
+
+    def _baca(self):
+        with db.engine.connect() as conn:
+            return conn.execute(select(VersiCache.versi).where(VersiCache.nama == self.nama)).scalar() or 0
+
+    def terkini(self, paksa=False):
+        """
+        Versi di database. Tanpa paksa, nilai terakhir dipakai ulang selama
+        jeda belum lewat. Jika database tidak terbaca, nilai terakhir dipakai
+        (TTL cache tetap membatasi umur data).
+        """
+        sekarang = _time.monotonic()
+        if not paksa and self._dicek_pada is not None and sekarang - self._dicek_pada < self.jeda:
+            return self._versi
+        with self._lock:
+            if not paksa and self._dicek_pada is not None and sekarang - self._dicek_pada < self.jeda:
+                return self._versi
+            try:
+                self._versi = self._baca()
+            except SQLAlchemyError:
+                pass
+            self._dicek_pada = sekarang
+        return self._versi
+
+    def naikkan(self):
+        """Naikkan versi di database (transaksi sendiri); panggil setelah perubahan data di-commit."""
+        with Session(db.engine) as sesi, sesi.begin():
+            upsert(
+                VersiCache, [{"nama": self.nama, "versi": 1, "diperbarui_pada": datetime.now()}],
+                kolom_kunci=["nama"], kolom_update=["diperbarui_pada"], kolom_tambah=["versi"], session=sesi,
+            )
+        # Pengecekan berikutnya di proses ini langsung membaca nilai baru
+        self._dicek_pada = None
\ No newline at end of file
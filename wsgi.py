@@ -0,0 +1,33 @@
+# ======================== ENTRY POINT WSGI PRODUKSI ========================
+# Linux  : gunicorn -c gunicorn.conf.py wsgi:app
+#          (beberapa proses worker x thread; lihat gunicorn.conf.py)
+# Windows: python wsgi.py
+#          (waitress: satu proses dengan banyak thread)
+#
+# Proses web tidak menjalankan job latar maupun dispatcher WA. Jalankan proses
+# terpisah (service tersendiri) di samping server web:
+#   flask --app app job-worker
+#
+# Konfigurasi (.env):
+#   LAYANAN_LATAR "1" = tetap jalankan job & dispatcher WA di proses web (default 0).
+#
+# Konfigurasi (.env) untuk waitress:
+#   WEB_HOST      Alamat bind (default 0.0.0.0).
+#   WEB_PORT      Port (default 5001).
+#   WEB_THREADS   Jumlah thread (default 8).
+
+import os
+
+from app import create_app
+
+app = create_app(layanan_latar=os.getenv("LAYANAN_LATAR", "0") == "1")
+
+if __name__ == "__main__":
+    from waitress import serve
+
+    serve(
+        app,
+        host=os.getenv("WEB_HOST", "0.0.0.0"),
+        port=int(os.getenv("WEB_PORT", "5001")),
+        threads=int(os.getenv("WEB_THREADS", "8")),
+    )
\ No newline at end of file